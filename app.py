@@ -1,12 +1,20 @@
 from flask import Flask
 from flask_login import LoginManager
 from lib.database import Database
+from lib.query_log import QueryLog
+from lib.search_index import product_index
+from lib.brand_index import brand_index
+from lib.facet_index import facet_index
+from lib.search_cache import search_cache
+from lib.category_cache import category_cache
+from lib.client_index import client_index
 from lib.auth import auth_bp, setup_login_manager
 from lib.products import products_bp
 from lib.catalog import catalog_bp
 import os
 from temporarybill.temporary_bill_routes import temp_bp
-from flask import render_template
+from flask import render_template, jsonify
+from flask_login import login_required, current_user
 from flask_wtf.csrf import CSRFProtect
 from config import Config # Import your Config class
 
@@ -25,8 +33,14 @@ def create_app():
     login_manager.login_view = 'auth.login'
     login_manager.init_app(app)
     
-    # Initialize database
-    Database.initialize()
+    # Initialize database (pool + per-request connection teardown)
+    Database.init_app(app)
+    product_index.init_app(app)
+    brand_index.init_app(app)
+    facet_index.init_app(app)
+    search_cache.init_app(app)
+    category_cache.init_app(app)
+    client_index.init_app(app)
     
     # Register blueprints
     csrf.exempt(auth_bp)  # Exempt auth routes if needed
@@ -51,6 +65,17 @@ def create_app():
     def new_temp_bill():
         return render_template('temporarybill/temporary_bill.html')
 
+    # Live connection pool counters, for sizing DB_POOL_SIZE / DB_MAX_OVERFLOW
+    @app.route('/admin/db_stats')
+    @login_required
+    def db_stats():
+        if current_user.role != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
+        return jsonify(pool=Database.pool_stats(),
+                       replica_pool=Database.pool_stats(replica=True),
+                       queries=QueryLog.stats(),
+                       search_cache=search_cache.stats())
+
     # Route for editing a temporary bill
     @app.route('/temp_bill/edit/<int:bill_id>')
     def edit_temporary_bill_page(bill_id):
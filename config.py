@@ -21,6 +21,91 @@ class Config:
     DB_PASSWORD = clean_env_value(os.getenv('DB_PASSWORD', ''))
     DB_NAME = clean_env_value(os.getenv('DB_NAME', 'inventory_db'))
 
+    # Storage backend: 'mysql' (default) or 'sqlite' (see lib/backends.py)
+    DB_BACKEND = clean_env_value(os.getenv('DB_BACKEND', 'mysql')).lower()
+    SQLITE_PATH = clean_env_value(os.getenv('SQLITE_PATH', str(Path(__file__).resolve().parent / 'instance' / 'inventory.sqlite3')))
+    SQLITE_MMAP_SIZE = int(clean_env_value(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))))
+    SQLITE_CACHE_SIZE_KB = int(clean_env_value(os.getenv('SQLITE_CACHE_SIZE_KB', '65536')))
+    SQLITE_BUSY_TIMEOUT = int(clean_env_value(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')))
+
+    # Read replicas: comma-separated host[:port] list; empty disables routing
+    DB_REPLICA_HOSTS = [h.strip() for h in clean_env_value(os.getenv('DB_REPLICA_HOSTS', '')).split(',') if h.strip()]
+    DB_REPLICA_USER = clean_env_value(os.getenv('DB_REPLICA_USER', '')) or None
+    DB_REPLICA_PASSWORD = clean_env_value(os.getenv('DB_REPLICA_PASSWORD')) if os.getenv('DB_REPLICA_PASSWORD') else None
+    DB_REPLICA_POOL_SIZE = int(clean_env_value(os.getenv('DB_REPLICA_POOL_SIZE', os.getenv('DB_POOL_SIZE', '5'))))
+    # Seconds a client keeps reading from the primary after it wrote
+    DB_READ_YOUR_WRITES_WINDOW = float(clean_env_value(os.getenv('DB_READ_YOUR_WRITES_WINDOW', '5')))
+
+    # Connection pool sizing (see lib/pool.py)
+    DB_POOL_SIZE = int(clean_env_value(os.getenv('DB_POOL_SIZE', '5')))
+    DB_MAX_OVERFLOW = int(clean_env_value(os.getenv('DB_MAX_OVERFLOW', '10')))
+    DB_POOL_TIMEOUT = float(clean_env_value(os.getenv('DB_POOL_TIMEOUT', '30')))
+    DB_POOL_MAX_WAITERS = int(clean_env_value(os.getenv('DB_POOL_MAX_WAITERS', '50')))
+    DB_POOL_RECYCLE = int(clean_env_value(os.getenv('DB_POOL_RECYCLE', '3600')))
+    DB_POOL_PRE_PING = clean_env_value(os.getenv('DB_POOL_PRE_PING', 'true')).lower() in ('1', 'true', 'yes')
+    # Prepared statements kept per pooled connection (LRU)
+    DB_STATEMENT_CACHE_SIZE = int(clean_env_value(os.getenv('DB_STATEMENT_CACHE_SIZE', '64')))
+
+    # Query instrumentation (see lib/query_log.py)
+    DB_QUERY_LOG_ENABLED = clean_env_value(os.getenv('DB_QUERY_LOG_ENABLED', 'true')).lower() in ('1', 'true', 'yes')
+    DB_SLOW_QUERY_MS = float(clean_env_value(os.getenv('DB_SLOW_QUERY_MS', '200')))
+    DB_N_PLUS_ONE_THRESHOLD = int(clean_env_value(os.getenv('DB_N_PLUS_ONE_THRESHOLD', '10')))
+    DB_QUERY_STATS_MAX = int(clean_env_value(os.getenv('DB_QUERY_STATS_MAX', '1000')))
+    DB_QUERY_HEADERS = clean_env_value(os.getenv('DB_QUERY_HEADERS', 'false')).lower() in ('1', 'true', 'yes')
+
+    # Seconds between background rebuilds of the in-memory search index
+    # (picks up writes made by other worker processes); 0 disables
+    SEARCH_INDEX_REFRESH = int(clean_env_value(os.getenv('SEARCH_INDEX_REFRESH', '300')))
+
+    # Cached landing_search / AJAX product list results (entries, seconds)
+    SEARCH_CACHE_SIZE = int(clean_env_value(os.getenv('SEARCH_CACHE_SIZE', '2048')))
+    SEARCH_CACHE_TTL = int(clean_env_value(os.getenv('SEARCH_CACHE_TTL', '60')))
+
+    # Client search index reload interval (seconds, 0 disables), the least
+    # seconds between re-reads of new clients after a search finds nothing,
+    # and the number of recently picked clients remembered per user
+    CLIENT_INDEX_REFRESH = int(clean_env_value(os.getenv('CLIENT_INDEX_REFRESH', '300')))
+    CLIENT_CATCH_UP_INTERVAL = int(clean_env_value(os.getenv('CLIENT_CATCH_UP_INTERVAL', '5')))
+    RECENT_CLIENTS = int(clean_env_value(os.getenv('RECENT_CLIENTS', '10')))
+
+    # Searches count matches up to this many, then report an estimate
+    PRODUCT_COUNT_CAP = int(clean_env_value(os.getenv('PRODUCT_COUNT_CAP', '1000')))
+
+    # Rows fetched per round trip by the streaming /products/export
+    EXPORT_CHUNK_SIZE = int(clean_env_value(os.getenv('EXPORT_CHUNK_SIZE', '1000')))
+
+    # Bulk CSV import: rows per transaction, row errors reported at most
+    IMPORT_BATCH_SIZE = int(clean_env_value(os.getenv('IMPORT_BATCH_SIZE', '1000')))
+    IMPORT_MAX_ERRORS = int(clean_env_value(os.getenv('IMPORT_MAX_ERRORS', '500')))
+
+    # Most product ids one bulk operation may touch
+    BULK_MAX_IDS = int(clean_env_value(os.getenv('BULK_MAX_IDS', '1000')))
+
+    # Most lines one /products/stock_take batch may carry
+    STOCK_TAKE_MAX_ITEMS = int(clean_env_value(os.getenv('STOCK_TAKE_MAX_ITEMS', '5000')))
+
+    # Seconds before cached categories / spec columns are reloaded (picks up
+    # changes made by other worker processes); 0 keeps them until invalidated
+    CATEGORY_CACHE_TTL = int(clean_env_value(os.getenv('CATEGORY_CACHE_TTL', '300')))
+
+    # Values listed per specification facet on the /products filters
+    FACET_MAX_VALUES = int(clean_env_value(os.getenv('FACET_MAX_VALUES', '50')))
+
+    # Points a price-history series is downsampled to by default, and the most
+    # a client may ask for
+    PRICE_SERIES_POINTS = int(clean_env_value(os.getenv('PRICE_SERIES_POINTS', '500')))
+    PRICE_SERIES_MAX_POINTS = int(clean_env_value(os.getenv('PRICE_SERIES_MAX_POINTS', '5000')))
+
+    # Typos tolerated per word by fuzzy product search (0-2)
+    FUZZY_MAX_DISTANCE = int(clean_env_value(os.getenv('FUZZY_MAX_DISTANCE', '2')))
+    # Near-matches the /products list pages through in fuzzy mode
+    FUZZY_MAX_RESULTS = int(clean_env_value(os.getenv('FUZZY_MAX_RESULTS', '200')))
+
+    # /products search: 'fulltext' (MySQL FULLTEXT indexes, LIKE fallback) or 'like'
+    PRODUCT_SEARCH_MODE = clean_env_value(os.getenv('PRODUCT_SEARCH_MODE', 'fulltext')).lower()
+    # Shortest word a FULLTEXT index holds (innodb_ft_min_token_size)
+    FULLTEXT_MIN_TOKEN = int(clean_env_value(os.getenv('FULLTEXT_MIN_TOKEN', '3')))
+
     # Define SECRET_KEY directly using os.getenv
     SECRET_KEY = os.getenv('SECRET_KEY', os.urandom(24).hex())
     
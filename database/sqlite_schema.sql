@@ -0,0 +1,227 @@
+-- SQLite schema for DB_BACKEND=sqlite (mirrors db_setup.py and the
+-- temporary bill tables). Applied on first connection; safe to re-run.
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    role VARCHAR(10) DEFAULT 'staff' CHECK (role IN ('admin', 'manager', 'staff')),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(255) UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    category_id INT REFERENCES categories(id) ON DELETE SET NULL,
+    brand VARCHAR(100),
+    description TEXT,
+    unit_price DECIMAL(10,2),
+    quantity_in_stock INT,
+    min_stock_level INT,
+    is_deleted TINYINT(1) DEFAULT 0,
+    last_catalog_update DATE
+);
+
+-- Brand prefix searches (LIKE 'x%' is case-insensitive, so NOCASE)
+CREATE INDEX IF NOT EXISTS idx_products_brand ON products (brand COLLATE NOCASE);
+
+-- The /products list: active or deleted products of a category, by id
+CREATE INDEX IF NOT EXISTS idx_products_deleted_category ON products (is_deleted, category_id);
+
+-- Product totals per (category, is_deleted), kept current by triggers
+CREATE TABLE IF NOT EXISTS product_counts (
+    category_id INT NOT NULL,
+    is_deleted TINYINT(1) NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (category_id, is_deleted)
+);
+INSERT OR IGNORE INTO product_counts (category_id, is_deleted, total)
+    SELECT COALESCE(category_id, 0), COALESCE(is_deleted, 0), COUNT(*)
+    FROM products
+    GROUP BY COALESCE(category_id, 0), COALESCE(is_deleted, 0);
+
+CREATE TRIGGER IF NOT EXISTS products_count_insert AFTER INSERT ON products
+BEGIN
+    INSERT OR IGNORE INTO product_counts (category_id, is_deleted, total)
+        VALUES (COALESCE(NEW.category_id, 0), COALESCE(NEW.is_deleted, 0), 0);
+    UPDATE product_counts SET total = total + 1
+        WHERE category_id = COALESCE(NEW.category_id, 0) AND is_deleted = COALESCE(NEW.is_deleted, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_count_delete AFTER DELETE ON products
+BEGIN
+    UPDATE product_counts SET total = total - 1
+        WHERE category_id = COALESCE(OLD.category_id, 0) AND is_deleted = COALESCE(OLD.is_deleted, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_count_update AFTER UPDATE OF category_id, is_deleted ON products
+WHEN COALESCE(OLD.category_id, 0) != COALESCE(NEW.category_id, 0)
+  OR COALESCE(OLD.is_deleted, 0) != COALESCE(NEW.is_deleted, 0)
+BEGIN
+    UPDATE product_counts SET total = total - 1
+        WHERE category_id = COALESCE(OLD.category_id, 0) AND is_deleted = COALESCE(OLD.is_deleted, 0);
+    INSERT OR IGNORE INTO product_counts (category_id, is_deleted, total)
+        VALUES (COALESCE(NEW.category_id, 0), COALESCE(NEW.is_deleted, 0), 0);
+    UPDATE product_counts SET total = total + 1
+        WHERE category_id = COALESCE(NEW.category_id, 0) AND is_deleted = COALESCE(NEW.is_deleted, 0);
+END;
+
+CREATE TABLE IF NOT EXISTS switches_specifications (
+    id INT PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    amp_rating DECIMAL(5,2), module_type VARCHAR(50), color VARCHAR(50)
+);
+CREATE TABLE IF NOT EXISTS tubelights_specifications (
+    id INT PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    wattage DECIMAL(5,2), color_temperature VARCHAR(50)
+);
+CREATE TABLE IF NOT EXISTS pipes_specifications (
+    id INT PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    material VARCHAR(50), length DECIMAL(6,2), diameter DECIMAL(5,2)
+);
+CREATE TABLE IF NOT EXISTS wires_specifications (
+    id INT PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    voltage_rating DECIMAL(6,2), insulation_type VARCHAR(50)
+);
+CREATE TABLE IF NOT EXISTS panels_specifications (
+    id INT PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    voltage_rating DECIMAL(6,2), material VARCHAR(50)
+);
+CREATE TABLE IF NOT EXISTS led_specifications (
+    id INT PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    wattage DECIMAL(5,2), color_temperature VARCHAR(50)
+);
+
+-- All product specifications as JSON; often-filtered attributes are indexed
+-- generated columns (set only when the JSON value is a number)
+CREATE TABLE IF NOT EXISTS product_specifications (
+    product_id INT PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    specs TEXT NOT NULL,
+    wattage REAL GENERATED ALWAYS AS (
+        CASE WHEN json_type(specs, '$.wattage') IN ('integer', 'real') THEN json_extract(specs, '$.wattage') END) VIRTUAL,
+    amp_rating REAL GENERATED ALWAYS AS (
+        CASE WHEN json_type(specs, '$.amp_rating') IN ('integer', 'real') THEN json_extract(specs, '$.amp_rating') END) VIRTUAL,
+    voltage_rating REAL GENERATED ALWAYS AS (
+        CASE WHEN json_type(specs, '$.voltage_rating') IN ('integer', 'real') THEN json_extract(specs, '$.voltage_rating') END) VIRTUAL
+);
+CREATE INDEX IF NOT EXISTS idx_specs_wattage ON product_specifications (wattage);
+CREATE INDEX IF NOT EXISTS idx_specs_amp_rating ON product_specifications (amp_rating);
+CREATE INDEX IF NOT EXISTS idx_specs_voltage_rating ON product_specifications (voltage_rating);
+
+-- Copy the per-category tables in (products already in the store are kept)
+INSERT OR IGNORE INTO product_specifications (product_id, specs)
+    SELECT id, json_object('amp_rating', amp_rating, 'module_type', module_type, 'color', color)
+    FROM switches_specifications;
+INSERT OR IGNORE INTO product_specifications (product_id, specs)
+    SELECT id, json_object('wattage', wattage, 'color_temperature', color_temperature)
+    FROM tubelights_specifications;
+INSERT OR IGNORE INTO product_specifications (product_id, specs)
+    SELECT id, json_object('material', material, 'length', length, 'diameter', diameter)
+    FROM pipes_specifications;
+INSERT OR IGNORE INTO product_specifications (product_id, specs)
+    SELECT id, json_object('voltage_rating', voltage_rating, 'insulation_type', insulation_type)
+    FROM wires_specifications;
+INSERT OR IGNORE INTO product_specifications (product_id, specs)
+    SELECT id, json_object('voltage_rating', voltage_rating, 'material', material)
+    FROM panels_specifications;
+INSERT OR IGNORE INTO product_specifications (product_id, specs)
+    SELECT id, json_object('wattage', wattage, 'color_temperature', color_temperature)
+    FROM led_specifications;
+
+CREATE TABLE IF NOT EXISTS price_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INT NOT NULL REFERENCES products(id),
+    old_price DECIMAL(10,2) NOT NULL,
+    new_price DECIMAL(10,2) NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    changed_by INT REFERENCES users(id),
+    source VARCHAR(255),
+    is_catalog_update BOOLEAN DEFAULT FALSE
+);
+
+CREATE INDEX IF NOT EXISTS idx_price_history_product_changed ON price_history (product_id, changed_at);
+
+CREATE TABLE IF NOT EXISTS catalog_processing_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename VARCHAR(255) NOT NULL,
+    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_by INT REFERENCES users(id),
+    total_changes INT,
+    auto_approved INT,
+    changes_json TEXT
+);
+
+CREATE TABLE IF NOT EXISTS inventory_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INT NOT NULL REFERENCES products(id),
+    field_changed VARCHAR(50),
+    old_value VARCHAR(255),
+    new_value VARCHAR(255),
+    changed_by INT REFERENCES users(id),
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS stock_alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INT NOT NULL REFERENCES products(id),
+    current_quantity INT,
+    min_quantity INT,
+    alerted_by INT REFERENCES users(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS stock_take_batches (
+    batch_key VARCHAR(64) PRIMARY KEY,
+    created_by INT REFERENCES users(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    result_json TEXT
+);
+
+CREATE TABLE IF NOT EXISTS clients (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(255) NOT NULL,
+    email VARCHAR(255),
+    phone VARCHAR(50)
+);
+
+CREATE TABLE IF NOT EXISTS temporary_bills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL REFERENCES users(id),
+    bill_number VARCHAR(50),
+    bill_data TEXT,
+    status VARCHAR(20) DEFAULT 'draft',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_temporary_bills_user_status ON temporary_bills (user_id, status);
+CREATE INDEX IF NOT EXISTS idx_temporary_bills_expires ON temporary_bills (expires_at);
+
+CREATE TABLE IF NOT EXISTS temporary_bill_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bill_id INT NOT NULL REFERENCES temporary_bills(id) ON DELETE CASCADE,
+    name VARCHAR(255),
+    price DECIMAL(10,2),
+    quantity INT
+);
+
+CREATE TABLE IF NOT EXISTS bill_templates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL REFERENCES users(id),
+    name VARCHAR(50) NOT NULL,
+    html MEDIUMTEXT NOT NULL,
+    thumbnail VARCHAR(255),
+    is_default BOOLEAN DEFAULT FALSE,
+    variables TEXT DEFAULT '["invoice_id", "date", "total"]'
+);
+
+CREATE TABLE IF NOT EXISTS bill_sequence (
+    year INT PRIMARY KEY,
+    next_number INT NOT NULL
+);
+
+INSERT OR IGNORE INTO categories (name)
+VALUES ('switches'), ('tubelights'), ('pipes'), ('wires'), ('panels'), ('LED');
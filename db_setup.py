@@ -1,6 +1,10 @@
+import sys
+
 import mysql.connector
 from werkzeug.security import generate_password_hash
 
+from lib.migrations import migrate, full_scans
+
 conn = mysql.connector.connect(
 
 )
@@ -107,11 +111,6 @@ cursor.execute("""
     )
 """)
 
-# Add changes_json column using ALTER TABLE with checks
-cursor.execute("""
-    ALTER TABLE catalog_processing_logs ADD COLUMN changes_json JSON AFTER auto_approved
-""")
-
 # Insert predefined categories
 cursor.execute("""
     INSERT IGNORE INTO categories (name)
@@ -157,5 +156,15 @@ except Exception as e:
 
 
 conn.commit()
+
+# Versioned migrations (lib/migrations.py), then check the hot queries' plans
+applied = migrate(conn)
+if not applied:
+    print("✓ Schema is up to date")
+scans = full_scans(cursor)
 cursor.close()
+for name, step in scans:
+    print(f"✗ Full scan in hot query '{name}': {step}")
 conn.close()
+if scans:
+    sys.exit(1)
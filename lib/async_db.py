@@ -0,0 +1,81 @@
+# lib/async_db.py
+"""
+Awaitable database access for async views
+
+mysql.connector is a blocking driver, so each call runs in a worker thread
+(asyncio.to_thread) on a pooled connection of its own, checked out for that
+call and returned when it finishes. The event loop stays free while a query
+runs, and calls passed to asyncio.gather() run concurrently, each on its own
+connection. The request's context is copied into the thread, so replica
+routing and query logging see the same request as a sync view would.
+
+    rows = await AsyncDatabase.fetch_all("SELECT ...", params)
+"""
+
+import asyncio
+
+from lib.database import Database, is_plain_select
+from lib.query_log import QueryLog
+
+
+def _run(work, readonly):
+    """work(conn) on a connection checked out for this call only."""
+    conn = Database.checkout(readonly)
+    try:
+        return work(conn)
+    finally:
+        conn.close()
+
+
+class AsyncDatabase:
+    @staticmethod
+    async def fetch_all(query, params=None, prepared=False):
+        """
+        All rows of a query; plain SELECTs may be served by a replica.
+        prepared=True reuses the connection's cached prepared statement.
+        """
+        def fetch(conn):
+            if prepared:
+                return Database.run_prepared(conn, query, params)
+            cursor = QueryLog.wrap(conn.cursor(dictionary=True, buffered=True))
+            try:
+                cursor.execute(query, params or ())
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+        return await asyncio.to_thread(_run, fetch, is_plain_select(query))
+
+    @classmethod
+    async def fetch_one(cls, query, params=None, prepared=False):
+        rows = await cls.fetch_all(query, params, prepared=prepared)
+        return rows[0] if rows else None
+
+    @classmethod
+    async def execute(cls, query, params=None):
+        """Run a write on the primary; returns (rowcount, lastrowid)."""
+        def write(cursor):
+            cursor.execute(query, params or ())
+            return cursor.rowcount, cursor.lastrowid
+        return await cls.transaction(write)
+
+    @staticmethod
+    async def transaction(work):
+        """
+        Run work(cursor) inside one transaction on the primary. Commits if
+        it returns, rolls back if it raises.
+        """
+        def run(conn):
+            conn.start_transaction()
+            cursor = QueryLog.wrap(conn.cursor(dictionary=True, buffered=True))
+            try:
+                result = work(cursor)
+                conn.commit()
+                return result
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        result = await asyncio.to_thread(_run, run, False)
+        Database.mark_write()
+        return result
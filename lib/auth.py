@@ -97,11 +97,11 @@ class User(UserMixin):
 def setup_login_manager(login_manager):
     @login_manager.user_loader
     def load_user(user_id):
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, username, role FROM users WHERE id = %s", (user_id,))
-        user = cursor.fetchone()
-        conn.close()
+        # Runs on every authenticated request: reuse the prepared statement.
+        # Always the primary, so a new user or role change is seen at once
+        rows = Database.execute_query("SELECT id, username, role FROM users WHERE id = %s",
+                                      (user_id,), prepared=True, readonly=False)
+        user = rows[0] if rows else None
         return User(user['id'], user['username'], user['role']) if user else None
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
@@ -114,11 +114,9 @@ def login():
         password = request.form['password']
         remember = request.form.get('remember') 
         
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-        user = cursor.fetchone()
-        conn.close()
+        with Database.cursor() as cursor:
+            cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
+            user = cursor.fetchone()
         
         if user and check_password_hash(user['password_hash'], password):
             user_obj = User(user['id'], user['username'], user['role'])
@@ -142,19 +140,19 @@ def change_password():
         current_pw = request.form['current_password']
         new_pw = request.form['new_password']
         
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT password_hash FROM users WHERE id = %s", (current_user.id,))
-        user = cursor.fetchone()
+        with Database.transaction() as cursor:
+            cursor.execute("SELECT password_hash FROM users WHERE id = %s", (current_user.id,))
+            user = cursor.fetchone()
+            
+            changed = user and check_password_hash(user['password_hash'], current_pw)
+            if changed:
+                cursor.execute("UPDATE users SET password_hash = %s WHERE id = %s", 
+                             (generate_password_hash(new_pw), current_user.id))
         
-        if user and check_password_hash(user['password_hash'], current_pw):
-            cursor.execute("UPDATE users SET password_hash = %s WHERE id = %s", 
-                         (generate_password_hash(new_pw), current_user.id))
-            conn.commit()
+        if changed:
             flash('Password changed successfully!', 'success')
             return redirect(url_for('products.list'))
         
         flash('Current password is incorrect', 'danger')
-        conn.close()
     
     return render_template('templates.auth/change_password.html')
\ No newline at end of file
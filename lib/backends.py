@@ -0,0 +1,316 @@
+# lib/backends.py
+"""
+Storage backends for lib.database.Database
+
+The application SQL is written for mysql.connector (%s placeholders,
+dictionary cursors, MySQL JSON functions). MySQLBackend hands out plain
+mysql.connector connections; SQLiteBackend wraps sqlite3 in an adapter that
+speaks the same subset so the routes run unchanged on an embedded database.
+"""
+
+import itertools
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from config import Config
+
+
+class MySQLBackend:
+    name = 'mysql'
+
+    def __init__(self, hosts=None, user=None, password=None):
+        # Several hosts (read replicas) are used round-robin
+        self._hosts = itertools.cycle(hosts or [Config.DB_HOST])
+        self._user = user or Config.DB_USER
+        self._password = Config.DB_PASSWORD if password is None else password
+
+    def connect(self):
+        import mysql.connector
+        host, _, port = next(self._hosts).partition(':')
+        return mysql.connector.connect(
+            host=host,
+            port=int(port or 3306),
+            user=self._user,
+            password=self._password,
+            database=Config.DB_NAME,
+            autocommit=True
+        )
+
+    def ping(self, conn):
+        return conn.is_connected()
+
+    def reset(self, conn):
+        # Runs when a connection goes back to the pool
+        if conn.unread_result:
+            conn.consume_results()
+        conn.rollback()
+
+    def is_missing_table(self, exc):
+        return getattr(exc, 'errno', None) == 1146
+
+    def is_duplicate_key(self, exc):
+        return getattr(exc, 'errno', None) == 1062
+
+
+# --- SQLite -----------------------------------------------------------------
+
+SQLITE_SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'database', 'sqlite_schema.sql')
+
+# mysql.connector takes Decimal parameters; sqlite3 needs to be told how
+sqlite3.register_adapter(Decimal, str)
+
+_INTERVAL_UNITS = {
+    'SECOND': 'seconds', 'MINUTE': 'minutes', 'HOUR': 'hours',
+    'DAY': 'days', 'MONTH': 'months', 'YEAR': 'years',
+}
+_DATE_ADD = re.compile(r"DATE_ADD\(\s*(.+?)\s*,\s*INTERVAL\s+(\d+)\s+(\w+)\s*\)", re.I)
+_PLUS_INTERVAL = re.compile(r"(NOW\(\)|CURRENT_TIMESTAMP)\s*\+\s*INTERVAL\s+(\d+)\s+(\w+)", re.I)
+_SHOW_COLUMNS = re.compile(r"^\s*SHOW\s+COLUMNS\s+FROM\s+`?(\w+)`?\s*$", re.I)
+
+
+def _interval(expr, amount, unit):
+    return f"datetime({expr}, '+{amount} {_INTERVAL_UNITS[unit.upper()]}')"
+
+
+# A quoted string (kept) or a MySQL '#' comment (dropped)
+_HASH_COMMENT = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")|#[^\n]*""")
+
+
+@lru_cache(maxsize=512)
+def translate_sql(query):
+    """Rewrite the MySQL dialect used by the routes into SQLite."""
+    # SQLite only knows -- and /* */ comments
+    query = _HASH_COMMENT.sub(lambda m: m.group(1) or '', query)
+    query = query.replace('%s', '?')
+    query = _DATE_ADD.sub(lambda m: _interval(*m.groups()), query)
+    query = _PLUS_INTERVAL.sub(lambda m: _interval(*m.groups()), query)
+    query = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", query, flags=re.I)
+    query = re.sub(r"\blast_insert_id\(\)", "last_insert_rowid()", query, flags=re.I)
+    # SQLite locks the whole database for a write transaction; no row locks
+    query = re.sub(r"\s+FOR\s+UPDATE\b", "", query, flags=re.I)
+    return query
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _json_array_append(doc, path, value):
+    """MySQL JSON_ARRAY_APPEND for a single '$.key[.key...]' path."""
+    data = json.loads(doc) if doc else {}
+    target = data
+    keys = [k for k in path.lstrip('$').split('.') if k]
+    for key in keys[:-1]:
+        target = target.setdefault(key, {})
+    if keys:
+        current = target.get(keys[-1])
+        if current is None:
+            target[keys[-1]] = [value]
+        elif isinstance(current, list):
+            current.append(value)
+        else:
+            target[keys[-1]] = [current, value]
+    elif isinstance(data, list):
+        data.append(value)
+    else:
+        data = [data, value]
+    return json.dumps(data)
+
+
+def _dict_row(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    """mysql.connector-style cursor on top of sqlite3."""
+
+    def __init__(self, conn, dictionary=False):
+        self._cursor = conn.cursor()
+        if dictionary:
+            self._cursor.row_factory = _dict_row
+        self._dictionary = dictionary
+        self._rows = None
+
+    def execute(self, query, params=()):
+        self._rows = None
+        show = _SHOW_COLUMNS.match(query)
+        if show:
+            return self._show_columns(show.group(1))
+        self._cursor.execute(translate_sql(query), tuple(params or ()))
+
+    def executemany(self, query, seq_params):
+        self._rows = None
+        self._cursor.executemany(translate_sql(query), [tuple(p) for p in seq_params])
+
+    def _show_columns(self, table):
+        self._cursor.execute(f"PRAGMA table_info({table})")
+        info = self._cursor.fetchall()
+        if not info:
+            raise sqlite3.OperationalError(f"no such table: {table}")
+        rows = []
+        for col in info:
+            col = col if isinstance(col, dict) else dict(zip(('cid', 'name', 'type', 'notnull', 'dflt_value', 'pk'), col))
+            row = {'Field': col['name'], 'Type': col['type'], 'Null': 'NO' if col['notnull'] else 'YES',
+                   'Key': 'PRI' if col['pk'] else '', 'Default': col['dflt_value'], 'Extra': ''}
+            rows.append(row if self._dictionary else tuple(row.values()))
+        self._rows = rows
+
+    def fetchone(self):
+        if self._rows is not None:
+            return self._rows.pop(0) if self._rows else None
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        if self._rows is not None:
+            rows, self._rows = self._rows[:size], self._rows[size:]
+            return rows
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        if self._rows is not None:
+            rows, self._rows = self._rows, []
+            return rows
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """mysql.connector-style connection on top of sqlite3."""
+
+    unread_result = False
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False, buffered=None, prepared=None):
+        # sqlite3 keeps its own per-connection statement cache, and results
+        # are always local, so buffered/prepared have nothing to do here
+        return SQLiteCursor(self._conn, dictionary=dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def start_transaction(self):
+        # Take the write lock up front: a deferred transaction that reads
+        # first and writes later can't wait for another writer (WAL fails it
+        # with SQLITE_BUSY, ignoring busy_timeout), this one queues instead
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def consume_results(self):
+        pass
+
+    def is_connected(self):
+        try:
+            self._conn.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteBackend:
+    """
+    Embedded backend for single-store installs, tests and benchmarks.
+
+    Connections run in autocommit mode (like the MySQL pool), the database
+    file is put in WAL mode so readers never block the writer, and reads go
+    through mmap'd I/O with a large page cache.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path=None):
+        self.path = path or Config.SQLITE_PATH
+        self._schema_ready = False
+
+    def connect(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        raw = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                              timeout=Config.SQLITE_BUSY_TIMEOUT / 1000, cached_statements=256)
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute("PRAGMA synchronous=NORMAL")
+        raw.execute("PRAGMA foreign_keys=ON")
+        raw.execute("PRAGMA temp_store=MEMORY")
+        raw.execute(f"PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT)}")
+        raw.execute(f"PRAGMA mmap_size={int(Config.SQLITE_MMAP_SIZE)}")
+        raw.execute(f"PRAGMA cache_size=-{int(Config.SQLITE_CACHE_SIZE_KB)}")
+        raw.create_function('NOW', 0, _now)
+        raw.create_function('JSON_ARRAY_APPEND', 3, _json_array_append, deterministic=True)
+        if not self._schema_ready:
+            self._apply_schema(raw)
+        return SQLiteConnection(raw)
+
+    def _apply_schema(self, raw):
+        with open(SQLITE_SCHEMA) as f:
+            raw.executescript(f.read())
+        self._schema_ready = True
+
+    def ping(self, conn):
+        return conn.is_connected()
+
+    def reset(self, conn):
+        conn.rollback()
+
+    def is_missing_table(self, exc):
+        return isinstance(exc, sqlite3.OperationalError) and 'no such table' in str(exc)
+
+    def is_duplicate_key(self, exc):
+        return isinstance(exc, sqlite3.IntegrityError) and 'UNIQUE constraint failed' in str(exc)
+
+
+BACKENDS = {
+    'mysql': MySQLBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+def get_backend(name=None):
+    name = (name or Config.DB_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown DB_BACKEND '{name}' (expected one of: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+def get_replica_backend(name=None):
+    """Backend for the read-replica pool, or None if no replicas are configured."""
+    name = (name or Config.DB_BACKEND).lower()
+    if name != 'mysql' or not Config.DB_REPLICA_HOSTS:
+        return None
+    return MySQLBackend(hosts=Config.DB_REPLICA_HOSTS,
+                        user=Config.DB_REPLICA_USER,
+                        password=Config.DB_REPLICA_PASSWORD)
@@ -0,0 +1,177 @@
+# lib/brand_index.py
+"""
+Brand dictionary for autocomplete
+
+Replaces `SELECT DISTINCT brand FROM products WHERE brand LIKE %q%` in
+landing_search. Brands of non-deleted products are kept case-folded in a
+sorted array with a product count each, so a lookup is a bisect for the
+prefix range plus, if that comes up short, a scan of the (small) brand list
+for mid-word matches. Prefix matches come first, busiest brands first.
+
+Loaded at startup, kept current from the products_changed signal (only the
+changed products are re-read) and reloaded every SEARCH_INDEX_REFRESH
+seconds for writes made by other worker processes.
+"""
+
+import bisect
+import logging
+import threading
+import time
+
+from config import Config
+from lib.database import Database
+from lib.signals import products_changed
+
+logger = logging.getLogger('inventory.brand_index')
+
+BRAND_ROWS_QUERY = """
+    SELECT id, brand FROM products
+    WHERE is_deleted = 0 AND brand IS NOT NULL AND brand <> ''
+"""
+
+
+class BrandDictionary:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = []         # case-folded brands, sorted
+        self._brands = {}       # key -> [display name, product count]
+        self._product_brand = {}  # product id -> key
+        self._built_at = None
+        self._rebuilding = False
+        self._pending = []      # per running build: ids patched while it loads
+
+    def init_app(self, app):
+        products_changed.connect(self._on_products_changed, weak=False)
+        with app.app_context():
+            try:
+                self.build()
+            except Exception as e:
+                logger.warning("Brand dictionary not built at startup: %s", e)
+
+    def build(self, rows=None):
+        """
+        (Re)build from (id, brand) rows, or from the database if not given.
+        Products patched while the rows load are re-read afterwards.
+        """
+        changed = set()
+        with self._lock:
+            self._pending.append(changed)
+        try:
+            if rows is None:
+                with Database.cursor() as cursor:
+                    cursor.execute(BRAND_ROWS_QUERY)
+                    rows = cursor.fetchall()
+            brands = {}
+            product_brand = {}
+            for row in rows:
+                key = row['brand'].strip().lower()
+                if not key:
+                    continue
+                entry = brands.setdefault(key, [row['brand'].strip(), 0])
+                entry[1] += 1
+                product_brand[row['id']] = key
+            with self._lock:
+                self._brands = brands
+                self._keys = sorted(brands)
+                self._product_brand = product_brand
+                self._built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending.remove(changed)
+        self.refresh(changed)
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.build()
+        elif Config.SEARCH_INDEX_REFRESH and time.monotonic() - self._built_at > Config.SEARCH_INDEX_REFRESH:
+            with self._lock:
+                if self._rebuilding:
+                    return
+                self._rebuilding = True
+            threading.Thread(target=self._rebuild, name='brand-index-refresh', daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            self.build()
+        except Exception as e:
+            logger.warning("Brand dictionary refresh failed: %s", e)
+        finally:
+            self._rebuilding = False
+
+    # --- incremental updates ------------------------------------------------
+
+    def _add(self, product_id, brand):
+        key = brand.strip().lower()
+        if not key:
+            return
+        entry = self._brands.get(key)
+        if entry is None:
+            entry = self._brands[key] = [brand.strip(), 0]
+            bisect.insort(self._keys, key)
+        entry[1] += 1
+        self._product_brand[product_id] = key
+
+    def _discard(self, product_id):
+        key = self._product_brand.pop(product_id, None)
+        if key is None:
+            return
+        entry = self._brands[key]
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._brands[key]
+            del self._keys[bisect.bisect_left(self._keys, key)]
+
+    def refresh(self, product_ids):
+        """Re-read the brands of the given products from the primary."""
+        product_ids = list(product_ids)
+        with self._lock:
+            for changed in self._pending:
+                changed.update(product_ids)
+        if self._built_at is None or not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with Database.cursor(readonly=False) as cursor:
+            cursor.execute(BRAND_ROWS_QUERY + f" AND id IN ({placeholders})", product_ids)
+            rows = cursor.fetchall()
+        with self._lock:
+            for product_id in product_ids:
+                self._discard(product_id)
+            for row in rows:
+                self._add(row['id'], row['brand'])
+
+    def _on_products_changed(self, sender, product_ids=(), **extra):
+        try:
+            self.refresh(product_ids)
+        except Exception as e:
+            logger.warning("Brand dictionary update failed for %s: %s", product_ids, e)
+
+    # --- querying -------------------------------------------------------------
+
+    def suggest(self, query, limit=10):
+        """Brands containing `query`: prefix matches first, then by product count."""
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+        self._ensure_fresh()
+        with self._lock:
+            start = bisect.bisect_left(self._keys, query)
+            end = bisect.bisect_left(self._keys, query + '\uffff', start)
+            prefixed = self._keys[start:end]
+            matches = sorted(prefixed, key=lambda k: -self._brands[k][1])[:limit]
+            if len(matches) < limit:
+                inner = [k for k in self._keys if query in k and not k.startswith(query)]
+                inner.sort(key=lambda k: -self._brands[k][1])
+                matches += inner[:limit - len(matches)]
+            return [{'brand': self._brands[k][0], 'products': self._brands[k][1]} for k in matches]
+
+    def count(self, brand):
+        """Non-deleted products of `brand` (case-insensitive)."""
+        with self._lock:
+            entry = self._brands.get(brand.strip().lower())
+            return entry[1] if entry else 0
+
+    def __len__(self):
+        return len(self._keys)
+
+
+brand_index = BrandDictionary()
@@ -0,0 +1,119 @@
+# lib/bulk_ops.py
+"""
+Set-based bulk operations on selected products (/products/bulk, /bulk_delete)
+
+Each operation is one transaction with a fixed number of statements,
+however many ids are selected:
+
+    SELECT ... WHERE id IN (<ids>) FOR UPDATE          which exist / would change
+    INSERT INTO price_history ... SELECT ...           price operations only
+    UPDATE products SET ... WHERE id IN (<changing ids>)
+
+and reports, per id, 'updated', 'unchanged' or 'not_found'.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from config import Config
+from lib.category_cache import category_cache
+from lib.database import Database
+from lib.signals import products_changed
+
+# operation -> (SET clause, predicate for rows it would change, new price
+# expression for price history or None). Each %s takes the operation's value.
+OPERATIONS = {
+    'delete': ("is_deleted = 1", "COALESCE(is_deleted, 0) <> 1", None),
+    'restore': ("is_deleted = 0", "COALESCE(is_deleted, 0) <> 0", None),
+    'set_category': ("category_id = %s", "COALESCE(category_id <> %s, 1)", None),
+    'set_price': ("unit_price = %s", "COALESCE(unit_price <> %s, 1)", "%s"),
+    'change_price_pct': ("unit_price = ROUND(unit_price * %s, 2)",
+                         "ROUND(unit_price * %s, 2) <> unit_price",
+                         "ROUND(unit_price * %s, 2)"),
+    'set_quantity': ("quantity_in_stock = %s", "COALESCE(quantity_in_stock <> %s, 1)", None),
+}
+
+# Signal action sent for each operation
+_ACTIONS = {
+    'delete': 'delete', 'restore': 'restore', 'set_category': 'bulk',
+    'set_price': 'price', 'change_price_pct': 'price', 'set_quantity': 'quantity',
+}
+
+
+def parse_ids(ids):
+    """Distinct int ids from a request list; ValueError if malformed or too many."""
+    if not isinstance(ids, list) or not ids:
+        raise ValueError("ids must be a non-empty list")
+    try:
+        ids = list(dict.fromkeys(int(i) for i in ids))
+    except (TypeError, ValueError):
+        raise ValueError("ids must be integers")
+    if len(ids) > Config.BULK_MAX_IDS:
+        raise ValueError(f"At most {Config.BULK_MAX_IDS} ids per request")
+    return ids
+
+
+def parse_value(operation, value):
+    """The operation's SQL parameter from the request value; ValueError if invalid."""
+    if operation in ('delete', 'restore'):
+        return None
+    if value is None or value == '':
+        raise ValueError(f"{operation} needs a value")
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"'{value}' is not a number")
+    if not number.is_finite():
+        raise ValueError(f"'{value}' is not a number")
+
+    if operation == 'set_price':
+        if number < 0:
+            raise ValueError("Price can't be negative")
+        return number.quantize(Decimal('0.01'))
+    if operation == 'change_price_pct':
+        if number <= -100:
+            raise ValueError("A price can't drop by 100% or more")
+        return 1 + number / 100
+    if number != number.to_integral_value() or number < 0:
+        raise ValueError(f"{operation} needs a whole, non-negative number")
+    if operation == 'set_category':
+        if not category_cache.get(int(number)):
+            raise ValueError(f"Unknown category: {value}")
+    return int(number)
+
+
+def run_bulk(operation, ids, value=None, user_id=None):
+    """Apply `operation` to `ids`; returns {'results': {id: status}, 'updated': n}."""
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown operation: {operation}")
+    ids = parse_ids(ids)
+    value = parse_value(operation, value)
+    set_clause, changes, new_price = OPERATIONS[operation]
+
+    def args(*clauses):
+        return [value] * sum(clause.count('%s') for clause in clauses)
+
+    in_ids = f"id IN ({', '.join(['%s'] * len(ids))})"
+    with Database.transaction() as cursor:
+        cursor.execute(f"""
+            SELECT id, CASE WHEN {changes} THEN 1 ELSE 0 END AS changes
+            FROM products WHERE {in_ids} FOR UPDATE
+        """, args(changes) + ids)
+        found = {row['id']: bool(row['changes']) for row in cursor.fetchall()}
+        changed = [i for i in ids if found.get(i)]
+
+        if changed:
+            in_changed = f"id IN ({', '.join(['%s'] * len(changed))})"
+            if new_price:
+                cursor.execute(f"""
+                    INSERT INTO price_history (product_id, old_price, new_price, changed_by, source)
+                    SELECT id, COALESCE(unit_price, 0), {new_price}, %s, 'bulk'
+                    FROM products WHERE {in_changed}
+                """, args(new_price) + [user_id] + changed)
+            cursor.execute(f"UPDATE products SET {set_clause} WHERE {in_changed}",
+                           args(set_clause) + changed)
+
+    if changed:
+        products_changed.send('products', product_ids=changed, action=_ACTIONS[operation])
+    results = {i: 'not_found' if i not in found else 'updated' if found[i] else 'unchanged'
+               for i in ids}
+    return {'results': results, 'updated': len(changed)}
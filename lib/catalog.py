@@ -5,6 +5,7 @@ import re
 import os
 from werkzeug.utils import secure_filename
 from lib.database import Database
+from lib.signals import products_changed
 
 catalog_bp = Blueprint('catalog', __name__)
 
@@ -100,12 +101,13 @@ def apply_changes():
     try:
         updated = 0
         price_history = []
+        updated_ids = []
         
         # Process each potential update
         for key in request.form: # Iterate through form keys
             # Check if it's a price field and the corresponding approve checkbox is 'on'
-            if key.startswith('price_') and request.form.get(f'approve_{key[7:]}') == 'on':
-                product_id = int(key[7:]) # Extract product_id from key
+            if key.startswith('price_') and request.form.get(f'approve_{key[6:]}') == 'on':
+                product_id = int(key[6:]) # Extract product_id from key
                 new_price = float(request.form[key])
                 
                 # Update product only if price is different, and record in history
@@ -130,8 +132,11 @@ def apply_changes():
                         WHERE id = %s # For the specific product
  """, (new_price, current_user.id, product_id))
                     updated += 1 # Increment updated count
+                    updated_ids.append(product_id)
 
         conn.commit() # Commit the transaction if all updates and inserts succeed
+        if updated_ids:
+            products_changed.send('catalog', product_ids=updated_ids, action='price')
         flash(f"Updated {updated} product prices", 'success') # Success message
 
     except Exception as e: # Catch any errors
@@ -0,0 +1,120 @@
+# lib/category_cache.py
+"""
+Categories and specification-table schemas, held in process
+
+The category list (filter dropdowns, the add form, CSV import) and the
+column list of each {category}_specifications table (SHOW COLUMNS, a
+metadata query) are read on nearly every product page but almost never
+change. Both are loaded at startup, dropped by the categories_changed
+signal (add_category, specification table changes) and reloaded every
+CATEGORY_CACHE_TTL seconds for changes made by other worker processes.
+"""
+
+import logging
+import re
+import threading
+import time
+
+from config import Config
+from lib.database import Database
+from lib.signals import categories_changed
+
+logger = logging.getLogger('inventory.category_cache')
+
+_TABLE_NAME = re.compile(r"^\w+$")
+
+
+def spec_table(category_name):
+    """Name of a category's specification table."""
+    return f"{category_name.lower()}_specifications"
+
+
+class CategoryCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._categories = None   # [{'id', 'name'}] in id order
+        self._by_id = {}
+        self._by_name = {}        # lowercased name -> category
+        self._spec_columns = {}   # spec table -> [{'Field', 'Type', ...}] without id
+        self._loaded_at = None
+
+    def init_app(self, app):
+        categories_changed.connect(self._on_categories_changed, weak=False)
+        with app.app_context():
+            try:
+                self.load(warm=True)
+            except Exception as e:
+                logger.warning("Category cache not loaded at startup: %s", e)
+
+    def load(self, warm=False):
+        """(Re)load the categories; warm=True also reads every spec table's columns."""
+        rows = Database.execute_query("SELECT id, name FROM categories ORDER BY id")
+        categories = [{'id': row['id'], 'name': row['name']} for row in rows]
+        spec_columns = {}
+        if warm:
+            for category in categories:
+                table = spec_table(category['name'])
+                spec_columns[table] = self._read_columns(table)
+        with self._lock:
+            self._categories = categories
+            self._by_id = {c['id']: c for c in categories}
+            self._by_name = {c['name'].lower(): c for c in categories}
+            self._spec_columns = spec_columns
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._categories = None
+            self._spec_columns = {}
+
+    def _on_categories_changed(self, sender, **extra):
+        self.invalidate()
+
+    def _ensure_loaded(self):
+        if self._categories is None or (
+                Config.CATEGORY_CACHE_TTL and time.monotonic() - self._loaded_at > Config.CATEGORY_CACHE_TTL):
+            self.load()
+
+    @staticmethod
+    def _read_columns(table):
+        if not _TABLE_NAME.match(table):
+            return []
+        try:
+            columns = Database.execute_query(f"SHOW COLUMNS FROM {table}")
+        except Exception as e:
+            if Database.is_missing_table(e):
+                return []  # Category without specifications
+            raise
+        return [col for col in columns if col['Field'] != 'id']
+
+    # --- lookups --------------------------------------------------------------
+
+    def categories(self):
+        """All categories as [{'id', 'name'}], in id order."""
+        self._ensure_loaded()
+        return [dict(c) for c in self._categories]
+
+    def get(self, category_id):
+        self._ensure_loaded()
+        category = self._by_id.get(category_id)
+        return dict(category) if category else None
+
+    def by_name(self, name):
+        """Category by name, case-insensitively."""
+        self._ensure_loaded()
+        category = self._by_name.get((name or '').strip().lower())
+        return dict(category) if category else None
+
+    def spec_columns(self, category_name):
+        """SHOW COLUMNS rows (minus id) of a category's spec table; [] if it has none."""
+        self._ensure_loaded()
+        table = spec_table(category_name)
+        columns = self._spec_columns.get(table)
+        if columns is None:
+            columns = self._read_columns(table)
+            with self._lock:
+                self._spec_columns[table] = columns
+        return [dict(col) for col in columns]
+
+
+category_cache = CategoryCache()
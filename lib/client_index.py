@@ -0,0 +1,277 @@
+# lib/client_index.py
+"""
+In-process client lookup for the bill screen's client search
+
+Replaces `name LIKE %q% OR email LIKE %q% OR phone LIKE %q%`. Clients are
+held in sorted arrays so every kind of lookup is a bisect over a prefix
+range:
+
+- phone: digits only ("+91 98450-12345" -> "919845012345"), matched by
+  prefix with or without the country code, and reversed so the last digits someone reads off a phone
+  ("12345") match as a suffix
+- email: lowercased, matched by prefix
+- name: each lowercased word, matched by prefix; every query word must hit
+
+Clients each user picked recently are listed first. The index is loaded on
+first use, patched on every clients_changed signal (only the written clients
+are re-read) and reloaded in the background every CLIENT_INDEX_REFRESH
+seconds for writes made by other worker processes. A search that finds
+nothing also pulls in clients added since the last load (a primary-key
+range read, at most once per CLIENT_CATCH_UP_INTERVAL seconds), so a client
+another process created a moment ago is found.
+"""
+
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from config import Config
+from lib.database import Database
+from lib.signals import clients_changed
+
+logger = logging.getLogger('inventory.client_index')
+
+_NON_DIGITS = re.compile(r"\D")
+_WORDS = re.compile(r"\w+", re.U)
+_PHONE_QUERY = re.compile(r"^[\d\s+().-]+$")
+
+CLIENT_COLUMNS = "SELECT id, name, email, phone FROM clients"
+
+
+def phone_digits(phone):
+    return _NON_DIGITS.sub('', phone or '')
+
+
+def _prefix_range(keys, prefix):
+    """Slice bounds of the entries of sorted `keys` starting with `prefix`."""
+    start = bisect.bisect_left(keys, (prefix,))
+    end = bisect.bisect_left(keys, (prefix + '\uffff',), start)
+    return start, end
+
+
+class ClientSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clients = {}      # id -> {'id', 'name', 'email', 'phone'}
+        self._phones = []       # sorted (digits, id)
+        self._phones_rev = []   # sorted (reversed digits, id)
+        self._emails = []       # sorted (email, id)
+        self._names = []        # sorted (name word, id)
+        self._recent = defaultdict(lambda: deque(maxlen=Config.RECENT_CLIENTS))
+        self._max_id = 0
+        self._built_at = None
+        self._caught_up_at = None
+        self._rebuilding = False
+        self._pending = []      # per running build: ids patched while it loads
+
+    def init_app(self, app):
+        clients_changed.connect(self._on_clients_changed, weak=False)
+
+    def build(self, rows=None):
+        """
+        (Re)build from client rows, or from the database if not given.
+        Clients patched while the rows load are re-read afterwards.
+        """
+        changed = set()
+        with self._lock:
+            self._pending.append(changed)
+        try:
+            if rows is None:
+                with Database.cursor() as cursor:
+                    cursor.execute(CLIENT_COLUMNS)
+                    rows = cursor.fetchall()
+            clients, phones, phones_rev, emails, names = {}, [], [], [], []
+            for row in rows:
+                clients[row['id']] = dict(row)
+                for keys, key in zip((phones, phones_rev, emails, names), self._keys(row)):
+                    keys.extend((k, row['id']) for k in key)
+            for keys in (phones, phones_rev, emails, names):
+                keys.sort()
+            with self._lock:
+                self._clients = clients
+                self._phones, self._phones_rev = phones, phones_rev
+                self._emails, self._names = emails, names
+                self._max_id = max(clients, default=0)
+                self._built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending.remove(changed)
+        logger.info("Client index built: %d clients", len(clients))
+        self.refresh(changed)
+
+    @staticmethod
+    def _keys(row):
+        """Phone, reversed phone, email and name-word keys of a client row."""
+        digits = phone_digits(row['phone'])
+        email = (row['email'] or '').strip().lower()
+        # The last ten digits are the national number: '98450...' finds '+91 98450...'
+        return ({digits, digits[-10:]} if digits else (), [digits[::-1]] if digits else [],
+                [email] if email else [], set(_WORDS.findall((row['name'] or '').lower())))
+
+    # --- incremental updates ------------------------------------------------
+
+    def _sorted_keys(self):
+        return self._phones, self._phones_rev, self._emails, self._names
+
+    def _add(self, row):
+        self._clients[row['id']] = dict(row)
+        for keys, key in zip(self._sorted_keys(), self._keys(row)):
+            for k in key:
+                bisect.insort(keys, (k, row['id']))
+        self._max_id = max(self._max_id, row['id'])
+
+    def _discard(self, client_id):
+        row = self._clients.pop(client_id, None)
+        if row is None:
+            return
+        for keys, key in zip(self._sorted_keys(), self._keys(row)):
+            for k in key:
+                i = bisect.bisect_left(keys, (k, client_id))
+                if i < len(keys) and keys[i] == (k, client_id):
+                    del keys[i]
+
+    def refresh(self, client_ids):
+        """Re-read the given clients from the primary."""
+        client_ids = list(client_ids)
+        with self._lock:
+            for changed in self._pending:
+                changed.update(client_ids)
+        if self._built_at is None or not client_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(client_ids))
+        with Database.cursor(readonly=False) as cursor:
+            cursor.execute(CLIENT_COLUMNS + f" WHERE id IN ({placeholders})", client_ids)
+            rows = cursor.fetchall()
+        with self._lock:
+            for client_id in client_ids:
+                self._discard(client_id)
+            for row in rows:
+                self._add(row)
+
+    def _on_clients_changed(self, sender, client_ids=(), **extra):
+        try:
+            self.refresh(client_ids)
+        except Exception as e:
+            logger.warning("Client index update failed for %s: %s", client_ids, e)
+
+    def _catch_up(self):
+        """
+        Add clients created since the last load. Returns how many; 0 without
+        a query if the last catch-up was under CLIENT_CATCH_UP_INTERVAL ago.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._caught_up_at is not None and now - self._caught_up_at < Config.CLIENT_CATCH_UP_INTERVAL:
+                return 0
+            self._caught_up_at = now
+            max_id = self._max_id
+        with Database.cursor() as cursor:
+            cursor.execute(CLIENT_COLUMNS + " WHERE id > %s ORDER BY id", (max_id,))
+            rows = cursor.fetchall()
+        with self._lock:
+            rows = [row for row in rows if row['id'] not in self._clients]
+            for row in rows:
+                self._add(row)
+        return len(rows)
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.build()
+        elif Config.CLIENT_INDEX_REFRESH and time.monotonic() - self._built_at > Config.CLIENT_INDEX_REFRESH:
+            with self._lock:
+                if self._rebuilding:
+                    return
+                self._rebuilding = True
+            threading.Thread(target=self._rebuild, name='client-index-refresh', daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            self.build()
+        except Exception as e:
+            logger.warning("Client index refresh failed: %s", e)
+        finally:
+            self._rebuilding = False
+
+    # --- querying -------------------------------------------------------------
+
+    def _ids(self, keys, prefix, cap):
+        start, end = _prefix_range(keys, prefix)
+        return [client_id for _, client_id in keys[start:min(end, start + cap)]]
+
+    def search(self, query, limit=10, user_id=None):
+        """Clients matching `query` by phone, email or name; recent picks first."""
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+        self._ensure_fresh()
+        results = self._search(query, limit, user_id)
+        if not results and self._catch_up():
+            results = self._search(query, limit, user_id)
+        return results
+
+    def _search(self, query, limit, user_id):
+        cap = max(limit * 20, 200)
+        with self._lock:
+            matches = OrderedDict()
+            digits = phone_digits(query)
+            if digits and _PHONE_QUERY.match(query):
+                for client_id in self._ids(self._phones, digits, cap):
+                    matches[client_id] = None
+                for client_id in self._ids(self._phones_rev, digits[::-1], cap):
+                    matches[client_id] = None
+            else:
+                for client_id in self._ids(self._emails, query, cap):
+                    matches[client_id] = None
+                # Every query word must start a word of the name: walk the
+                # narrowest prefix range and check the other words per client
+                words = _WORDS.findall(query)
+                if words:
+                    ranges = sorted(((_prefix_range(self._names, word), word) for word in words),
+                                    key=lambda r: r[0][1] - r[0][0])
+                    (start, end), _ = ranges[0]
+                    others = [word for _, word in ranges[1:]]
+                    found = 0
+                    for _, client_id in self._names[start:end]:
+                        if client_id in matches:
+                            continue
+                        if others:
+                            name_words = _WORDS.findall((self._clients[client_id]['name'] or '').lower())
+                            if not all(any(w.startswith(o) for w in name_words) for o in others):
+                                continue
+                        matches[client_id] = None
+                        found += 1
+                        if found >= cap:
+                            break
+
+            recent = self._recent.get(user_id, ()) if user_id is not None else ()
+            ordered = [i for i in reversed(recent) if i in matches]
+            ordered += [i for i in matches if i not in ordered]
+            return [dict(self._clients[i]) for i in ordered[:limit] if i in self._clients]
+
+    # --- recent clients -------------------------------------------------------
+
+    def touch(self, user_id, client_id):
+        """Remember that `user_id` just picked `client_id`."""
+        if user_id is None or client_id is None:
+            return
+        with self._lock:
+            recent = self._recent[user_id]
+            if client_id in recent:
+                recent.remove(client_id)
+            recent.append(client_id)
+
+    def recent(self, user_id, limit=None):
+        """The user's recently picked clients, newest first."""
+        self._ensure_fresh()
+        with self._lock:
+            ids = list(reversed(self._recent.get(user_id, ())))
+            return [dict(self._clients[i]) for i in ids[:limit] if i in self._clients]
+
+    def __len__(self):
+        return len(self._clients)
+
+
+client_index = ClientSearchIndex()
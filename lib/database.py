@@ -1,77 +1,329 @@
-'''
+import re
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, session
+from config import Config
+from lib.backends import get_backend, get_replica_backend
+from lib.pool import ConnectionPool
+from lib.query_log import QueryLog
+from lib.statement_cache import StatementCache
 
 
+# Statements that are safe to send to a replica: a SELECT that neither locks
+# rows nor depends on session state from an earlier write
+_SELECT = re.compile(r"^[\s(]*SELECT\b", re.I)
+_NOT_REPLICA_SAFE = re.compile(
+    r"\bFOR\s+UPDATE\b|\bFOR\s+SHARE\b|\bLOCK\s+IN\s+SHARE\s+MODE\b|\bINTO\b"
+    r"|\bLAST_INSERT_ID\s*\(|\bFOUND_ROWS\s*\(|\bGET_LOCK\s*\(", re.I)
+
+_WRITE = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|ALTER|DROP|TRUNCATE)\b", re.I)
+
+
+def is_plain_select(query):
+    return bool(_SELECT.match(query)) and not _NOT_REPLICA_SAFE.search(query)
+
+
+class RequestConnection:
+    """
+    Handle on the connection shared by everything running in one request.
+
+    close() only drains unread results; the connection itself goes back to
+    the pool when the app context is torn down (see Database.init_app).
+    """
+
+    def __init__(self, conn, primary=True):
+        self._conn = conn
+        self._primary = primary
+
+    def cursor(self, *args, **kwargs):
+        return QueryLog.wrap(self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        self._conn.commit()
+        if self._primary:
+            Database.mark_write()
+
+    def close(self):
+        if self._conn.unread_result:
+            self._conn.consume_results()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
 
-import mysql.connector.pooling
-from config import Config
 
 class Database:
     _pool = None
+    _replica_pool = None
+    _backend = None
     
     @classmethod
-    def initialize(cls):
+    def initialize(cls, backend=None):
         if not cls._pool:
-            cls._pool = mysql.connector.pooling.MySQLConnectionPool(
-                pool_name="inventory_pool",
-                pool_size=5,
-                host=Config.DB_HOST,
-                user=Config.DB_USER,
-                password=Config.DB_PASSWORD,
-                database=Config.DB_NAME,
-                autocommit=True
-            )
-    
+            cls._backend = backend or get_backend(Config.DB_BACKEND)
+            cls._pool = cls._make_pool(cls._backend, Config.DB_POOL_SIZE)
+            replica = get_replica_backend(cls._backend.name) if backend is None else None
+            if replica:
+                cls._replica_pool = cls._make_pool(replica, Config.DB_REPLICA_POOL_SIZE)
+
+    @staticmethod
+    def _make_pool(backend, pool_size):
+        return ConnectionPool(
+            backend.connect,
+            pool_size=pool_size,
+            max_overflow=Config.DB_MAX_OVERFLOW,
+            timeout=Config.DB_POOL_TIMEOUT,
+            max_waiters=Config.DB_POOL_MAX_WAITERS,
+            recycle=Config.DB_POOL_RECYCLE,
+            pre_ping=Config.DB_POOL_PRE_PING,
+            ping=backend.ping,
+            reset=backend.reset
+        )
+
+    @classmethod
+    def init_app(cls, app):
+        """Create the pool, release request connections on teardown, log queries."""
+        cls.initialize()
+        app.teardown_appcontext(cls._release_request_connection)
+        QueryLog.init_app(app)
+
     @classmethod
-    def get_connection(cls):
-        return cls._pool.get_connection()
+    def _release_request_connection(cls, exc=None):
+        for key in ('_db_conn', '_db_replica_conn'):
+            conn = g.pop(key, None)
+            if conn is not None:
+                # Returning to the pool rolls back anything left uncommitted
+                conn.close()
+
+    @classmethod
+    def backend_name(cls):
+        return cls._backend.name if cls._backend else Config.DB_BACKEND
+
+    @classmethod
+    def is_missing_table(cls, exc):
+        """True if `exc` is the backend's "table doesn't exist" error."""
+        return cls._backend.is_missing_table(exc)
+
+    @classmethod
+    def is_duplicate_key(cls, exc):
+        """True if `exc` is the backend's unique/primary key violation."""
+        return cls._backend.is_duplicate_key(exc)
+
+    # --- Read/write routing --------------------------------------------------
+
+    @staticmethod
+    def replica_reads(view):
+        """Opt a read-only view in: its get_connection() calls use a replica."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g._db_route = 'replica'
+            return current_app.ensure_sync(view)(*args, **kwargs)
+        return wrapper
+
+    @staticmethod
+    def primary_only(view):
+        """Opt a view out: every statement, even a plain SELECT, uses the primary."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g._db_route = 'primary'
+            return current_app.ensure_sync(view)(*args, **kwargs)
+        return wrapper
+
+    @classmethod
+    def mark_write(cls):
+        """Keep this client on the primary for the read-your-writes window."""
+        if cls._replica_pool and has_request_context():
+            session['_db_wrote_at'] = time.time()
+
+    @classmethod
+    def _use_replica(cls, readonly):
+        if cls._replica_pool is None or readonly is False:
+            return False
+        if not has_app_context():
+            return bool(readonly)
+        route = g.get('_db_route')
+        if route == 'primary':
+            return False
+        primary = g.get('_db_conn')
+        if primary is not None and primary.in_transaction:
+            return False
+        if route is None and primary is not None and g.get('_db_replica_conn') is None:
+            # Auto-routed read in a view that already holds the primary:
+            # reuse it rather than checking out a second connection
+            return False
+        if has_request_context():
+            wrote_at = session.get('_db_wrote_at')
+            if wrote_at and time.time() - wrote_at < Config.DB_READ_YOUR_WRITES_WINDOW:
+                return False
+        return bool(readonly) or route == 'replica'
     
     @classmethod
-    def execute_query(cls, query, params=None, fetch=True):
-        conn = cls.get_connection()
-        cursor = conn.cursor(dictionary=True)
+    def get_connection(cls, readonly=None):
+        """
+        Inside an app context all callers share one pooled connection (bound
+        to flask.g), so a request checks out at most one connection per pool.
+        Outside of one, a fresh connection is checked out.
+
+        readonly=True asks for a replica connection, readonly=False forces
+        the primary; by default the view's replica_reads/primary_only
+        setting decides, falling back to the primary.
+        """
+        replica = cls._use_replica(readonly)
+        pool = cls._replica_pool if replica else cls._pool
+        if not has_app_context():
+            return pool.checkout()
+        key = '_db_replica_conn' if replica else '_db_conn'
+        conn = g.get(key)
+        if conn is None:
+            conn = pool.checkout()
+            setattr(g, key, conn)
+        return RequestConnection(conn, primary=not replica)
+
+    @classmethod
+    def checkout(cls, readonly=None):
+        """
+        A pooled connection of the caller's own, not the request one, for
+        work on other threads (see lib/async_db.py). Caller must close() it.
+        """
+        pool = cls._replica_pool if cls._use_replica(readonly) else cls._pool
+        return pool.checkout()
+
+    @classmethod
+    @contextmanager
+    def cursor(cls, dictionary=True, readonly=None):
+        """
+        Buffered cursor on the request connection, closed on exit.
+
+            with Database.cursor() as cursor:
+                cursor.execute("SELECT ...", params)
+                rows = cursor.fetchall()
+        """
+        conn = cls.get_connection(readonly)
+        cursor = conn.cursor(dictionary=dictionary, buffered=True)
         try:
-            cursor.execute(query, params or ())
-            if fetch:
-                return cursor.fetchall()
-            return None
+            yield cursor
         finally:
             cursor.close()
             conn.close()
 
-            '''
-
-import mysql.connector.pooling
-from config import Config
+    @classmethod
+    @contextmanager
+    def transaction(cls, dictionary=True):
+        """
+        Cursor inside a transaction on the primary: commits when the block
+        finishes, rolls back if it raises. Nested blocks join the outer one.
+        """
+        conn = cls.get_connection(readonly=False)
+        outer = conn.in_transaction
+        if not outer:
+            conn.start_transaction()
+        cursor = conn.cursor(dictionary=dictionary, buffered=True)
+        try:
+            yield cursor
+            if not outer:
+                conn.commit()
+        except Exception:
+            if not outer:
+                conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
 
-class Database:
-    _pool = None
-    
     @classmethod
-    def initialize(cls):
-        if not cls._pool:
-            cls._pool = mysql.connector.pooling.MySQLConnectionPool(
-                pool_name="inventory_pool",
-                pool_size=5,
-                host=Config.DB_HOST,
-                user=Config.DB_USER,
-                password=Config.DB_PASSWORD,
-                database=Config.DB_NAME,
-                autocommit=True
-            )
-    
+    def stream(cls, query, params=None, chunk_size=1000, readonly=True):
+        """
+        Generator over the rows of a large SELECT, for exports.
+
+        The rows come from an unbuffered cursor on a connection of the
+        generator's own, chunk_size at a time, so memory stays flat however
+        many rows there are. The connection is checked out on the first
+        next() and returned when the generator finishes or is closed, so a
+        generator that is never iterated holds nothing; close it (e.g. with
+        response.call_on_close) when it may be abandoned part-way. The rest
+        of an unfinished result is drained before the connection goes back
+        to the pool.
+        """
+        # Route now, while the request context is still there
+        pool = cls._replica_pool if cls._use_replica(readonly) else cls._pool
+        return cls._stream_rows(pool, query, params, chunk_size)
+
+    @staticmethod
+    def _stream_rows(pool, query, params, chunk_size):
+        conn = pool.checkout()
+        try:
+            cursor = QueryLog.wrap(conn.cursor(dictionary=True))
+            try:
+                cursor.execute(query, params or ())
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                if conn.unread_result:
+                    conn.consume_results()
+                cursor.close()
+        finally:
+            conn.close()
+
     @classmethod
-    def get_connection(cls):
-        return cls._pool.get_connection()
+    def pool_stats(cls, replica=False):
+        """Live pool counters (checkouts, wait time, in use/idle, timeouts)."""
+        pool = cls._replica_pool if replica else cls._pool
+        return pool.stats() if pool else {}
     
     @classmethod
-    def execute_query(cls, query, params=None, fetch=True):
-        conn = cls.get_connection()
-        cursor = conn.cursor(dictionary=True)
-        try:
+    def execute_query(cls, query, params=None, fetch=True, prepared=False, readonly=None):
+        """
+        Run one statement; plain SELECTs are routed to a replica when allowed,
+        unless readonly=False keeps them on the primary. prepared=True runs
+        it as a cached server-side prepared statement, worth it for hot
+        statements with a fixed SQL text.
+        """
+        select = is_plain_select(query)
+        replica = select and readonly is not False
+        if prepared:
+            return cls._execute_prepared(query, params, fetch or select, readonly=replica)
+        with cls.cursor(readonly=replica) as cursor:
             cursor.execute(query, params or ())
+            if _WRITE.match(query):
+                cls.mark_write()
             if fetch:
                 return cursor.fetchall()
             return None
+
+    @staticmethod
+    def run_prepared(conn, query, params=None, fetch=True):
+        """Execute `query` on `conn` through the connection's statement cache."""
+        statements = conn.info.get('statements')
+        if statements is None:
+            statements = conn.info['statements'] = StatementCache(Config.DB_STATEMENT_CACHE_SIZE)
+        try:
+            cursor = statements.cursor(conn, query)
+            cursor.execute(query, params or ())
+            # Prepared cursors must be drained before they can run again
+            return cursor.fetchall() if fetch else None
+        except Exception:
+            statements.discard(query)
+            raise
+
+    @classmethod
+    def _execute_prepared(cls, query, params, fetch, readonly):
+        conn = cls.get_connection(readonly)
+        try:
+            rows = cls.run_prepared(conn, query, params, fetch)
+            if _WRITE.match(query):
+                cls.mark_write()
+            return rows
         finally:
-            cursor.close()
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    @classmethod
+    def statement_cache_stats(cls):
+        """Hit/miss counters of the request connection's statement cache."""
+        conn = g.get('_db_conn') if has_app_context() else None
+        statements = conn.info.get('statements') if conn is not None else None
+        if statements is None:
+            return {}
+        return {'size': len(statements), 'hits': statements.hits, 'misses': statements.misses}
@@ -0,0 +1,262 @@
+# lib/facet_index.py
+"""
+Specification facets for the /products list
+
+For every category, each specification attribute (wattage,
+color_temperature, material, ...) maps each of its values to a bitmap of
+the non-deleted products having it: a Python int with bit `id` set per
+product. A multi-facet filter is then a few ORs (values of one attribute)
+and ANDs (across attributes), and the count next to a value is the
+popcount of its bitmap ANDed with the other attributes' selections, so
+neither filtering nor counting needs a GROUP BY over the spec rows.
+
+Only the columns of the category's {category}_specifications table (its
+form's fields) are facets: custom attributes a product adds on top are
+free-form, often unique per product, and each of their values would cost
+a bitmap as wide as the highest product id.
+
+Specs come from product_specifications (see lib/product_specs.py). Built
+at startup, patched on every products_changed signal (only the changed
+products are re-read), rebuilt on the next use after categories_changed and
+rebuilt in the background every
+SEARCH_INDEX_REFRESH seconds for writes made by other worker processes.
+"""
+
+import logging
+import threading
+import time
+
+from config import Config
+from lib.category_cache import category_cache
+from lib.database import Database
+from lib.product_specs import load_specs
+from lib.signals import categories_changed, products_changed
+
+logger = logging.getLogger('inventory.facet_index')
+
+FACET_ROWS_QUERY = """
+    SELECT p.id, c.name AS category, ps.specs
+    FROM products p
+    JOIN categories c ON p.category_id = c.id
+    JOIN product_specifications ps ON ps.product_id = p.id
+    WHERE p.is_deleted = 0
+"""
+
+
+def facet_value(value):
+    """The facet key of a spec value ('9' for 9, 9.0 and ' 9 '); None if not facetable."""
+    if isinstance(value, bool) or isinstance(value, (dict, list)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def bits(bitmap, after=None, before=None):
+    """Product ids set in `bitmap`: ascending (after an id) or, with before, descending."""
+    if before is not None:
+        bitmap &= (1 << max(before, 0)) - 1
+        while bitmap:
+            top = bitmap.bit_length() - 1
+            yield top
+            bitmap ^= 1 << top
+        return
+    if after is not None:
+        bitmap = bitmap >> (after + 1) << (after + 1)
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class FacetIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._facets = {}    # category (lowercased) -> attribute -> value -> bitmap
+        self._product = {}   # product id -> (category, ((attribute, value), ...))
+        self._built_at = None
+        self._rebuilding = False
+        self._pending = []   # per running build: ids patched while it loads
+
+    def init_app(self, app):
+        products_changed.connect(self._on_products_changed, weak=False)
+        categories_changed.connect(self._on_categories_changed, weak=False)
+        with app.app_context():
+            try:
+                self.build()
+            except Exception as e:
+                logger.warning("Facet index not built at startup: %s", e)
+
+    def build(self, rows=None):
+        """
+        (Re)build from (id, category, specs) rows, or from the database if
+        not given. Products patched while the rows load are re-read afterwards.
+        """
+        changed = set()
+        with self._lock:
+            self._pending.append(changed)
+        try:
+            if rows is None:
+                with Database.cursor() as cursor:
+                    cursor.execute(FACET_ROWS_QUERY)
+                    rows = cursor.fetchall()
+            fields = self._fields(rows)
+            with self._lock:
+                self._facets, self._product = {}, {}
+                for row in rows:
+                    self._add(row, fields)
+                self._built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending.remove(changed)
+        self.refresh(changed)
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.build()
+        elif Config.SEARCH_INDEX_REFRESH and time.monotonic() - self._built_at > Config.SEARCH_INDEX_REFRESH:
+            with self._lock:
+                if self._rebuilding:
+                    return
+                self._rebuilding = True
+            threading.Thread(target=self._rebuild, name='facet-index-refresh', daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            self.build()
+        except Exception as e:
+            logger.warning("Facet index refresh failed: %s", e)
+        finally:
+            self._rebuilding = False
+
+    # --- incremental updates ------------------------------------------------
+
+    @staticmethod
+    def _fields(rows):
+        """category (lowercased) -> names of its spec table's columns, for the rows' categories."""
+        categories = {row['category'].lower() for row in rows}
+        return {category: {col['Field'] for col in category_cache.spec_columns(category)}
+                for category in categories}
+
+    def _add(self, row, fields):
+        category = row['category'].lower()
+        attributes = self._facets.setdefault(category, {})
+        bit = 1 << row['id']
+        pairs = []
+        for attribute, value in load_specs(row['specs']).items():
+            if attribute not in fields[category]:
+                continue
+            value = facet_value(value)
+            if value is None:
+                continue
+            values = attributes.setdefault(attribute, {})
+            values[value] = values.get(value, 0) | bit
+            pairs.append((attribute, value))
+        self._product[row['id']] = (category, tuple(pairs))
+
+    def _discard(self, product_id):
+        entry = self._product.pop(product_id, None)
+        if entry is None:
+            return
+        category, pairs = entry
+        attributes = self._facets[category]
+        for attribute, value in pairs:
+            values = attributes[attribute]
+            values[value] &= ~(1 << product_id)
+            if not values[value]:
+                del values[value]
+                if not values:
+                    del attributes[attribute]
+
+    def refresh(self, product_ids):
+        """Re-read the specs of the given products from the primary."""
+        product_ids = list(product_ids)
+        with self._lock:
+            for changed in self._pending:
+                changed.update(product_ids)
+        if self._built_at is None or not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with Database.cursor(readonly=False) as cursor:
+            cursor.execute(FACET_ROWS_QUERY + f" AND p.id IN ({placeholders})", product_ids)
+            rows = cursor.fetchall()
+        fields = self._fields(rows)
+        with self._lock:
+            for product_id in product_ids:
+                self._discard(product_id)
+            for row in rows:
+                self._add(row, fields)
+
+    def _on_products_changed(self, sender, product_ids=(), **extra):
+        try:
+            self.refresh(product_ids)
+        except Exception as e:
+            logger.warning("Facet index update failed for %s: %s", product_ids, e)
+
+    def _on_categories_changed(self, sender, **extra):
+        # A spec table gained or lost columns: rebuild on next use
+        self._built_at = None
+
+    # --- querying -------------------------------------------------------------
+
+    def _selections(self, category, filters):
+        """attribute -> bitmap of products having any of its selected values."""
+        categories = [category.lower()] if category else list(self._facets)
+        selections = {}
+        for attribute, values in filters.items():
+            wanted = {facet_value(v) for v in values} - {None}
+            bitmap = 0
+            for name in categories:
+                found = self._facets.get(name, {}).get(attribute, {})
+                for value in wanted:
+                    bitmap |= found.get(value, 0)
+            selections[attribute] = bitmap
+        return selections
+
+    def match(self, category, filters):
+        """
+        Bitmap of non-deleted products (of `category`, if given) matching
+        `filters`, a dict of attribute -> [values]: any value of an
+        attribute, every attribute.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            selections = self._selections(category, filters)
+        bitmap = None
+        for selected in selections.values():
+            bitmap = selected if bitmap is None else bitmap & selected
+        return bitmap or 0
+
+    def counts(self, category, filters=None, limit=None):
+        """
+        Facets of a category as {attribute: [{'value', 'count'}]}, most
+        products first. A value's count applies the other attributes'
+        filters, so it is what selecting it (too) would show.
+        """
+        limit = limit or Config.FACET_MAX_VALUES
+        filters = filters or {}
+        self._ensure_fresh()
+        with self._lock:
+            attributes = self._facets.get((category or '').lower(), {})
+            selections = self._selections(category, filters)
+            chosen = {attribute: {facet_value(v) for v in values} for attribute, values in filters.items()}
+            facets = {}
+            for attribute, values in attributes.items():
+                others = None
+                for name, selected in selections.items():
+                    if name != attribute:
+                        others = selected if others is None else others & selected
+                counted = [(value, (bitmap if others is None else bitmap & others).bit_count())
+                           for value, bitmap in values.items()]
+                counted.sort(key=lambda vc: (-vc[1], vc[0]))
+                facets[attribute] = [{'value': value, 'count': count}
+                                     for value, count in counted[:limit]
+                                     if count or value in chosen.get(attribute, ())]
+            return {attribute: values for attribute, values in sorted(facets.items()) if values}
+
+    def __len__(self):
+        return len(self._product)
+
+
+facet_index = FacetIndex()
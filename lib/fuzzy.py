@@ -0,0 +1,149 @@
+# lib/fuzzy.py
+"""
+Symmetric-deletion dictionary for typo-tolerant lookups
+
+Every vocabulary word is stored under all the strings obtained by deleting
+up to `max_distance` characters from its first `prefix_length` characters.
+A query term generates its own deletions the same way; any word sharing a
+deletion key with it is a candidate, and candidates are confirmed with a
+bounded edit distance. No table scan, no per-query walk of the vocabulary:
+
+    havels  --delete 1-->  havls, haels, ...  <--delete 1--  havells
+
+Words with digits (model numbers, ratings like "9w") are matched exactly
+only: they are not misspelt the way names are, and they would swamp the
+deletion keys. Only the first `prefix_length` characters are indexed, which is also what
+lets a half-typed word find the words it starts: "tubwli" -> "tubelight".
+"""
+
+import bisect
+import itertools
+from collections import defaultdict
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (insert, delete, substitute, swap
+    adjacent) between `a` and `b`, or limit + 1 once it is known to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        lowest = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, prev2[j - 2] + 1)
+            cur[j] = value
+            lowest = min(lowest, value)
+        if lowest > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return min(prev[-1], limit + 1)
+
+
+def deletions(word, max_distance):
+    """`word` plus every string made by deleting up to max_distance characters."""
+    keys = {word}
+    for n in range(1, min(max_distance, len(word)) + 1):
+        for positions in itertools.combinations(range(len(word)), n):
+            keys.add(''.join(c for i, c in enumerate(word) if i not in positions))
+    return keys
+
+
+class DeletionIndex:
+    """
+    Words (with reference counts) indexed by their deletions.
+
+    Not thread-safe on its own; the owner serializes access.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=5):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._deletes = defaultdict(set)
+        self._refs = {}
+        self._sorted = []       # vocabulary, for exact prefix ranges
+
+    def add(self, word, count=1):
+        if word in self._refs:
+            self._refs[word] += count
+            return
+        self._refs[word] = count
+        bisect.insort(self._sorted, word)
+        if not word.isalpha():
+            return
+        for key in deletions(word[:self.prefix_length], self.max_distance):
+            self._deletes[key].add(word)
+
+    def update(self, counts):
+        """Bulk add: `counts` maps word -> references."""
+        for word, count in counts.items():
+            if word in self._refs:
+                self._refs[word] += count
+                continue
+            self._refs[word] = count
+            if word.isalpha():
+                for key in deletions(word[:self.prefix_length], self.max_distance):
+                    self._deletes[key].add(word)
+        self._sorted = sorted(self._refs)
+
+    def discard(self, word):
+        refs = self._refs.get(word)
+        if refs is None:
+            return
+        if refs > 1:
+            self._refs[word] = refs - 1
+            return
+        del self._refs[word]
+        del self._sorted[bisect.bisect_left(self._sorted, word)]
+        if not word.isalpha():
+            return
+        for key in deletions(word[:self.prefix_length], self.max_distance):
+            words = self._deletes.get(key)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self._deletes[key]
+
+    def lookup(self, term, max_distance, prefix=False):
+        """
+        {word: distance} for words within `max_distance` edits of `term`.
+        With prefix=True the term is treated as the start of a word still
+        being typed: 'tubeli' matches 'tubelight' at distance 0.
+        """
+        max_distance = min(max_distance, self.max_distance)
+        found = {}
+        if prefix:
+            start = bisect.bisect_left(self._sorted, term)
+            for word in self._sorted[start:bisect.bisect_left(self._sorted, term + '\uffff', start)]:
+                found[word] = 0
+        if max_distance == 0 or not term.isalpha():
+            if term in self._refs:
+                found[term] = 0
+            return found
+        for key in deletions(term[:self.prefix_length], max_distance):
+            for word in self._deletes.get(key, ()):
+                if word in found:
+                    continue
+                target = word[:len(term)] if prefix else word
+                distance = edit_distance(term, target, max_distance)
+                if prefix and len(word) > len(term):
+                    # A typo near the end may also shift the cut-off point
+                    distance = min(distance, edit_distance(term, word[:len(term) + 1], max_distance),
+                                   edit_distance(term, word[:len(term) - 1], max_distance))
+                if distance <= max_distance:
+                    found[word] = distance
+        return found
+
+    def __contains__(self, word):
+        return word in self._refs
+
+    def __len__(self):
+        return len(self._refs)
@@ -0,0 +1,299 @@
+# lib/migrations.py
+"""
+Versioned schema migrations for MySQL (run by db_setup.py)
+
+db_setup.py creates the base tables; every later change is a numbered
+migration below, applied once and in order, and recorded in
+
+    schema_migrations (version PK, description, applied_at)
+
+so db_setup.py can be re-run at any time. Statements tolerate "already
+there" errors (table, column or index exists), so a migration also applies
+cleanly to a database where the change was made by hand (or by an older
+db_setup.py). A step is an SQL string or, for work that depends on the
+data, a callable taking the cursor. Add a migration by appending the next
+version; never edit one that has shipped.
+database/sqlite_schema.sql declares the same tables and indexes.
+
+full_scans() EXPLAINs the hot queries and reports every step that would
+read a whole table, including one the optimizer chose to scan although an
+index exists (so run the check on a database with realistic data):
+
+    python -m lib.migrations            apply pending migrations, then check
+    python -m lib.migrations --check    check only; exit status 1 on a full scan
+"""
+
+import sys
+
+# MySQL errors meaning the change is already in place
+_ALREADY_APPLIED = {
+    1050,  # Table already exists
+    1060,  # Duplicate column name
+    1061,  # Duplicate key name
+    1359,  # Trigger already exists
+}
+
+
+def _copy_spec_tables(cursor):
+    """Copy each {category}_specifications table into product_specifications."""
+    cursor.execute("SHOW TABLES LIKE '%\\_specifications'")
+    tables = [row[0] for row in cursor.fetchall() if row[0] != 'product_specifications']
+    for table in tables:
+        cursor.execute(f"SHOW COLUMNS FROM {table}")
+        columns = [col[0] for col in cursor.fetchall() if col[0] != 'id']
+        if not columns:
+            continue
+        pairs = ', '.join(f"'{col}', {col}" for col in columns)
+        # Products already in the JSON store are left alone
+        cursor.execute(f"""
+            INSERT IGNORE INTO product_specifications (product_id, specs)
+            SELECT id, JSON_OBJECT({pairs}) FROM {table}
+        """)
+
+
+# (version, description, statements)
+MIGRATIONS = [
+    (1, "catalog_processing_logs.changes_json", [
+        "ALTER TABLE catalog_processing_logs ADD COLUMN changes_json JSON AFTER auto_approved",
+    ]),
+    (2, "temporary bill tables (only the SQLite schema had them)", [
+        """
+        CREATE TABLE IF NOT EXISTS temporary_bills (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            bill_number VARCHAR(50),
+            bill_data JSON,
+            status VARCHAR(20) DEFAULT 'draft',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at DATETIME,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS temporary_bill_items (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            bill_id INT NOT NULL,
+            name VARCHAR(255),
+            price DECIMAL(10,2),
+            quantity INT,
+            FOREIGN KEY (bill_id) REFERENCES temporary_bills(id) ON DELETE CASCADE
+        )
+        """,
+    ]),
+    (3, "indexes for hot queries", [
+        # /products list: WHERE is_deleted = ? AND c.name = ? ORDER BY p.id
+        "CREATE INDEX idx_products_deleted_category ON products (is_deleted, category_id)",
+        # /api/price_history: WHERE product_id = ? ORDER BY changed_at DESC
+        "CREATE INDEX idx_price_history_product_changed ON price_history (product_id, changed_at)",
+        # A user's active temporary bill
+        "CREATE INDEX idx_temporary_bills_user_status ON temporary_bills (user_id, status)",
+        # Expired temporary bills
+        "CREATE INDEX idx_temporary_bills_expires ON temporary_bills (expires_at)",
+    ]),
+    (4, "search indexes for the /products list (FULLTEXT needs MySQL 5.6+/InnoDB)", [
+        "ALTER TABLE products ADD FULLTEXT INDEX ft_products_text (brand, description)",
+        "ALTER TABLE products ADD FULLTEXT INDEX ft_products_brand (brand)",
+        "CREATE INDEX idx_products_brand ON products (brand)",
+    ]),
+    # Product totals per (category, is_deleted) for the /products list, kept
+    # current by triggers so they change in the same transaction as the product
+    (5, "product_counts and its triggers", [
+        """
+        CREATE TABLE IF NOT EXISTS product_counts (
+            category_id INT NOT NULL,
+            is_deleted TINYINT(1) NOT NULL,
+            total INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (category_id, is_deleted)
+        )
+        """,
+        """
+        CREATE TRIGGER products_count_insert AFTER INSERT ON products FOR EACH ROW
+            INSERT INTO product_counts (category_id, is_deleted, total)
+            VALUES (COALESCE(NEW.category_id, 0), COALESCE(NEW.is_deleted, 0), 1)
+            ON DUPLICATE KEY UPDATE total = total + 1
+        """,
+        """
+        CREATE TRIGGER products_count_delete AFTER DELETE ON products FOR EACH ROW
+            UPDATE product_counts SET total = total - 1
+            WHERE category_id = COALESCE(OLD.category_id, 0)
+              AND is_deleted = COALESCE(OLD.is_deleted, 0)
+        """,
+        """
+        CREATE TRIGGER products_count_update AFTER UPDATE ON products FOR EACH ROW
+        BEGIN
+            IF NOT (COALESCE(OLD.category_id, 0) <=> COALESCE(NEW.category_id, 0))
+               OR NOT (COALESCE(OLD.is_deleted, 0) <=> COALESCE(NEW.is_deleted, 0)) THEN
+                UPDATE product_counts SET total = total - 1
+                WHERE category_id = COALESCE(OLD.category_id, 0)
+                  AND is_deleted = COALESCE(OLD.is_deleted, 0);
+                INSERT INTO product_counts (category_id, is_deleted, total)
+                VALUES (COALESCE(NEW.category_id, 0), COALESCE(NEW.is_deleted, 0), 1)
+                ON DUPLICATE KEY UPDATE total = total + 1;
+            END IF;
+        END
+        """,
+        # Seed from the current catalog, once (ProductCounts.rebuild() recounts later)
+        "DELETE FROM product_counts",
+        """
+        INSERT INTO product_counts (category_id, is_deleted, total)
+        SELECT COALESCE(category_id, 0), COALESCE(is_deleted, 0), COUNT(*)
+        FROM products
+        GROUP BY COALESCE(category_id, 0), COALESCE(is_deleted, 0)
+        """,
+    ]),
+    # Applied stock-take batches, keyed by the client's batch key so a retried
+    # upload is answered from here instead of being applied twice
+    (6, "stock_take_batches", [
+        """
+        CREATE TABLE IF NOT EXISTS stock_take_batches (
+            batch_key VARCHAR(64) PRIMARY KEY,
+            created_by INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            result_json JSON,
+            FOREIGN KEY (created_by) REFERENCES users(id)
+        )
+        """,
+    ]),
+    # All product specifications as JSON. Often-filtered attributes are
+    # generated columns (set only when the JSON value is a number) with indexes
+    (7, "product_specifications, copied from the per-category tables", [
+        """
+        CREATE TABLE IF NOT EXISTS product_specifications (
+            product_id INT PRIMARY KEY,
+            specs JSON NOT NULL,
+            wattage DECIMAL(8,2) AS (IF(JSON_TYPE(specs->'$.wattage') IN ('INTEGER', 'DOUBLE', 'DECIMAL'),
+                                        specs->>'$.wattage', NULL)) VIRTUAL,
+            amp_rating DECIMAL(8,2) AS (IF(JSON_TYPE(specs->'$.amp_rating') IN ('INTEGER', 'DOUBLE', 'DECIMAL'),
+                                           specs->>'$.amp_rating', NULL)) VIRTUAL,
+            voltage_rating DECIMAL(8,2) AS (IF(JSON_TYPE(specs->'$.voltage_rating') IN ('INTEGER', 'DOUBLE', 'DECIMAL'),
+                                               specs->>'$.voltage_rating', NULL)) VIRTUAL,
+            INDEX idx_specs_wattage (wattage),
+            INDEX idx_specs_amp_rating (amp_rating),
+            INDEX idx_specs_voltage_rating (voltage_rating),
+            FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+        )
+        """,
+        _copy_spec_tables,
+    ]),
+]
+
+
+# (name, query, params) that must never need a full table scan
+HOT_QUERIES = [
+    ("product list", """
+        SELECT p.id FROM products p JOIN categories c ON p.category_id = c.id
+        WHERE p.is_deleted = %s AND c.name = %s ORDER BY p.id LIMIT 21
+    """, (0, 'switches')),
+    ("price history", """
+        SELECT id FROM price_history WHERE product_id = %s ORDER BY changed_at DESC LIMIT 50
+    """, (1,)),
+    ("active temporary bill", """
+        SELECT id FROM temporary_bills WHERE user_id = %s AND status = 'active'
+    """, (1,)),
+    ("expired temporary bills", """
+        SELECT id FROM temporary_bills WHERE expires_at < NOW()
+    """, ()),
+    ("product specifications", """
+        SELECT specs FROM product_specifications WHERE product_id = %s
+    """, (1,)),
+]
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] if isinstance(row, tuple) else row['version'] for row in cursor.fetchall()}
+
+
+def migrate(conn, log=print):
+    """Apply pending migrations on a MySQL connection; returns the versions applied."""
+    cursor = conn.cursor()
+    try:
+        done = applied_versions(cursor)
+        applied = []
+        for version, description, statements in MIGRATIONS:
+            if version in done:
+                continue
+            for statement in statements:
+                try:
+                    if callable(statement):
+                        statement(cursor)
+                    else:
+                        cursor.execute(statement)
+                except Exception as err:
+                    if getattr(err, 'errno', None) not in _ALREADY_APPLIED:
+                        raise RuntimeError(f"Migration {version} ({description}) failed: {err}") from err
+            cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                           (version, description))
+            conn.commit()
+            applied.append(version)
+            log(f"✓ Applied migration {version}: {description}")
+        return applied
+    finally:
+        cursor.close()
+
+
+def _plan(cursor, query, params, backend):
+    """EXPLAIN rows of `query` as dicts."""
+    explain = "EXPLAIN QUERY PLAN " if backend == 'sqlite' else "EXPLAIN "
+    cursor.execute(explain + query, params)
+    rows = cursor.fetchall()
+    columns = [d[0] for d in cursor.description]
+    return [row if isinstance(row, dict) else dict(zip(columns, row)) for row in rows]
+
+
+def _is_full_scan(step, backend):
+    if backend == 'sqlite':
+        # "SCAN p" reads the table; "SCAN p USING INDEX ..." and "SEARCH" don't
+        detail = step['detail']
+        return detail.startswith('SCAN ') and ' USING ' not in detail
+    # type ALL reads every row, whether or not an index was a candidate: a
+    # hot query the optimizer stops using its index for is the regression
+    # this check is for
+    return step.get('type') == 'ALL'
+
+
+def full_scans(cursor, backend='mysql'):
+    """[(query name, plan step)] for hot-query steps that read a whole table."""
+    found = []
+    for name, query, params in HOT_QUERIES:
+        for step in _plan(cursor, query, params, backend):
+            if _is_full_scan(step, backend):
+                found.append((name, step))
+    return found
+
+
+def main(argv):
+    from lib.database import Database
+
+    Database.initialize()
+    backend = Database.backend_name()
+    conn = Database.get_connection(readonly=False)
+    try:
+        if '--check' not in argv:
+            if backend == 'mysql':
+                migrate(conn)
+            else:
+                print(f"{backend}: schema comes from database/sqlite_schema.sql, no migrations to run")
+        cursor = conn.cursor()
+        try:
+            scans = full_scans(cursor, backend)
+        finally:
+            cursor.close()
+    finally:
+        conn.close()
+    for name, step in scans:
+        print(f"✗ Full scan in hot query '{name}': {step}")
+    if not scans:
+        print("✓ Hot queries use indexes")
+    return 1 if scans else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
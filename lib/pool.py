@@ -0,0 +1,260 @@
+# lib/pool.py
+"""
+Connection pool used by lib.database.Database
+
+Keeps up to `pool_size` idle connections, opens up to `max_overflow` extra
+connections under load, and makes callers wait (bounded queue + timeout)
+instead of failing as soon as every connection is checked out.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out in time."""
+
+
+class _ConnectionRecord:
+    """A raw connection plus the bookkeeping the pool needs for it."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.checked_out_at = None
+        # Per-connection state that lives as long as the connection does
+        # (e.g. the prepared statement cache)
+        self.info = {}
+
+
+class PooledConnection:
+    """
+    Proxy handed out by ConnectionPool.checkout().
+
+    Behaves like the underlying driver connection, except that close()
+    returns it to the pool. Closing twice is harmless.
+    """
+
+    def __init__(self, pool, record):
+        self._pool = pool
+        self._record = record
+
+    @property
+    def raw(self):
+        if self._record is None:
+            raise RuntimeError("Connection has already been returned to the pool")
+        return self._record.connection
+
+    @property
+    def info(self):
+        if self._record is None:
+            raise RuntimeError("Connection has already been returned to the pool")
+        return self._record.info
+
+    def close(self):
+        record, self._record = self._record, None
+        if record is not None:
+            self._pool._release(record)
+
+    def is_connected(self):
+        if self._record is None:
+            return False
+        return self._pool._ping(self._record.connection)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe connection pool.
+
+    creator     -- callable returning a new driver connection
+    pool_size   -- connections kept open while idle
+    max_overflow -- extra connections allowed above pool_size under load
+    timeout     -- seconds a caller waits for a free connection
+    max_waiters -- callers allowed to queue at once; more fail immediately
+    recycle     -- seconds after which a connection is replaced on checkout (0 = never)
+    pre_ping    -- validate connections on checkout with `ping`
+    ping        -- callable(conn) -> bool, True if the connection is usable
+    reset       -- callable(conn) run when a connection comes back to the pool
+    """
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, timeout=30,
+                 max_waiters=50, recycle=3600, pre_ping=True, ping=None, reset=None):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self._creator = creator
+        self.pool_size = pool_size
+        self.max_overflow = max(0, max_overflow)
+        self.timeout = timeout
+        self.max_waiters = max_waiters
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._ping_fn = ping
+        self._reset_fn = reset
+
+        self._idle = deque()
+        self._size = 0          # open connections, idle + in use
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._created = 0
+        self._recycled = 0
+        self._invalidated = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def checkout(self):
+        """Return a PooledConnection, waiting up to `timeout` seconds for one."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        record = None
+        create = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    record = self._idle.pop()
+                    break
+                if self._size < self.pool_size + self.max_overflow:
+                    self._size += 1
+                    create = True
+                    break
+                if self._waiting >= self.max_waiters:
+                    self._rejected += 1
+                    raise PoolTimeout(
+                        f"Connection pool wait queue is full ({self.max_waiters} waiting)")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No connection available within {self.timeout}s "
+                        f"(size={self._size}, in use={self._in_use})")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            if create:
+                record = self._new_record()
+            else:
+                record = self._validate(record)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        record.checked_out_at = time.monotonic()
+        return PooledConnection(self, record)
+
+    def stats(self):
+        """Snapshot of pool usage counters."""
+        with self._cond:
+            return {
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'rejected': self._rejected,
+                'created': self._created,
+                'recycled': self._recycled,
+                'invalidated': self._invalidated,
+                'wait_time_total': round(self._wait_total, 6),
+                'wait_time_max': round(self._wait_max, 6),
+                'wait_time_avg': round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+            }
+
+    def dispose(self):
+        """Close every idle connection. Checked-out connections close when returned."""
+        with self._cond:
+            records = list(self._idle)
+            self._idle.clear()
+            self._size -= len(records)
+            self._cond.notify_all()
+        for record in records:
+            self._close(record)
+
+    def _new_record(self):
+        record = _ConnectionRecord(self._creator())
+        with self._cond:
+            self._created += 1
+        return record
+
+    def _validate(self, record):
+        """Replace connections that are too old or fail the ping."""
+        if self.recycle and time.monotonic() - record.created_at > self.recycle:
+            self._close(record)
+            with self._cond:
+                self._recycled += 1
+            return self._new_record()
+        if self.pre_ping and not self._ping(record.connection):
+            self._close(record)
+            with self._cond:
+                self._invalidated += 1
+            return self._new_record()
+        return record
+
+    def _ping(self, connection):
+        if self._ping_fn is None:
+            return True
+        try:
+            return bool(self._ping_fn(connection))
+        except Exception:
+            return False
+
+    def _release(self, record):
+        healthy = True
+        if self._reset_fn is not None:
+            try:
+                self._reset_fn(record.connection)
+            except Exception:
+                healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy and len(self._idle) < self.pool_size:
+                record.checked_out_at = None
+                self._idle.append(record)
+                record = None
+            else:
+                self._size -= 1
+                if not healthy:
+                    self._invalidated += 1
+            self._cond.notify()
+
+        # Overflow or broken connection: close it outside the lock
+        if record is not None:
+            self._close(record)
+
+    @staticmethod
+    def _close(record):
+        try:
+            record.connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,166 @@
+# lib/price_series.py
+"""
+Price-history time series for /api/price_history/<id>/series
+
+Changes in a time range are read in changed_at order through the
+(product_id, changed_at) index and folded, as they stream in, into
+fixed-width buckets:
+
+    {'t': bucket start, 'open', 'high', 'low', 'close', 'changes'}
+
+A bucket opens at the price in force when it starts (the previous close,
+or the last change before the range) and buckets without changes are left
+out. When there are more buckets than the requested number of points,
+adjacent buckets are merged into wider ones (a whole multiple of the
+bucket width): open of the first, highest high, lowest low, close of the
+last, changes summed. Every spike stays in some bucket's high or low.
+"""
+
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from config import Config
+from lib.database import Database
+
+# Named bucket widths, in seconds
+BUCKETS = {
+    '1h': 3600,
+    '6h': 6 * 3600,
+    '1d': 86400,
+    '1w': 7 * 86400,
+    '30d': 30 * 86400,
+}
+
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def parse_time(value, default=None):
+    """datetime from an ISO date or date-time string; ValueError if malformed."""
+    if not value:
+        return default
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"'{value}' is not an ISO date or date-time")
+    return parsed.replace(tzinfo=None)
+
+
+def parse_bucket(value):
+    """Bucket width in seconds from a name in BUCKETS or a number of seconds (>= 60)."""
+    value = (value or '1d').strip()
+    if value in BUCKETS:
+        return BUCKETS[value]
+    if not value.isdigit() or int(value) < 60:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)} or at least 60 seconds")
+    return int(value)
+
+
+def _as_datetime(value):
+    # SQLite hands timestamps back as text
+    return datetime.strptime(value, _TIME_FORMAT) if isinstance(value, str) else value
+
+
+def _ceil_second(value):
+    # Stored timestamps have whole seconds: 12:00:00.4 must still take in 12:00:00
+    return value.replace(microsecond=0) + timedelta(seconds=1) if value.microsecond else value
+
+
+def merge_buckets(buckets, origin, width, factor):
+    """Buckets (with 'slot') merged `factor` at a time onto a grid of width * factor."""
+    wide = width * factor
+    merged, current = [], None
+    for b in buckets:
+        slot = origin + (b['slot'] - origin) // wide * wide
+        if current is None or current['slot'] != slot:
+            current = dict(b, slot=slot)
+            merged.append(current)
+            continue
+        current['high'] = max(current['high'], b['high'])
+        current['low'] = min(current['low'], b['low'])
+        current['close'] = b['close']
+        current['changes'] += b['changes']
+    return merged
+
+
+def downsample(buckets, origin, width, points):
+    """
+    (buckets, width) with at most `points` buckets, merging by the smallest
+    factor of the width that gets there.
+    """
+    if len(buckets) <= points:
+        return buckets, width
+    span = buckets[-1]['slot'] - origin
+    low, high = -(-len(buckets) // points), int(span // width) // points + 1
+    while low < high:
+        factor = (low + high) // 2
+        if len(merge_buckets(buckets, origin, width, factor)) <= points:
+            high = factor
+        else:
+            low = factor + 1
+    return merge_buckets(buckets, origin, width, low), width * low
+
+
+def price_series(product_id, start=None, end=None, bucket='1d', points=None):
+    """
+    OHLC buckets of a product's price over [start, end) (default: the last
+    90 days); {'buckets': [...], 'bucket_count': n, 'downsampled': bool, ...}.
+    """
+    end = _ceil_second(parse_time(end, datetime.now()))
+    start = parse_time(start, end - timedelta(days=90))
+    if start >= end:
+        raise ValueError("start must be before end")
+    width = parse_bucket(bucket)
+    points = Config.PRICE_SERIES_POINTS if points is None else points
+    if not 3 <= points <= Config.PRICE_SERIES_MAX_POINTS:
+        raise ValueError(f"points must be between 3 and {Config.PRICE_SERIES_MAX_POINTS}")
+
+    # Price in force when the range starts: one index seek backwards
+    before = Database.execute_query("""
+        SELECT new_price FROM price_history
+        WHERE product_id = %s AND changed_at < %s
+        ORDER BY changed_at DESC LIMIT 1
+    """, (product_id, start.strftime(_TIME_FORMAT)))
+    price = before[0]['new_price'] if before else None
+
+    stream = Database.stream("""
+        SELECT changed_at, old_price, new_price FROM price_history
+        WHERE product_id = %s AND changed_at >= %s AND changed_at < %s
+        ORDER BY changed_at, id
+    """, (product_id, start.strftime(_TIME_FORMAT), end.strftime(_TIME_FORMAT)),
+        chunk_size=Config.EXPORT_CHUNK_SIZE)
+
+    origin = start.timestamp()
+    buckets, current = [], None
+    with closing(stream) as rows:
+        for row in rows:
+            at = _as_datetime(row['changed_at']).timestamp()
+            slot = origin + (at - origin) // width * width
+            new = float(row['new_price'])
+            if current is None or current['slot'] != slot:
+                # The first change ever has no old price: open at the new one
+                opening = float(next((p for p in (price, row['old_price']) if p is not None), new))
+                current = {'slot': slot, 'open': opening, 'high': opening, 'low': opening,
+                           'close': opening, 'changes': 0}
+                buckets.append(current)
+            current['high'] = max(current['high'], new)
+            current['low'] = min(current['low'], new)
+            current['close'] = new
+            current['changes'] += 1
+            price = row['new_price']
+
+    count = len(buckets)
+    downsampled = count > points
+    buckets, width = downsample(buckets, origin, width, points)
+    for b in buckets:
+        b['t'] = datetime.fromtimestamp(b.pop('slot')).isoformat()
+
+    return {
+        'product_id': product_id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'bucket_seconds': width,
+        'opening_price': float(before[0]['new_price']) if before else None,
+        'buckets': buckets,
+        'bucket_count': count,
+        'downsampled': downsampled,
+    }
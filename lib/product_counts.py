@@ -0,0 +1,65 @@
+# lib/product_counts.py
+"""
+Product totals per (category, is_deleted) for the /products page numbers
+
+The product_counts table is kept current by triggers on products (see
+lib/migrations.py and database/sqlite_schema.sql): inserts, deletes and any
+update that moves a product to another category or in/out of the recycle
+bin adjust the two affected rows inside the writer's own transaction, so
+the totals can never disagree with a committed catalog. Products without a
+category are counted under category_id 0. MySQL does not fire triggers
+for foreign-key actions, so after deleting a category run rebuild().
+
+A search has no precomputed total; it gets a count capped at
+PRODUCT_COUNT_CAP matches, flagged as an estimate when the cap is hit.
+"""
+
+from config import Config
+from lib.database import Database
+
+
+class ProductCounts:
+    @staticmethod
+    def total(is_deleted=0, category=None):
+        """Products in the list view (optionally one category by name); None if unavailable."""
+        query = """
+            SELECT COALESCE(SUM(pc.total), 0) AS total
+            FROM product_counts pc
+            JOIN categories c ON pc.category_id = c.id
+            WHERE pc.is_deleted = %s
+        """
+        params = [is_deleted]
+        if category:
+            query += " AND c.name = %s"
+            params.append(category)
+        try:
+            return int(Database.execute_query(query, params, prepared=True)[0]['total'])
+        except Exception as e:
+            if Database.is_missing_table(e):
+                return None  # db_setup.py not run yet
+            raise
+
+    @staticmethod
+    def capped(from_where, params, cap=None):
+        """
+        (count, estimated) for `SELECT ... <from_where>`, counting at most
+        `cap` rows; estimated is True when there may be more.
+        """
+        cap = cap or Config.PRODUCT_COUNT_CAP
+        rows = Database.execute_query(
+            f"SELECT COUNT(*) AS total FROM (SELECT 1 {from_where} LIMIT %s) capped",
+            list(params) + [cap + 1], prepared=True)
+        count = rows[0]['total']
+        return (cap, True) if count > cap else (count, False)
+
+    @staticmethod
+    def rebuild():
+        """Recount everything from products (e.g. after a bulk load with triggers off)."""
+        with Database.transaction() as cursor:
+            cursor.execute("DELETE FROM product_counts")
+            cursor.execute("""
+                INSERT INTO product_counts (category_id, is_deleted, total)
+                SELECT COALESCE(category_id, 0), COALESCE(is_deleted, 0), COUNT(*)
+                FROM products
+                GROUP BY COALESCE(category_id, 0), COALESCE(is_deleted, 0)
+            """)
@@ -0,0 +1,136 @@
+# lib/product_export.py
+"""
+Streaming catalog export for /products/export (CSV or NDJSON)
+
+Rows are read through Database.stream() and encoded one chunk at a time,
+so the response starts at once and memory use doesn't grow with the
+catalog. Columns are the list view's (LIST_COLUMNS); a single-category
+export can add that category's specification columns, read from each
+product's product_specifications document.
+"""
+
+import csv
+import io
+import json
+
+from config import Config
+from lib.category_cache import category_cache
+from lib.database import Database
+from lib.product_search import LIST_COLUMNS, select_list
+from lib.product_specs import load_specs
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def spec_columns(category):
+    """Specification attributes of a category name's form; [] if it has none."""
+    found = category_cache.by_name(category)
+    if not found:
+        raise ValueError(f"Unknown category: {category}")
+    return [col['Field'] for col in category_cache.spec_columns(found['name'])]
+
+
+def export_query(category=None, deleted='0', specs=False):
+    """
+    (query, params, column names) for an export.
+    deleted: '0' active products, '1' the recycle bin, 'all' both.
+    With specs, rows carry the specs document; expand them with with_specs().
+    """
+    if deleted not in ('0', '1', 'all'):
+        raise ValueError("deleted must be 0, 1 or all")
+    if specs and not category:
+        raise ValueError("Specification columns need a category")
+
+    columns = [*LIST_COLUMNS]
+    select = select_list()
+    joins = " JOIN categories c ON p.category_id = c.id"
+    if specs:
+        extra = [col for col in spec_columns(category) if col not in LIST_COLUMNS]
+        if extra:
+            select += ", ps.specs AS specs"
+            joins += " LEFT JOIN product_specifications ps ON ps.product_id = p.id"
+            columns += extra
+
+    where, params = [], []
+    if deleted != 'all':
+        where.append("p.is_deleted = %s")
+        params.append(int(deleted))
+    if category:
+        where.append("c.name = %s")
+        params.append(category)
+    query = f"SELECT {select} FROM products p{joins}"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    return query + " ORDER BY p.id", params, columns
+
+
+def _close(rows):
+    # Closing a generator runs its finally blocks (Database.stream returns
+    # its connection there)
+    if hasattr(rows, 'close'):
+        rows.close()
+
+
+def with_specs(rows):
+    """Rows with their specs document spread into columns."""
+    try:
+        for row in rows:
+            if 'specs' in row:
+                specs = load_specs(row.pop('specs'))
+                row.update((k, v) for k, v in specs.items() if k not in LIST_COLUMNS)
+            yield row
+    finally:
+        _close(rows)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def csv_lines(rows, columns, chunk_size=None):
+    """CSV text (header first) for `rows`, one string per chunk of rows."""
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        for chunk in _chunks(rows, chunk_size or Config.EXPORT_CHUNK_SIZE):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([row.get(col) for col in columns] for row in chunk)
+            yield buffer.getvalue()
+    finally:
+        _close(rows)
+
+
+def ndjson_lines(rows, columns, chunk_size=None):
+    """One JSON object per line for `rows`, one string per chunk of rows."""
+    try:
+        for chunk in _chunks(rows, chunk_size or Config.EXPORT_CHUNK_SIZE):
+            yield ''.join(json.dumps({col: row.get(col) for col in columns}, default=str) + '\n'
+                          for row in chunk)
+    finally:
+        _close(rows)
+
+
+def export(fmt, category=None, deleted='0', specs=False):
+    """
+    Generator of response text for an export; ValueError on bad options.
+    Close it if it may not be read to the end (rows are read lazily).
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    query, params, columns = export_query(category, deleted, specs)
+    rows = with_specs(Database.stream(query, params, chunk_size=Config.EXPORT_CHUNK_SIZE))
+    encode = csv_lines if fmt == 'csv' else ndjson_lines
+    return encode(rows, columns)
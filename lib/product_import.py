@@ -0,0 +1,197 @@
+# lib/product_import.py
+"""
+Bulk product import from CSV
+
+    category,description,brand,unit_price,quantity_in_stock,min_stock_level,wattage,...
+
+One streaming pass over the upload: each row is validated as it is read
+(category names resolved from the category cache) and valid rows
+are queued; every IMPORT_BATCH_SIZE rows the queue is written in one
+transaction: an INSERT per product (so each new id is read back from its
+own statement) plus one multi-row INSERT into product_specifications. Columns beyond the product ones are specification
+fields, checked against the row's category's schema
+({category}_specifications).
+
+Invalid rows are skipped and reported by line number; a batch the database
+rejects is rolled back and reported as a whole. Nothing is held in memory
+but the current batch and the error report (capped at IMPORT_MAX_ERRORS).
+"""
+
+import csv
+import io
+import time
+from decimal import Decimal, InvalidOperation
+
+from config import Config
+from lib.category_cache import category_cache, spec_table
+from lib.database import Database
+from lib.product_specs import save_specs
+from lib.signals import products_changed
+
+PRODUCT_FIELDS = ('category_id', 'description', 'brand', 'unit_price', 'quantity_in_stock',
+                  'min_stock_level')
+REQUIRED_COLUMNS = ('category', 'description', 'brand', 'unit_price', 'quantity_in_stock')
+
+_NUMERIC_TYPES = ('decimal', 'numeric', 'int', 'tinyint', 'smallint', 'mediumint', 'bigint',
+                  'float', 'double', 'real')
+
+
+def _number(value, integer=False):
+    """Decimal/int from a CSV cell, None if empty; ValueError if it isn't a number."""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"'{value}' is not a number")
+    if not number.is_finite():
+        raise ValueError(f"'{value}' is not a number")
+    if integer:
+        if number != number.to_integral_value():
+            raise ValueError(f"'{value}' is not a whole number")
+        return int(number)
+    return number
+
+
+class ProductImport:
+    def __init__(self, batch_size=None, max_errors=None, dry_run=False):
+        self.batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+        self.max_errors = max_errors or Config.IMPORT_MAX_ERRORS
+        self.dry_run = dry_run
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.errors_truncated = False
+        self._categories = {}    # lowercased name -> (id, spec table)
+        self._spec_columns = {}  # spec table -> {column: numeric?}
+        self._batch = []         # (line, product values, spec values)
+
+    # --- setup ----------------------------------------------------------------
+
+    def _load_categories(self, spec_fields):
+        for category in category_cache.categories():
+            table = spec_table(category['name'])
+            self._categories[category['name'].lower()] = (category['id'], table)
+            if spec_fields:
+                self._spec_columns[table] = {
+                    col['Field']: col['Type'].lower().startswith(_NUMERIC_TYPES)
+                    for col in category_cache.spec_columns(category['name'])}
+
+    # --- validation -----------------------------------------------------------
+
+    def _error(self, failed, **entry):
+        self.failed += failed
+        if len(self.errors) < self.max_errors:
+            self.errors.append(entry)
+        else:
+            self.errors_truncated = True
+
+    def _parse(self, row, spec_fields):
+        """(product values, spec values) for a CSV row; ValueError if invalid."""
+        problems = []
+        category = self._categories.get((row.get('category') or '').strip().lower())
+        if category is None:
+            problems.append(f"unknown category '{(row.get('category') or '').strip()}'")
+        description = (row.get('description') or '').strip()
+        if not description:
+            problems.append("description is required")
+        brand = (row.get('brand') or '').strip()
+
+        numbers = {}
+        for field, integer, required in (('unit_price', False, True),
+                                         ('quantity_in_stock', True, True),
+                                         ('min_stock_level', True, False)):
+            try:
+                numbers[field] = _number(row.get(field), integer)
+            except ValueError as e:
+                problems.append(f"{field}: {e}")
+                continue
+            if numbers[field] is None and required:
+                problems.append(f"{field} is required")
+            elif numbers[field] is not None and numbers[field] < 0:
+                problems.append(f"{field} can't be negative")
+
+        specs = {}
+        if category is not None:
+            columns = self._spec_columns.get(category[1], {})
+            for field in spec_fields:
+                value = (row.get(field) or '').strip()
+                if not value:
+                    continue
+                if field not in columns:
+                    problems.append(f"'{field}' is not a specification of {row['category'].strip()}")
+                    continue
+                try:
+                    specs[field] = _number(value) if columns[field] else value
+                except ValueError as e:
+                    problems.append(f"{field}: {e}")
+
+        if problems:
+            raise ValueError('; '.join(problems))
+        return ((category[0], description, brand or None, numbers['unit_price'],
+                 numbers['quantity_in_stock'], numbers['min_stock_level']), specs)
+
+    # --- writing --------------------------------------------------------------
+
+    def _flush(self):
+        batch, self._batch = self._batch, []
+        if not batch or self.dry_run:
+            self.imported += len(batch)
+            return
+        try:
+            with Database.transaction(dictionary=False) as cursor:
+                # Ids of a multi-row INSERT needn't be consecutive (e.g. with
+                # innodb_autoinc_lock_mode=2 and concurrent inserts), so each
+                # row gets its own statement; the batch still commits once
+                query = (f"INSERT INTO products ({', '.join(PRODUCT_FIELDS)}) "
+                         f"VALUES ({', '.join(['%s'] * len(PRODUCT_FIELDS))})")
+                ids = []
+                for _, values, _ in batch:
+                    cursor.execute(query, values)
+                    ids.append(cursor.lastrowid)
+
+                save_specs(cursor, [(product_id, specs)
+                                    for product_id, (_, _, specs) in zip(ids, batch) if specs])
+        except Exception as e:
+            self._error(len(batch), rows=[batch[0][0], batch[-1][0]], error=str(e))
+            return
+        self.imported += len(batch)
+        products_changed.send('import', product_ids=ids, action='import')
+
+    # --- entry point ----------------------------------------------------------
+
+    def run(self, stream):
+        """Import a CSV file object (bytes or text); returns the report dict."""
+        started = time.perf_counter()
+        if not isinstance(stream, io.TextIOBase):
+            stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        reader = csv.DictReader(stream)
+        if not reader.fieldnames:
+            raise ValueError("The file is empty")
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+        missing = [name for name in REQUIRED_COLUMNS if name not in reader.fieldnames]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+        spec_fields = [name for name in reader.fieldnames
+                       if name and name not in REQUIRED_COLUMNS and name not in PRODUCT_FIELDS]
+        self._load_categories(spec_fields)
+
+        for row in reader:
+            try:
+                self._batch.append((reader.line_num, *self._parse(row, spec_fields)))
+            except ValueError as e:
+                self._error(1, row=reader.line_num, error=str(e))
+                continue
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+        self._flush()
+
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.errors_truncated,
+            'dry_run': self.dry_run,
+            'seconds': round(time.perf_counter() - started, 3),
+        }
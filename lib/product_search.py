@@ -0,0 +1,150 @@
+# lib/product_search.py
+"""
+Search predicates for the /products list
+
+'fulltext' mode matches through MySQL FULLTEXT indexes (see lib/migrations.py):
+ft_products_text on (brand, description) and ft_products_brand on (brand),
+ranked by relevance. Every word of the search box becomes a required
+prefix term of a boolean-mode query:
+
+    "havells 9w led"  ->  +havells* +led*
+
+Words shorter than FULLTEXT_MIN_TOKEN are not in the index: mixed with
+longer words, each must still appear as a substring (a LIKE next to the
+MATCH, so "led 9w" doesn't widen to "led"); a search made only of short
+words (and every search on SQLite) falls back to LIKE.
+Brand filtering without a usable term is a prefix LIKE on idx_products_brand.
+'like' mode keeps the original substring match.
+
+Pages of the AJAX list are addressed by opaque cursors (encode_cursor /
+decode_cursor): URL-safe base64 of a small JSON position.
+
+Rows are selected through LIST_COLUMNS, the columns the table view shows,
+rather than p.*; the AJAX list can narrow them further with ?fields=.
+"""
+
+import base64
+import json
+import re
+
+from config import Config
+from lib.database import Database
+
+SEARCH_MODES = ('fulltext', 'like')
+
+_WORDS = re.compile(r"\w+", re.U)
+
+# Columns of the /products list: field name -> select expression
+LIST_COLUMNS = {
+    'id': 'p.id',
+    'category': 'c.name',
+    'description': 'p.description',
+    'brand': 'p.brand',
+    'unit_price': 'p.unit_price',
+    'quantity_in_stock': 'p.quantity_in_stock',
+    'min_stock_level': 'p.min_stock_level',
+    'is_deleted': 'p.is_deleted',
+}
+
+
+def boolean_query(search):
+    """Boolean-mode AGAINST() string for `search`, or None if no word is indexable."""
+    terms = [w.lower() for w in _WORDS.findall(search) if len(w) >= Config.FULLTEXT_MIN_TOKEN]
+    if not terms:
+        return None
+    return ' '.join(f'+{term}*' for term in dict.fromkeys(terms))
+
+
+def short_words(search):
+    """Distinct words of `search` too short for the FULLTEXT index."""
+    return [*dict.fromkeys(w.lower() for w in _WORDS.findall(search)
+                           if len(w) < Config.FULLTEXT_MIN_TOKEN)]
+
+
+def _like(text, filter_type):
+    if filter_type == 'brand':
+        return "p.brand LIKE %s", [f"%{text}%"]
+    return "(p.description LIKE %s OR p.brand LIKE %s)", [f"%{text}%", f"%{text}%"]
+
+
+def search_filter(search, filter_type=None, mode=None):
+    """
+    SQL for the search box as a dict:
+        where, params   -- predicate to AND into the WHERE clause
+        rank, rank_params -- select expression for relevance, or None
+        mode            -- 'fulltext' or 'like', whichever was actually used
+    """
+    mode = mode if mode in SEARCH_MODES else Config.PRODUCT_SEARCH_MODE
+    against = boolean_query(search) if mode == 'fulltext' and Database.backend_name() == 'mysql' else None
+
+    if against is not None:
+        columns = 'p.brand' if filter_type == 'brand' else 'p.brand, p.description'
+        match = f"MATCH({columns}) AGAINST(%s IN BOOLEAN MODE)"
+        where, params = match, [against]
+        for word in short_words(search):
+            like, like_params = _like(word, filter_type)
+            where += " AND " + like
+            params += like_params
+        return {'where': f"({where})", 'params': params,
+                'rank': match, 'rank_params': [against], 'mode': 'fulltext'}
+
+    if filter_type == 'brand':
+        # Brands are searched from their first letter: a prefix LIKE can use
+        # idx_products_brand, a leading wildcard can't
+        pattern = f"{search}%" if mode == 'fulltext' else f"%{search}%"
+        where, params = "p.brand LIKE %s", [pattern]
+    else:
+        where, params = _like(search, filter_type)
+    return {'where': where, 'params': params, 'rank': None, 'rank_params': [], 'mode': 'like'}
+
+
+def list_fields(spec):
+    """Field names for `?fields=a,b` (id is always included); ValueError on unknown names."""
+    if not spec:
+        return tuple(LIST_COLUMNS)
+    fields = [f.strip() for f in spec.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in LIST_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return tuple(dict.fromkeys(['id'] + fields))
+
+
+def select_list(fields=None):
+    """SELECT list for `fields` (default: all LIST_COLUMNS)."""
+    return ', '.join(f"{LIST_COLUMNS[f]} AS {f}" for f in fields or LIST_COLUMNS)
+
+
+def is_missing_fulltext_index(exc):
+    """MySQL 1191: no FULLTEXT index matches the MATCH() column list."""
+    return getattr(exc, 'errno', None) == 1191
+
+
+# Fields a cursor position may carry: (type, minimum for ints)
+CURSOR_FIELDS = {
+    'after': (int, 0), 'before': (int, 0), 'offset': (int, 0), 'total': (int, 0),
+    'page': (int, 1), 'estimated': (bool, None), 'fuzzy': (bool, None),
+}
+
+
+def encode_cursor(position):
+    """Opaque, URL-safe token for a list position (a small dict)."""
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Position dict from a cursor token; ValueError if it isn't one of ours."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict) or not position.keys() <= CURSOR_FIELDS.keys():
+        raise ValueError("Invalid cursor")
+    for name, value in position.items():
+        kind, low = CURSOR_FIELDS[name]
+        # bool is an int subclass; keep flags and counts apart
+        if type(value) is not kind or kind is int and value < low:
+            raise ValueError("Invalid cursor")
+    if 'after' in position and 'before' in position:
+        raise ValueError("Invalid cursor")
+    return position
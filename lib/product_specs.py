@@ -0,0 +1,100 @@
+# lib/product_specs.py
+"""
+Product specifications in one table, as JSON
+
+    product_specifications (product_id PK, specs JSON,
+                            wattage, amp_rating, voltage_rating)
+
+`specs` holds every attribute of a product ({"wattage": 9, "color_temperature":
+"6500K"}), whatever its category. The attributes most often filtered on are
+generated (virtual) columns extracted from the JSON, each with its own index,
+so they can be range-queried across categories:
+
+    SELECT product_id FROM product_specifications WHERE wattage BETWEEN 5 AND 12
+
+The per-category {category}_specifications tables remain the schema of each
+category's form (see lib/category_cache.py); lib/migrations.py and
+database/sqlite_schema.sql copy their existing rows into this table.
+"""
+
+import json
+from decimal import Decimal, InvalidOperation
+
+from lib.database import Database
+
+# Attributes with a generated, indexed column
+INDEXED_SPECS = ('wattage', 'amp_rating', 'voltage_rating')
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _indexed_value(value):
+    # Indexed columns only pick up JSON numbers: store "9" from a form as 9
+    if isinstance(value, str):
+        try:
+            number = Decimal(value.strip())
+        except InvalidOperation:
+            return value
+        return _json_value(number) if number.is_finite() else value
+    return value
+
+
+def dump_specs(specs):
+    """JSON text for a specs dict (empty values dropped, Decimals as numbers)."""
+    specs = {k: _indexed_value(v) if k in INDEXED_SPECS else v
+             for k, v in specs.items() if v not in (None, '')}
+    return json.dumps(specs, default=_json_value, sort_keys=True)
+
+
+def load_specs(doc):
+    """Specs dict from a specs column value (JSON text, or already decoded)."""
+    if doc is None:
+        return {}
+    return json.loads(doc) if isinstance(doc, (str, bytes)) else doc
+
+
+def save_specs(cursor, rows):
+    """Store [(product_id, specs dict)] on `cursor`, replacing earlier specs."""
+    rows = [(product_id, dump_specs(specs)) for product_id, specs in rows]
+    if rows:
+        cursor.executemany(
+            "REPLACE INTO product_specifications (product_id, specs) VALUES (%s, %s)", rows)
+
+
+def get_specs(product_id):
+    """One product's specs ({} if none); a primary-key lookup."""
+    rows = Database.execute_query(
+        "SELECT specs FROM product_specifications WHERE product_id = %s", (product_id,),
+        prepared=True)
+    return load_specs(rows[0]['specs']) if rows else {}
+
+
+def find_products(ranges, limit=100):
+    """
+    Ids of products whose indexed specs fall in `ranges`, a dict of
+    attribute -> (min, max) with either end None for open.
+    """
+    where, params = [], []
+    for attribute, (low, high) in ranges.items():
+        if attribute not in INDEXED_SPECS:
+            raise ValueError(f"Not an indexed specification: {attribute}")
+        if low is not None:
+            where.append(f"ps.{attribute} >= %s")
+            params.append(low)
+        if high is not None:
+            where.append(f"ps.{attribute} <= %s")
+            params.append(high)
+    if not where:
+        raise ValueError("Give at least one specification range")
+    rows = Database.execute_query(f"""
+        SELECT ps.product_id FROM product_specifications ps
+        JOIN products p ON p.id = ps.product_id
+        WHERE p.is_deleted = 0 AND {' AND '.join(where)}
+        ORDER BY ps.product_id
+        LIMIT %s
+    """, params + [limit])
+    return [row['product_id'] for row in rows]
@@ -454,59 +454,63 @@ def add_category():
             '''
 from flask import Blueprint, render_template, request, flash, redirect, url_for
 from flask_login import login_required
+from config import Config
 from lib.database import Database
+from lib.product_counts import ProductCounts
+from lib.product_export import export, EXPORT_FORMATS
+from lib.product_import import ProductImport
+from lib.bulk_ops import run_bulk
+from lib.stock_take import apply_stock_take
+from lib.price_series import price_series
+from lib.product_specs import INDEXED_SPECS, get_specs, save_specs, find_products
+from lib.product_search import (search_filter, is_missing_fulltext_index, encode_cursor, decode_cursor,
+                                list_fields, select_list)
+from lib.search_index import product_index
+from lib.brand_index import brand_index
+from lib.facet_index import facet_index, bits
+from lib.category_cache import category_cache
+from lib.search_cache import search_cache, normalize_query
+from lib.signals import products_changed, categories_changed
 from flask import jsonify
 from flask_login import current_user
-import mysql.connector
-from flask import current_app
+from flask import current_app, session
+from functools import wraps
+from contextlib import closing
+from itertools import islice
 
 products_bp = Blueprint('products', __name__)
 @products_bp.route('/landing_search')
+@Database.replica_reads
 def landing_search():
     query = request.args.get('q', '').strip()
     limit = request.args.get('limit', 10, type=int)
-    conn = None
-    cursor = None
+    mode = request.args.get('mode')
 
     if not query or len(query) < 2:
         return jsonify(results=[])
 
+    key = search_cache.key('landing', normalize_query(query), limit, mode)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return jsonify(results=cached)
+
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
+        # Product suggestions come from the in-memory trigram index
+        # (same matching and ordering as the old LIKE ... ORDER BY query)
+        results = [] if mode == 'fuzzy' else product_index.search(query, limit)
+        fuzzy = not results and len(query) >= 3
+        if fuzzy:
+            # Nothing contains the text as typed: try near-matches ("havels")
+            results = product_index.fuzzy_search(query, limit)
         
-        # Fetch product suggestions
-        cursor.execute("""
-            SELECT 
-                p.id,
-                p.brand,
-                p.description,
-                p.unit_price as price,
-                p.quantity_in_stock as stock,
-                c.name as category
-            FROM products p
-            JOIN categories c ON p.category_id = c.id
-            WHERE p.is_deleted = 0
-            AND (p.description LIKE %s OR p.brand LIKE %s)
-            ORDER BY 
-                CASE 
-                    WHEN p.quantity_in_stock > 0 THEN 0 
-                    ELSE 1 
-                END,
-                p.description ASC
-            LIMIT %s
-        """, [f"%{query}%", f"%{query}%", limit])
-        results = cursor.fetchall()
-        
-        # Fetch brand suggestions
-        cursor.execute("SELECT DISTINCT brand FROM products WHERE brand LIKE %s LIMIT %s", 
-                      [f"%{query}%", limit])
-        brand_results = cursor.fetchall()
+        # Brand suggestions come from the in-memory brand dictionary
+        brand_results = brand_index.suggest(query, limit)
         
         # Combine and format suggestions
-        brand_suggestions = [{'brand': b['brand'], 'type': 'brand', 'description': None} 
+        brand_suggestions = [{'brand': b['brand'], 'type': 'brand', 'description': None,
+                              'products': b['products']}
                            for b in brand_results]
-        product_suggestions = [{**p, 'type': 'product'} for p in results]
+        product_suggestions = [{**p, 'type': 'product', 'fuzzy': fuzzy} for p in results]
         
         # Ensure price is float in product suggestions
         for item in product_suggestions:
@@ -516,94 +520,129 @@ def landing_search():
                 except (ValueError, TypeError):
                     item['price'] = 0.0  # Default value for invalid prices
         
-        all_suggestions = brand_suggestions + product_suggestions
-        return jsonify(results=all_suggestions[:limit])
+        all_suggestions = (brand_suggestions + product_suggestions)[:limit]
+        search_cache.set(key, all_suggestions)
+        return jsonify(results=all_suggestions)
 
     except Exception as e:
         return jsonify(error=str(e)), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+
+
+def _list_parts():
+    """
+    What a /products page is identified by besides the catalog version: its
+    normalized arguments. ValueError for a malformed ?cursor= or ?fields=.
+    """
+    args = request.args
+    view_deleted = args.get('view_deleted', 0, type=int)
+    cursor_token = args.get('cursor')
+    if cursor_token:
+        decode_cursor(cursor_token)
+    facets = _spec_filters(args) if not view_deleted else {}
+    return ('list', normalize_query(args.get('search')), args.get('filter_type'),
+            args.get('category', '').strip(), cursor_token or args.get('page', 1, type=int),
+            view_deleted, args.get('search_mode'), list_fields(args.get('fields')),
+            tuple((k, tuple(v)) for k, v in sorted(facets.items())))
+
+
+def _list_validators():
+    """
+    (etag, last_modified) of the /products response asked for, from the
+    session and query string alone; None when it can't be answered 304:
+    nobody logged in (login_required redirects), a flashed message waiting
+    to be shown, or malformed arguments.
+    """
+    user_id = session.get('_user_id')
+    if user_id is None or '_flashes' in session:
+        return None
+    try:
+        parts = _list_parts()
+    except ValueError:
+        return None
+    ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    # The HTML page's header names the user
+    return search_cache.validators('json' if ajax else 'html', user_id, *parts)
+
+
+def _conditional_list(view):
+    """
+    Answer a current If-None-Match / If-Modified-Since with 304 before
+    login_required loads the user from the database, and send the
+    validators with every 200 (the HTML page as well as the JSON).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Taken before the page is computed, so a page computed during a
+        # write goes out with the old ETag and is replaced on the next poll
+        validators = _list_validators()
+        if validators and _not_modified(*validators):
+            return _with_validators(current_app.response_class(status=304), *validators)
+        response = current_app.make_response(current_app.ensure_sync(view)(*args, **kwargs))
+        if validators and response.status_code == 200:
+            _with_validators(response, *validators)
+        return response
+    return wrapper
 
 
 @products_bp.route('/products')
+@Database.replica_reads
+@_conditional_list
 @login_required
 def list():
     view_deleted = request.args.get('view_deleted', 0, type=int)
-    search = request.args.get('search', '').strip()
+    search = ' '.join(request.args.get('search', '').split())
     category = request.args.get('category', '').strip()
     filter_type = request.args.get('filter_type')
+    search_mode = request.args.get('search_mode')
     page = request.args.get('page', 1, type=int)
+    cursor_token = request.args.get('cursor')
+    # Specification facets (?spec.wattage=9&spec.wattage=12); the index only
+    # holds active products, so they don't apply to the recycle bin
+    facets = _spec_filters(request.args) if not view_deleted else {}
     per_page = 20
     
+    # If it's an AJAX request, return JSON (cached until the next catalog write)
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        try:
+            position = decode_cursor(cursor_token) if cursor_token else None
+            fields = list_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        key = search_cache.key(*_list_parts())
+        payload = search_cache.get(key)
+        if payload is None:
+            try:
+                result = _search_products(view_deleted, search, category, filter_type,
+                                          search_mode, page, per_page, position, fields, facets)
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+            payload = {
+                'products': result['products'],
+                'current_page': result['page'],
+                'total_pages': (result['total'] + per_page - 1) // per_page,
+                'total_products': result['total'],
+                'total_estimated': result['estimated'],
+                'search_mode': result['search_mode'],
+                'next': encode_cursor(result['next']) if result['next'] else None,
+                'prev': encode_cursor(result['prev']) if result['prev'] else None
+            }
+            search_cache.set(key, payload)
+        return jsonify(payload)
+    
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Base count query
-        count_query = """
-            SELECT COUNT(*) as total 
-            FROM products p 
-            JOIN categories c ON p.category_id = c.id
-            WHERE p.is_deleted = %s
-        """
-        params = [view_deleted]
-        
-        # Base data query
-        data_query = """
-            SELECT p.*, c.name as category 
-            FROM products p 
-            JOIN categories c ON p.category_id = c.id
-            WHERE p.is_deleted = %s
-        """
-        
-        # Add filters
-        if search:
-            if filter_type == 'brand':
-                count_query += " AND p.brand LIKE %s"
-                data_query += " AND p.brand LIKE %s"
-                params.append(f"%{search}%")
-            else: # Default or product search
-                count_query += " AND (p.description LIKE %s OR p.brand LIKE %s)"
-                data_query += " AND (p.description LIKE %s OR p.brand LIKE %s)"
-                params.extend([f"%{search}%", f"%{search}%"])
-
-        if category:
-            count_query += " AND c.name = %s"
-            data_query += " AND c.name = %s"
-            params.append(category)
-        
-        # Get total count
-        cursor.execute(count_query, params)
-        total = cursor.fetchone()['total']
+        result = _search_products(view_deleted, search, category, filter_type,
+                                  search_mode, page, per_page, facets=facets)
+        products, total = result['products'], result['total']
         total_pages = (total + per_page - 1) // per_page
         
-        # Get paginated data
-        data_query += " LIMIT %s OFFSET %s"
-        cursor.execute(data_query, params + [per_page, (page - 1) * per_page])
-        products = cursor.fetchall()
-        
-        # Get categories for filter dropdown
-        cursor.execute("SELECT name FROM categories")
-        categories = [c['name'] for c in cursor.fetchall()]
+        # Categories for the filter dropdown
+        categories = [c['name'] for c in category_cache.categories()]
+        # Facet values of the chosen category, with product counts
+        facet_counts = facet_index.counts(category, facets) if category and not view_deleted else {}
     
     except Exception as e:
         flash(f'Database error: {str(e)}', 'danger')
         return redirect(url_for('products.list'))
-    finally:
-        if conn and conn.is_connected():
-            conn.close()
-
-    # If it's an AJAX request, return JSON
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({
-            'products': products,
-            'current_page': page,
-            'total_pages': total_pages,
-            'total_products': total
-        })
-
     
     return render_template('products/list.html',
         products=products,
@@ -613,9 +652,299 @@ def list():
         category_filter=category,
         current_page=page,
         total_pages=total_pages,
-        total_products=total
+        total_products=total,
+        facet_counts=facet_counts,
+        spec_filters=facets,
+        spec_args={f'spec.{k}': v for k, v in facets.items()}
     )
 
+
+def _spec_filters(args):
+    """{attribute: [values]} from spec.<attribute> query arguments."""
+    facets = {}
+    for key, values in args.lists():
+        values = [v for v in values if v.strip()]
+        if key.startswith('spec.') and len(key) > 5 and values:
+            facets[key[5:]] = values
+    return facets
+
+
+def _not_modified(etag, last_modified):
+    """True if the client's copy, per If-None-Match / If-Modified-Since, is current."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return since is not None and since.timestamp() >= int(last_modified)
+
+
+def _with_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Let the browser keep the page but ask again every time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _search_products(view_deleted, search, category, filter_type, search_mode, page, per_page,
+                     position=None, fields=None, facets=None):
+    """
+    A page of the product list as a dict: products, total, page, search_mode
+    (the one actually used) and next/prev positions for cursors.
+    `position` is a decoded cursor; without one, `page` is used. `fields`
+    narrows the columns selected (default: all of LIST_COLUMNS). `facets`
+    ({attribute: [values]}) keeps the products the facet index matches.
+    """
+    allowed = facet_index.match(category or None, facets) if facets else None
+    offset_mode = position is not None and 'offset' in position
+    if search and not view_deleted and (search_mode == 'fuzzy' or offset_mode and position.get('fuzzy')):
+        return _fuzzy_page(search, category, page, per_page, position, fields, allowed)
+    try:
+        result = _list_page(view_deleted, search, category, filter_type, search_mode, page, per_page,
+                            position, fields, allowed)
+    except Exception as e:
+        if not is_missing_fulltext_index(e):
+            raise
+        # FULLTEXT indexes not created yet (run db_setup.py): use LIKE
+        result = _list_page(view_deleted, search, category, filter_type, 'like', page, per_page,
+                            position, fields, allowed)
+    if search and not result['total'] and not view_deleted and position is None and page == 1:
+        # No exact match: show near-matches instead of an empty page
+        fuzzy = _fuzzy_page(search, category, page, per_page, fields=fields, allowed=allowed)
+        if fuzzy['total']:
+            return fuzzy
+    return result
+
+
+def _offset_positions(offset, total, page, per_page, **extra):
+    """next/prev positions for a list paged by offset."""
+    next_pos = dict(extra, offset=offset + per_page, total=total, page=page + 1) \
+        if offset + per_page < total or extra.get('estimated') else None
+    prev_pos = dict(extra, offset=max(offset - per_page, 0), total=total, page=max(page - 1, 1)) \
+        if offset > 0 else None
+    return next_pos, prev_pos
+
+
+def _fuzzy_page(search, category, page, per_page, position=None, fields=None, allowed=None):
+    """A page of typo-tolerant matches, ranked by the search index."""
+    matches = product_index.fuzzy_search(search, Config.FUZZY_MAX_RESULTS, category=category or None)
+    if allowed is not None:
+        matches = [m for m in matches if allowed >> m['id'] & 1]
+    if position is not None and 'offset' in position:
+        offset, page = position['offset'], position.get('page', page)
+    else:
+        offset = (page - 1) * per_page
+    total = len(matches)
+    next_pos, prev_pos = _offset_positions(offset, total, page, per_page, fuzzy=True)
+    result = {'products': [], 'total': total, 'estimated': False, 'page': page,
+              'search_mode': 'fuzzy', 'next': next_pos, 'prev': prev_pos}
+    
+    # The index only ranks; the rows themselves come from the database
+    result['products'] = _rows_by_id([m['id'] for m in matches[offset:offset + per_page]], fields)
+    return result
+
+
+def _rows_by_id(ids, fields=None):
+    """List rows of a page's product ids, in the order given."""
+    if not ids:
+        return []
+    placeholders = ', '.join(['%s'] * len(ids))
+    rows = Database.execute_query(f"""
+        SELECT {select_list(fields)}
+        FROM products p 
+        JOIN categories c ON p.category_id = c.id
+        WHERE p.id IN ({placeholders})
+    """, ids)
+    by_id = {row['id']: row for row in rows}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def _faceted_search_page(from_where, params, rank, rank_params, search_mode, page, per_page,
+                         position, fields, allowed):
+    """
+    A page of search matches that are also in the facet bitmap `allowed`.
+    The ids of the matches stream in, in list order, and are intersected
+    with the bitmap here; only the page's ids go back to the database.
+    """
+    select = "SELECT p.id" + (f", {rank} AS relevance" if rank else "")
+    order = " ORDER BY relevance DESC, p.id" if rank else " ORDER BY p.id"
+    stream = Database.stream(select + from_where + order, rank_params + params,
+                             chunk_size=Config.EXPORT_CHUNK_SIZE)
+    with closing(stream) as rows:
+        matches = [row['id'] for row in rows if allowed >> row['id'] & 1]
+    if 'offset' in position:
+        offset, page = position['offset'], position.get('page', page)
+    else:
+        offset = (page - 1) * per_page
+    total = len(matches)
+    next_pos, prev_pos = _offset_positions(offset, total, page, per_page)
+    return {'products': _rows_by_id(matches[offset:offset + per_page], fields), 'total': total,
+            'estimated': False, 'page': page, 'search_mode': search_mode,
+            'next': next_pos, 'prev': prev_pos}
+
+
+def _list_page(view_deleted, search, category, filter_type, search_mode, page, per_page, position=None,
+               fields=None, allowed=None):
+    """
+    One page of the product list.
+    
+    Unranked lists are ordered by p.id and paged by keyset: a cursor holds
+    the last (or first) id seen, so any page costs an index range read of
+    per_page + 1 rows, however deep it is. The total is looked up once, on
+    the first request, and carried along in the cursors: from product_counts
+    for an unfiltered list, as a capped estimate for a search. Relevance-ranked
+    FULLTEXT results have no stable key to seek on and page by offset.
+    
+    `allowed` is a facet bitmap of product ids. Without a search its
+    popcount is the exact total and only the ids of the page's window are
+    sent to the database.
+    """
+    where = " WHERE p.is_deleted = %s"
+    params = [view_deleted]
+    rank, rank_params = None, []
+    
+    # Add filters
+    if search:
+        clause = search_filter(search, filter_type, search_mode)
+        where += " AND " + clause['where']
+        params.extend(clause['params'])
+        rank, rank_params = clause['rank'], clause['rank_params']
+        search_mode = clause['mode']
+
+    if category:
+        where += " AND c.name = %s"
+        params.append(category)
+    
+    position = position or {}
+    if allowed is not None and search:
+        # Intersected in memory rather than sent as an IN list of every
+        # product the facets match
+        return _faceted_search_page("""
+        FROM products p 
+        JOIN categories c ON p.category_id = c.id""" + where, params, rank, rank_params,
+                                    search_mode, page, per_page, position, fields, allowed)
+    total = position.get('total')
+    page = position.get('page', page)
+    backwards = position.get('before') is not None
+    
+    if allowed is not None:
+        if backwards:
+            ids = [*islice(bits(allowed, before=position['before']), per_page + 1)]
+        elif 'after' in position:
+            ids = [*islice(bits(allowed, after=position['after']), per_page + 1)]
+        else:
+            offset = (page - 1) * per_page
+            ids = [*islice(bits(allowed), offset, offset + per_page + 1)]
+        where += f" AND p.id IN ({', '.join(['%s'] * len(ids))})" if ids else " AND 1 = 0"
+        params.extend(ids)
+        if total is None:
+            total = allowed.bit_count()
+    
+    from_where = """
+        FROM products p 
+        JOIN categories c ON p.category_id = c.id""" + where
+    estimated = position.get('estimated', False)
+    if total is None:
+        total = ProductCounts.total(view_deleted, category) if not search else None
+        if total is None:
+            total, estimated = ProductCounts.capped(from_where, params)
+    
+    select = "SELECT " + select_list(fields)
+    if rank:
+        select += f", {rank} AS relevance"
+    data_query = select + from_where
+    query_params = rank_params + params
+    
+    if rank:
+        offset = position.get('offset', (page - 1) * per_page)
+        data_query += " ORDER BY relevance DESC, p.id LIMIT %s OFFSET %s"
+        query_params += [per_page + 1, offset]
+    elif 'after' in position or backwards:
+        offset = None
+        if backwards:
+            data_query += " AND p.id < %s ORDER BY p.id DESC LIMIT %s"
+            query_params += [position['before'], per_page + 1]
+        else:
+            data_query += " AND p.id > %s ORDER BY p.id LIMIT %s"
+            query_params += [position['after'], per_page + 1]
+    else:
+        # Numbered page links (the HTML view): plain offset, unless the
+        # facet ids are already this page's window
+        offset = (page - 1) * per_page if allowed is None else 0
+        data_query += " ORDER BY p.id LIMIT %s OFFSET %s"
+        query_params += [per_page + 1, offset]
+    
+    # Hot query: run it as a prepared statement
+    products = Database.execute_query(data_query, query_params, prepared=True)
+    more = len(products) > per_page
+    products = products[:per_page]
+    if backwards:
+        products.reverse()
+    
+    for product in products:
+        product.pop('relevance', None)
+    
+    result = {'products': products, 'total': total, 'estimated': estimated, 'page': page,
+              'search_mode': search_mode, 'next': None, 'prev': None}
+    if rank:
+        result['next'], result['prev'] = _offset_positions(offset, total, page, per_page,
+                                                           estimated=estimated)
+        result['next'] = result['next'] if more else None
+    elif products:
+        has_next = more if not backwards else True
+        has_prev = more if backwards else (page > 1)
+        if has_next:
+            result['next'] = {'after': products[-1]['id'], 'total': total, 'estimated': estimated,
+                              'page': page + 1}
+        if has_prev:
+            result['prev'] = {'before': products[0]['id'], 'total': total, 'estimated': estimated,
+                              'page': max(page - 1, 1)}
+    return result
+
+@products_bp.route('/products/export', defaults={'fmt': 'csv'})
+@products_bp.route('/products/export.<any(csv, ndjson):fmt>')
+@Database.replica_reads
+@login_required
+def export_products(fmt):
+    """Whole catalog (or one category) as a streamed CSV / NDJSON download."""
+    category = request.args.get('category', '').strip() or None
+    deleted = request.args.get('deleted', '0')
+    specs = request.args.get('specs', 0, type=int) == 1
+    try:
+        lines = export(fmt, category, deleted, specs)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    filename = f"products{'-' + category if category else ''}.{fmt}"
+    response = current_app.response_class(lines, mimetype=EXPORT_FORMATS[fmt])
+    # A HEAD request or a client gone mid-download never finishes the body:
+    # closing it returns the streaming connection to the pool
+    response.call_on_close(lines.close)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@products_bp.route('/products/import', methods=['POST'])
+@login_required
+def import_products():
+    """Bulk-add products from an uploaded CSV; returns a row-level error report."""
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+    if not upload.filename.lower().endswith('.csv'):
+        return jsonify({'success': False, 'error': 'Upload a .csv file'}), 400
+    
+    try:
+        report = ProductImport(dry_run=request.form.get('dry_run', 0, type=int) == 1).run(upload.stream)
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify(success=True, **report)
+
+
 # In products.py - keep only this one update_price route
 @products_bp.route('/update_price/<int:product_id>', methods=['POST'])
 @login_required
@@ -624,161 +953,177 @@ def update_price(product_id):
     if not data or 'quantity' not in data:
         return jsonify({'success': False, 'error': 'Invalid data'}), 400
     
-    conn = Database.get_connection()
-    cursor = conn.cursor()
     try:
-        # Get current price first if you need to log changes
-        cursor.execute("SELECT unit_price FROM products WHERE id = %s", (product_id,))
-        old_price = cursor.fetchone()[0]
-        
-        # Update quantity
-        cursor.execute("""
-            UPDATE products 
-            SET quantity_in_stock = %s 
-            WHERE id = %s
-        """, (data['quantity'], product_id))
-        
-        # If you also need to update price:
-        if 'price' in data:
+        with Database.transaction(dictionary=False) as cursor:
+            # Get current price first if you need to log changes
+            cursor.execute("SELECT unit_price FROM products WHERE id = %s", (product_id,))
+            old_price = cursor.fetchone()[0]
+            
+            # Update quantity
             cursor.execute("""
                 UPDATE products 
-                SET unit_price = %s 
+                SET quantity_in_stock = %s 
                 WHERE id = %s
-            """, (data['price'], product_id))
+            """, (data['quantity'], product_id))
             
-            # Log price change
-            cursor.execute("""
-                INSERT INTO price_history 
-                (product_id, old_price, new_price, changed_by, source)
-                VALUES (%s, %s, %s, %s, 'manual')
-            """, (product_id, old_price, data['price'], current_user.id))
+            # If you also need to update price:
+            if 'price' in data:
+                cursor.execute("""
+                    UPDATE products 
+                    SET unit_price = %s 
+                    WHERE id = %s
+                """, (data['price'], product_id))
+                
+                # Log price change
+                cursor.execute("""
+                    INSERT INTO price_history 
+                    (product_id, old_price, new_price, changed_by, source)
+                    VALUES (%s, %s, %s, %s, 'manual')
+                """, (product_id, old_price, data['price'], current_user.id))
         
-        conn.commit()
+        products_changed.send('products', product_ids=[product_id], action='price')
         return jsonify({'success': True})
     except Exception as e:
-        conn.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @products_bp.route('/products/add', methods=['GET', 'POST'])
 @login_required
 def add():
     if request.method == 'POST':
         try:
-            conn = Database.get_connection()
-            cursor = conn.cursor()
-            
-            # Insert product
-            cursor.execute("""
-                INSERT INTO products 
-                (category_id, description, brand, unit_price, quantity_in_stock) 
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
-                request.form['category_id'],
-                request.form['description'],
-                request.form['brand'],
-                request.form['unit_price'],
-                request.form['quantity_in_stock']
-            ))
-            
-            product_id = cursor.lastrowid
-            
-            # Handle specifications
-            category_name = request.form.get('category_name')
-            if category_name:
-                # Your original spec handling logic here
-                pass
+            # The product and its specifications are stored together or not at all
+            with Database.transaction() as cursor:
+                cursor.execute("""
+                    INSERT INTO products 
+                    (category_id, description, brand, unit_price, quantity_in_stock) 
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (
+                    request.form['category_id'],
+                    request.form['description'],
+                    request.form['brand'],
+                    request.form['unit_price'],
+                    request.form['quantity_in_stock']
+                ))
+                
+                product_id = cursor.lastrowid
+                
+                # Specifications: the category's fields plus any custom ones
+                specs = _form_specs(request.form)
+                specs.update(zip(request.form.getlist('custom_spec_name[]'),
+                                 request.form.getlist('custom_spec_value[]')))
+                specs.pop('', None)
+                save_specs(cursor, [(product_id, specs)])
             
-            conn.commit()
+            products_changed.send('products', product_ids=[product_id], action='add')
             flash('Product added successfully!', 'success')
             return redirect(url_for('products.list'))
             
         except Exception as e:
-            conn.rollback()
             flash(f'Error adding product: {str(e)}', 'danger')
-        finally:
-            conn.close()
     
     # GET request
-    conn = Database.get_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM categories")
-    categories = cursor.fetchall()
-    conn.close()
+    categories = category_cache.categories()
     
     return render_template('products/add.html', categories=categories)
 
 @products_bp.route('/products/edit/<int:product_id>', methods=['GET', 'POST'])
 @login_required
 def edit(product_id):
-    # ... existing edit code ...
-    conn = Database.get_connection()
-    cursor = conn.cursor(dictionary=True)
-    
     if request.method == 'POST':
         try:
-            cursor.execute("""
-                UPDATE products SET
-                description = %s,
-                brand = %s,
-                unit_price = %s,
-                quantity_in_stock = %s
-                WHERE id = %s
-            """, (
-                request.form['description'],
-                request.form['brand'],
-                request.form['unit_price'],
-                request.form['quantity_in_stock'],
-                product_id
-            ))
+            with Database.transaction() as cursor:
+                cursor.execute("""
+                    UPDATE products SET
+                    description = %s,
+                    brand = %s,
+                    unit_price = %s,
+                    quantity_in_stock = %s
+                    WHERE id = %s
+                """, (
+                    request.form['description'],
+                    request.form['brand'],
+                    request.form['unit_price'],
+                    request.form['quantity_in_stock'],
+                    product_id
+                ))
+                # Edited specifications replace the stored ones, custom ones kept
+                specs = _form_specs(request.form)
+                if specs:
+                    save_specs(cursor, [(product_id, {**get_specs(product_id), **specs})])
             
-            conn.commit()
+            products_changed.send('products', product_ids=[product_id], action='edit')
             flash('Product updated!', 'success')
             return redirect(url_for('products.list'))
         except Exception as e:
-            conn.rollback()
             flash(f'Update failed: {str(e)}', 'danger')
-        finally:
-            conn.close()
     
     # GET request
-    cursor.execute("SELECT * FROM products WHERE id = %s", (product_id,))
-    product = cursor.fetchone()
-    conn.close()
+    with Database.cursor(readonly=False) as cursor:
+        cursor.execute("SELECT * FROM products WHERE id = %s", (product_id,))
+        product = cursor.fetchone()
     
     if not product:
         flash('Product not found', 'danger')
         return redirect(url_for('products.list'))
     
-    return render_template('products/edit.html', product=product)
+    specifications = [{'name': f'spec_{name}', 'label': name.replace('_', ' ').title(), 'value': value}
+                      for name, value in sorted(get_specs(product_id).items())]
+    return render_template('products/edit.html', product=product, specifications=specifications)
+
+
+def _form_specs(form):
+    """{attribute: value} from the spec_<attribute> fields of a product form."""
+    return {key[len('spec_'):]: value for key, value in form.items() if key.startswith('spec_')}
 
 @products_bp.route('/delete_product/<int:product_id>', methods=['POST'])
 @login_required
 def delete(product_id):
-    conn = Database.get_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE products SET is_deleted = 1 WHERE id = %s", (product_id,))
-    conn.commit()
-    conn.close()
+    Database.execute_query("UPDATE products SET is_deleted = 1 WHERE id = %s", (product_id,), fetch=False)
+    products_changed.send('products', product_ids=[product_id], action='delete')
     return redirect(url_for('products.list'))
 
 @products_bp.route('/restore_product/<int:product_id>', methods=['POST'])
 @login_required
 def restore(product_id):
-    conn = Database.get_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE products SET is_deleted = 0 WHERE id = %s", (product_id,))
-    conn.commit()
-    conn.close()
+    Database.execute_query("UPDATE products SET is_deleted = 0 WHERE id = %s", (product_id,), fetch=False)
+    products_changed.send('products', product_ids=[product_id], action='restore')
     return redirect(url_for('products.list'))
 
+@products_bp.route('/products/bulk', methods=['POST'])
+@login_required
+def bulk():
+    """
+    One operation on many products:
+        {"operation": "set_price", "ids": [1, 2, 3], "value": "99.50"}
+    operation: delete, restore, set_category, set_price, change_price_pct, set_quantity
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        result = run_bulk(data.get('operation'), data.get('ids'), data.get('value'),
+                          user_id=current_user.id)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify(success=True, **result)
+
+@products_bp.route('/bulk_delete', methods=['POST'])
+@login_required
+def bulk_delete():
+    data = request.get_json(silent=True) or {}
+    try:
+        result = run_bulk('delete', data.get('ids'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify(success=True, **result)
+
 @products_bp.route('/api/price_history/<int:product_id>')
+@Database.replica_reads
 @login_required
 def price_history(product_id):
-    conn = Database.get_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
+    history = Database.execute_query("""
         SELECT ph.*, u.username 
         FROM price_history ph
         LEFT JOIN users u ON ph.changed_by = u.id
@@ -786,56 +1131,94 @@ def price_history(product_id):
         ORDER BY changed_at DESC
         LIMIT 50
     """, (product_id,))
-    history = cursor.fetchall()
-    conn.close()
     return jsonify(history)  # Make sure to return jsonify
 
 
 
+@products_bp.route('/api/price_history/<int:product_id>/series')
+@Database.replica_reads
+@login_required
+def price_history_series(product_id):
+    """OHLC buckets of a product's price, e.g. ?start=2024-01-01&bucket=1w&points=200"""
+    try:
+        return jsonify(price_series(product_id, request.args.get('start'), request.args.get('end'),
+                                    request.args.get('bucket'), request.args.get('points', type=int)))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+
 @products_bp.route('/get_specifications')
+@Database.replica_reads
 @login_required
 def get_specifications():
-    category_id = request.args.get('category_id')
+    category_id = request.args.get('category_id', type=int)
     if not category_id:
         return jsonify({'error': 'Missing category_id'}), 400
     
-    conn = None
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Get category name
-        cursor.execute("SELECT name FROM categories WHERE id = %s", (category_id,))
-        category = cursor.fetchone()
+        category = category_cache.get(category_id)
         if not category:
             return jsonify({'error': 'Category not found'}), 404
         
-        # Get specifications for this category
-        spec_table = f"{category['name'].lower()}_specifications"
+        # Specifications for this category ([] if it has no spec table)
+        specs = []
+        for col in category_cache.spec_columns(category['name']):
+            specs.append({
+                'name': col['Field'],
+                'label': col['Field'].replace('_', ' ').title(),
+                'required': True
+            })
         
-        try:
-            cursor.execute(f"SHOW COLUMNS FROM {spec_table}")
-            columns = [col['Field'] for col in cursor.fetchall() if col['Field'] != 'id']
-            
-            specs = []
-            for col in columns:
-                specs.append({
-                    'name': col,
-                    'label': col.replace('_', ' ').title(),
-                    'required': True
-                })
-            
-            return jsonify(specs)
-        except mysql.connector.Error as e:
-            if e.errno == 1146:  # Table doesn't exist
-                return jsonify([])  # No specifications for this category
-            raise
+        return jsonify(specs)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        if conn and conn.is_connected():
-            conn.close()
+
+@products_bp.route('/api/products/<int:product_id>/specifications')
+@Database.replica_reads
+@login_required
+def product_specifications(product_id):
+    try:
+        return jsonify(get_specs(product_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/api/products/by_spec')
+@Database.replica_reads
+@login_required
+def products_by_spec():
+    """Products by indexed specification ranges, e.g. ?wattage_min=5&wattage_max=12"""
+    try:
+        ranges = {}
+        for attribute in INDEXED_SPECS:
+            low = request.args.get(f'{attribute}_min', type=float)
+            high = request.args.get(f'{attribute}_max', type=float)
+            if low is not None or high is not None:
+                ranges[attribute] = (low, high)
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        return jsonify(product_ids=find_products(ranges, limit=limit))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@products_bp.route('/api/products/facets')
+@login_required
+def product_facets():
+    """Facet values of a category with product counts, e.g. ?category=tubelights&spec.wattage=9"""
+    category = request.args.get('category', '').strip()
+    if not category_cache.by_name(category):
+        return jsonify({'success': False, 'error': f'Unknown category: {category}'}), 400
+    try:
+        facets = _spec_filters(request.args)
+        allowed = facet_index.match(category, facets) if facets else None
+        return jsonify(category=category, facets=facet_index.counts(category, facets),
+                       total=allowed.bit_count() if allowed is not None else None)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 @products_bp.route('/update_quantity/<int:product_id>', methods=['POST'])
 @login_required
@@ -895,8 +1278,8 @@ def update_quantity(product_id):
                 (product_id, field_changed, old_value, new_value, changed_by)
                 VALUES (%s, 'quantity_in_stock', %s, %s, %s)
             """, (product_id, current_qty, quantity, current_user.id))
-        except mysql.connector.Error as e:
-            if e.errno == 1146:  # Table doesn't exist
+        except Exception as e:
+            if Database.is_missing_table(e):
                 pass  # Skip logging if table doesn't exist
             else:
                 raise  # Re-raise other errors
@@ -909,11 +1292,12 @@ def update_quantity(product_id):
                     (product_id, current_quantity, min_quantity, alerted_by)
                     VALUES (%s, %s, %s, %s)
                 """, (product_id, quantity, product['min_stock_level'], current_user.id))
-            except mysql.connector.Error as e:
-                if e.errno != 1146:  # Ignore if table doesn't exist
+            except Exception as e:
+                if not Database.is_missing_table(e):  # Ignore if table doesn't exist
                     raise
         
         conn.commit()
+        products_changed.send('products', product_ids=[product_id], action='quantity')
         
         return jsonify({
             'success': True,
@@ -936,6 +1320,21 @@ def update_quantity(product_id):
 
 
 
+@products_bp.route('/products/stock_take', methods=['POST'])
+@login_required
+def stock_take():
+    """Apply a batch of counted quantities / deltas; safe to retry with the same batch_key."""
+    data = request.get_json(silent=True) or {}
+    try:
+        result = apply_stock_take(data.get('batch_key'), data.get('items'), user_id=current_user.id)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error applying stock take: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify(success=True, **result)
+
+
 @products_bp.route('/add_category', methods=['POST'])
 @login_required
 def add_category():
@@ -971,6 +1370,7 @@ def add_category():
                 return jsonify({'success': False, 'error': f'Failed to create specs table: {str(e)}'}), 500
         
         conn.commit()
+        categories_changed.send('products', category_id=category_id)
         return jsonify({'success': True, 'id': category_id, 'name': data['name']})
         
     except Exception as e:
@@ -0,0 +1,173 @@
+# lib/query_log.py
+"""
+Query instrumentation for lib.database
+
+Every cursor handed out inside an app context is wrapped so each statement
+is timed and recorded with its normalized text ("shape"), row count and the
+endpoint that ran it. On top of that:
+
+- statements slower than DB_SLOW_QUERY_MS go to the 'inventory.slow_query' log
+- a request that runs the same shape more than DB_N_PLUS_ONE_THRESHOLD times
+  is reported as a likely N+1 on the 'inventory.query' log
+- per-(endpoint, shape) totals are kept for /admin/db_stats
+- extra hooks can be registered with QueryLog.add_hook(fn)
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+from flask import g, has_request_context, request
+from config import Config
+
+logger = logging.getLogger('inventory.query')
+slow_logger = logging.getLogger('inventory.slow_query')
+
+_COMMENTS = re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.S)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%s|\?")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUE_ROWS = re.compile(r"(\(\?\+\))(?:\s*,\s*\(\?\+\))+")
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(query):
+    """Reduce a statement to its shape: literals and placeholder lists become '?'."""
+    shape = _STRINGS.sub('?', query)
+    shape = _COMMENTS.sub(' ', shape)
+    shape = _NUMBERS.sub('?', shape)
+    shape = _PLACEHOLDERS.sub('?', shape)
+    shape = _LISTS.sub('(?+)', shape)
+    shape = _VALUE_ROWS.sub(r'\1, ...', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+class InstrumentedCursor:
+    """Cursor proxy that reports every execute() to QueryLog."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=()):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, params)
+        finally:
+            QueryLog.record(query, time.perf_counter() - started, self._cursor.rowcount)
+
+    def executemany(self, query, seq_params):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, seq_params)
+        finally:
+            QueryLog.record(query, time.perf_counter() - started, self._cursor.rowcount)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class QueryLog:
+    _hooks = []
+    _totals = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def init_app(cls, app):
+        app.after_request(cls._add_timing_header)
+        app.teardown_request(cls._check_request)
+
+    @classmethod
+    def enabled(cls):
+        return Config.DB_QUERY_LOG_ENABLED
+
+    @classmethod
+    def wrap(cls, cursor):
+        return InstrumentedCursor(cursor) if cls.enabled() else cursor
+
+    @classmethod
+    def add_hook(cls, fn):
+        """fn(event) is called after every statement; event is a dict."""
+        cls._hooks.append(fn)
+
+    @classmethod
+    def record(cls, query, duration, rows):
+        shape = normalize_sql(query)
+        endpoint = request.endpoint if has_request_context() else None
+        duration_ms = duration * 1000
+
+        if has_request_context():
+            g._db_query_count = g.get('_db_query_count', 0) + 1
+            g._db_query_ms = g.get('_db_query_ms', 0.0) + duration_ms
+            shapes = g.get('_db_query_shapes')
+            if shapes is None:
+                shapes = g._db_query_shapes = Counter()
+            shapes[shape] += 1
+
+        with cls._lock:
+            key = (endpoint, shape)
+            total = cls._totals.get(key)
+            if total is None:
+                if len(cls._totals) >= Config.DB_QUERY_STATS_MAX:
+                    total = None
+                else:
+                    total = cls._totals[key] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0}
+            if total is not None:
+                total['calls'] += 1
+                total['total_ms'] += duration_ms
+                total['max_ms'] = max(total['max_ms'], duration_ms)
+                total['rows'] += max(rows or 0, 0)
+
+        if duration_ms >= Config.DB_SLOW_QUERY_MS:
+            slow_logger.warning("%.1fms rows=%s endpoint=%s sql=%s", duration_ms, rows, endpoint, shape)
+
+        if cls._hooks:
+            event = {'sql': query, 'shape': shape, 'duration_ms': duration_ms,
+                     'rows': rows, 'endpoint': endpoint}
+            for hook in cls._hooks:
+                hook(event)
+
+    @classmethod
+    def stats(cls, top=20):
+        """Most expensive (endpoint, statement shape) pairs by total time."""
+        with cls._lock:
+            items = [dict(endpoint=endpoint, sql=shape, **total)
+                     for (endpoint, shape), total in cls._totals.items()]
+        items.sort(key=lambda item: item['total_ms'], reverse=True)
+        for item in items:
+            item['avg_ms'] = round(item['total_ms'] / item['calls'], 3)
+            item['total_ms'] = round(item['total_ms'], 3)
+            item['max_ms'] = round(item['max_ms'], 3)
+        return items[:top]
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._totals.clear()
+
+    @classmethod
+    def _add_timing_header(cls, response):
+        count = g.get('_db_query_count')
+        if count and Config.DB_QUERY_HEADERS:
+            response.headers['Server-Timing'] = (
+                f'db;dur={g.get("_db_query_ms", 0.0):.1f};desc="{count} queries"')
+        return response
+
+    @classmethod
+    def _check_request(cls, exc=None):
+        shapes = g.get('_db_query_shapes')
+        if not shapes:
+            return
+        threshold = Config.DB_N_PLUS_ONE_THRESHOLD
+        for shape, count in shapes.most_common():
+            if count <= threshold:
+                break
+            logger.warning("Possible N+1 on %s: %d executions of %s",
+                           request.endpoint, count, shape)
@@ -0,0 +1,120 @@
+# lib/search_cache.py
+"""
+Result cache for landing_search and the AJAX /products list
+
+Bounded LRU with a TTL. Every key carries the catalog version, a counter
+bumped by each products_changed signal (product add/edit/delete/restore,
+quantity and price updates, catalog price imports), so a write invalidates
+everything cached before it, and a result computed concurrently with a
+write is stored under the old version, where nobody will look it up.
+
+The version is per process. Writes made by other worker processes are
+picked up when entries expire after SEARCH_CACHE_TTL seconds.
+
+validators() turns the same version into ETag/Last-Modified values, so a
+polling client can be answered 304 Not Modified without touching the
+database.
+"""
+
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from config import Config
+from lib.signals import products_changed
+
+
+def normalize_query(text):
+    """Case- and whitespace-insensitive form of a search box value."""
+    return ' '.join((text or '').lower().split())
+
+
+class SearchCache:
+    def __init__(self, maxsize=2048, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._version = 0
+        self._changed_at = time.time()
+        self._instance = uuid.uuid4().hex   # versions restart at 0 in every process
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.maxsize = Config.SEARCH_CACHE_SIZE
+        self.ttl = Config.SEARCH_CACHE_TTL
+        products_changed.connect(self._on_products_changed, weak=False)
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def changed_at(self):
+        """Wall-clock time of the last catalog write seen by this process."""
+        return self._changed_at
+
+    def bump(self):
+        with self._lock:
+            self._version += 1
+            self._changed_at = time.time()
+            self._entries.clear()
+
+    def _on_products_changed(self, sender, **extra):
+        self.bump()
+
+    def key(self, *parts):
+        return (self._version,) + parts
+
+    def validators(self, *parts):
+        """
+        (etag, last_modified) for a result identified by `parts`. They change
+        with every write this process sees and, at the latest, every `ttl`
+        seconds, the same bound within which cached results notice writes
+        made by other processes.
+        """
+        window = int(time.time() // self.ttl) if self.ttl > 0 else 0
+        tag = repr((self._instance, self._version, window) + parts)
+        last_modified = max(self._changed_at, window * self.ttl)
+        return hashlib.sha1(tag.encode()).hexdigest()[:24], last_modified
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        if self.maxsize <= 0 or key[0] != self._version:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def cached(self, key, compute):
+        """Value for `key`, calling compute() on a miss. None results aren't cached."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {'version': self._version, 'size': len(self._entries),
+                    'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+search_cache = SearchCache()
@@ -0,0 +1,389 @@
+# lib/search_index.py
+"""
+In-process trigram index for landing_search
+
+Answers `description LIKE %q% OR brand LIKE %q%` over non-deleted products
+without touching MySQL. Every trigram of a product's lowercased description
+and brand maps to the set of product ids containing it; a query intersects
+the posting sets of its own trigrams and only verifies the survivors.
+Results are ranked like the SQL it replaces: in-stock first, then by
+description. Products are also kept in that order, so broad queries (and
+two-letter ones, which have no trigram) walk the ordered list and stop
+after `limit` hits instead of sorting a large candidate set.
+
+fuzzy_search() tolerates typos ("havels", "tubelite"): every distinct word
+of the catalog goes into a symmetric-deletion dictionary (lib.fuzzy), each
+query word is expanded to the catalog words within a few edits of it, and
+products must contain an expansion of every query word.
+
+The index is built at startup, patched on every products_changed signal,
+and rebuilt in the background every SEARCH_INDEX_REFRESH seconds so edits
+made by other worker processes show up too.
+"""
+
+import bisect
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+from config import Config
+from lib.database import Database
+from lib.fuzzy import DeletionIndex
+from lib.signals import products_changed
+
+logger = logging.getLogger('inventory.search_index')
+
+PRODUCT_ROWS_QUERY = """
+    SELECT p.id, p.brand, p.description, p.unit_price, p.quantity_in_stock, c.name AS category
+    FROM products p
+    JOIN categories c ON p.category_id = c.id
+    WHERE p.is_deleted = 0
+"""
+
+
+# Above this many trigram candidates, walking the ranked list is cheaper
+# than verifying and sorting every candidate
+_WALK_FACTOR = 50
+
+
+_WORDS = re.compile(r"\w+", re.U)
+
+
+def max_typos(term):
+    """Edits allowed for a query word: none for 1-2 letters or numbers, then 1, then 2."""
+    if len(term) <= 2 or not term.isalpha():
+        return 0
+    return min(1 if len(term) <= 4 else 2, Config.FUZZY_MAX_DISTANCE)
+
+
+def trigrams(text):
+    """All trigrams of `text` (already lowercased)."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _Doc:
+    __slots__ = ('id', 'brand', 'description', 'price', 'stock', 'category',
+                 'brand_lc', 'description_lc', 'rank')
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.brand = row['brand'] or ''
+        self.description = row['description'] or ''
+        self.price = row['unit_price']
+        self.stock = row['quantity_in_stock'] or 0
+        self.category = row['category']
+        self.brand_lc = self.brand.lower()
+        self.description_lc = self.description.lower()
+        # Same order as: ORDER BY quantity_in_stock > 0 DESC, description
+        self.rank = (0 if self.stock > 0 else 1, self.description_lc, self.id)
+
+    def grams(self):
+        return trigrams(self.description_lc) | trigrams(self.brand_lc)
+
+    def words(self):
+        return set(_WORDS.findall(self.description_lc)) | set(_WORDS.findall(self.brand_lc))
+
+    @property
+    def short(self):
+        """True if a field is too short to have a trigram (e.g. brand 'LG')."""
+        return len(self.description_lc) < 3 or len(self.brand_lc) < 3
+
+    def matches(self, query):
+        return query in self.description_lc or query in self.brand_lc
+
+    def as_result(self):
+        return {
+            'id': self.id,
+            'brand': self.brand,
+            'description': self.description,
+            'price': float(self.price) if self.price is not None else 0.0,
+            'stock': self.stock,
+            'category': self.category,
+        }
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._postings = defaultdict(set)
+        self._order = []        # doc ranks, sorted
+        self._short = set()     # ids with a field shorter than a trigram
+        self._words = defaultdict(set)  # catalog word -> product ids
+        self._vocab = DeletionIndex(max_distance=Config.FUZZY_MAX_DISTANCE)
+        self._built_at = None
+        self._rebuilding = False
+        self._pending = []      # per running build: ids patched while it loads
+
+    # --- building ---------------------------------------------------------
+
+    def init_app(self, app):
+        products_changed.connect(self._on_products_changed, weak=False)
+        with app.app_context():
+            try:
+                self.build()
+            except Exception as e:
+                # DB not reachable yet: build lazily on first search
+                logger.warning("Search index not built at startup: %s", e)
+
+    def build(self, rows=None):
+        """
+        (Re)build from `rows`, or from the database if not given. Products
+        patched while the rows load are re-read once the new index is in.
+        """
+        changed = set()
+        with self._lock:
+            self._pending.append(changed)
+        try:
+            if rows is None:
+                rows = self._load()
+            docs = {}
+            postings = defaultdict(set)
+            short = set()
+            words = defaultdict(set)
+            for row in rows:
+                doc = _Doc(row)
+                docs[doc.id] = doc
+                doc_id = doc.id
+                for gram in doc.grams():
+                    postings[gram].add(doc_id)
+                for word in doc.words():
+                    words[word].add(doc_id)
+                if doc.short:
+                    short.add(doc_id)
+            order = sorted(doc.rank for doc in docs.values())
+            vocab = DeletionIndex(max_distance=Config.FUZZY_MAX_DISTANCE)
+            vocab.update({word: len(ids) for word, ids in words.items()})
+            with self._lock:
+                self._docs = docs
+                self._postings = postings
+                self._order = order
+                self._short = short
+                self._words = words
+                self._vocab = vocab
+                self._built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending.remove(changed)
+        logger.info("Search index built: %d products, %d n-grams", len(docs), len(postings))
+        # The rows may predate these patches, which went to the old index
+        self.refresh(changed)
+
+    @staticmethod
+    def _load():
+        conn = Database.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(PRODUCT_ROWS_QUERY)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run():
+            try:
+                # No app context here: Database hands out a connection of our own
+                self.build()
+            except Exception as e:
+                logger.warning("Search index refresh failed: %s", e)
+            finally:
+                self._rebuilding = False
+        threading.Thread(target=run, name='search-index-refresh', daemon=True).start()
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.build()
+        elif Config.SEARCH_INDEX_REFRESH and time.monotonic() - self._built_at > Config.SEARCH_INDEX_REFRESH:
+            self._rebuild_in_background()
+
+    # --- incremental updates ------------------------------------------------
+
+    def upsert(self, row):
+        doc = _Doc(row)
+        with self._lock:
+            self._drop(doc.id)
+            self._docs[doc.id] = doc
+            bisect.insort(self._order, doc.rank)
+            if doc.short:
+                self._short.add(doc.id)
+            for gram in doc.grams():
+                self._postings[gram].add(doc.id)
+            for word in doc.words():
+                self._words[word].add(doc.id)
+                self._vocab.add(word)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._drop(product_id)
+
+    def _drop(self, product_id):
+        old = self._docs.pop(product_id, None)
+        if old is None:
+            return
+        pos = bisect.bisect_left(self._order, old.rank)
+        if pos < len(self._order) and self._order[pos] == old.rank:
+            del self._order[pos]
+        self._short.discard(product_id)
+        for gram in old.grams():
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self._postings[gram]
+        for word in old.words():
+            ids = self._words.get(word)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self._words[word]
+            self._vocab.discard(word)
+
+    def refresh(self, product_ids):
+        """Re-read the given products from the primary and patch the index."""
+        product_ids = list(product_ids)
+        with self._lock:
+            for changed in self._pending:
+                changed.update(product_ids)
+        if self._built_at is None or not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with Database.cursor(readonly=False) as cursor:
+            cursor.execute(PRODUCT_ROWS_QUERY + f" AND p.id IN ({placeholders})", product_ids)
+            rows = cursor.fetchall()
+        found = {row['id'] for row in rows}
+        for row in rows:
+            self.upsert(row)
+        for product_id in product_ids:
+            if product_id not in found:
+                self.remove(product_id)
+
+    def _on_products_changed(self, sender, product_ids=(), **extra):
+        try:
+            self.refresh(product_ids)
+        except Exception as e:
+            # Never fail the write that triggered us; the periodic rebuild catches up
+            logger.warning("Search index update failed for %s: %s", product_ids, e)
+
+    # --- querying -------------------------------------------------------------
+
+    def _candidate_ids(self, query, cap):
+        """
+        Ids that may contain `query`, or None if there are more than `cap`
+        of them (the caller then walks the ranked list instead).
+        """
+        if len(query) >= 3:
+            postings = [self._postings.get(gram) for gram in trigrams(query)]
+            if not all(postings):
+                return set()
+            postings.sort(key=len)
+            ids = postings[0]
+            for other in postings[1:]:
+                ids = ids & other
+                if not ids:
+                    break
+            return ids if len(ids) <= cap else None
+
+        # Two letters: any trigram containing them, plus the short fields
+        ids = set(self._short)
+        for gram, posting in self._postings.items():
+            if query in gram:
+                ids |= posting
+                if len(ids) > cap:
+                    return None
+        return ids
+
+    def search(self, query, limit=10):
+        """Top `limit` matching products, in-stock first, then by description."""
+        query = query.strip().lower()
+        if len(query) < 2 or limit <= 0:
+            return []
+        self._ensure_fresh()
+        with self._lock:
+            docs = self._docs
+            ids = self._candidate_ids(query, limit * _WALK_FACTOR)
+            if ids is not None:
+                hits = [docs[i] for i in ids if docs[i].matches(query)]
+                hits = heapq.nsmallest(limit, hits, key=lambda d: d.rank)
+            else:
+                hits = []
+                for rank in self._order:
+                    doc_id = rank[-1]
+                    if docs[doc_id].matches(query):
+                        hits.append(docs[doc_id])
+                        if len(hits) == limit:
+                            break
+            return [doc.as_result() for doc in hits]
+
+    def fuzzy_search(self, query, limit=10, category=None):
+        """
+        Products containing every word of `query` give or take a few typos,
+        fewest typos first, then in-stock first and by description. The last
+        word may be unfinished. Each result carries its total 'distance'.
+        """
+        terms = _WORDS.findall(query.lower())
+        if not terms or limit <= 0:
+            return []
+        self._ensure_fresh()
+        with self._lock:
+            # Per query word: typo count -> ids of products containing such a word
+            tiers = []
+            for i, term in enumerate(terms):
+                expansions = self._vocab.lookup(term, max_typos(term), prefix=i == len(terms) - 1)
+                if not expansions:
+                    return []
+                by_distance = defaultdict(set)
+                for word, distance in expansions.items():
+                    by_distance[distance] |= self._words.get(word, set())
+                tiers.append(by_distance)
+
+            # Walk total typo counts upwards; a product belongs to the first
+            # total at which all its words line up
+            results = []
+            seen = set()
+            for total in range(sum(max(tier) for tier in tiers) + 1):
+                ids = set()
+                for combo in itertools.product(*(sorted(tier) for tier in tiers)):
+                    if sum(combo) != total:
+                        continue
+                    sets = sorted((tier[d] for tier, d in zip(tiers, combo)), key=len)
+                    ids |= sets[0].intersection(*sets[1:])
+                ids -= seen
+                if not ids:
+                    continue
+                seen |= ids
+                for doc in self._top(ids, limit - len(results), category):
+                    results.append(dict(doc.as_result(), distance=total))
+                if len(results) >= limit:
+                    break
+            return results
+
+    def _top(self, ids, limit, category=None):
+        """The best-ranked `limit` docs among `ids`."""
+        docs = self._docs
+        if len(ids) <= limit * _WALK_FACTOR:
+            hits = [docs[i] for i in ids if category is None or docs[i].category == category]
+            return heapq.nsmallest(limit, hits, key=lambda d: d.rank)
+        hits = []
+        for rank in self._order:
+            doc_id = rank[-1]
+            if doc_id in ids and (category is None or docs[doc_id].category == category):
+                hits.append(docs[doc_id])
+                if len(hits) == limit:
+                    break
+        return hits
+
+    def __len__(self):
+        return len(self._docs)
+
+
+product_index = ProductSearchIndex()
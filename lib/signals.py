@@ -0,0 +1,28 @@
+# lib/signals.py
+"""
+Catalog change notifications
+
+Routes that write products send `products_changed` after committing;
+in-process indexes and caches subscribe to it to stay current.
+
+    products_changed.send('products', product_ids=[42], action='edit')
+
+action is one of: add, edit, delete, restore, quantity, price, import, bulk
+
+`categories_changed` is sent after a category is added or a specification
+table is created or altered.
+
+    categories_changed.send('products', category_id=7)
+
+`clients_changed` is sent after clients are added or edited.
+
+    clients_changed.send('clients', client_ids=[12])
+"""
+
+from blinker import Namespace
+
+_signals = Namespace()
+
+products_changed = _signals.signal('products-changed')
+categories_changed = _signals.signal('categories-changed')
+clients_changed = _signals.signal('clients-changed')
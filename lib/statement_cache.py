@@ -0,0 +1,56 @@
+# lib/statement_cache.py
+"""
+Per-connection cache of server-side prepared statements
+
+Each pooled connection keeps its own LRU of prepared cursors keyed by SQL
+text, so a hot statement is parsed by MySQL once per connection instead of
+once per call. Evicted cursors are closed, which deallocates the statement
+on the server.
+"""
+
+from collections import OrderedDict
+
+
+class StatementCache:
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._cursors = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def cursor(self, conn, query):
+        """Prepared (dictionary) cursor for `query` on `conn`, reused when cached."""
+        cursor = self._cursors.get(query)
+        if cursor is not None:
+            self._cursors.move_to_end(query)
+            self.hits += 1
+            return cursor
+
+        self.misses += 1
+        cursor = conn.cursor(prepared=True, dictionary=True)
+        self._cursors[query] = cursor
+        if len(self._cursors) > self.maxsize:
+            _, oldest = self._cursors.popitem(last=False)
+            self._close(oldest)
+        return cursor
+
+    def discard(self, query):
+        """Forget a statement, e.g. after it failed or its table changed."""
+        cursor = self._cursors.pop(query, None)
+        if cursor is not None:
+            self._close(cursor)
+
+    def clear(self):
+        while self._cursors:
+            _, cursor = self._cursors.popitem()
+            self._close(cursor)
+
+    def __len__(self):
+        return len(self._cursors)
+
+    @staticmethod
+    def _close(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
@@ -0,0 +1,154 @@
+# lib/stock_take.py
+"""
+Batched stock-take for /products/stock_take
+
+A batch is a list of counted lines, each setting a quantity or adjusting it
+by a delta:
+
+    {"batch_key": "scanner-7-0042",
+     "items": [{"product_id": 12, "quantity": 40}, {"product_id": 13, "delta": -2}]}
+
+Lines for the same product apply in order. The whole batch is one
+transaction with a fixed number of statements: a locking read of the
+products, one UPDATE, and multi-row INSERTs (executemany) for
+inventory_history and stock_alerts.
+
+batch_key makes retries safe: it is claimed inside the same transaction
+(stock_take_batches primary key), and a batch whose key is already taken is
+answered with the stored result of the first run instead of being applied
+again.
+"""
+
+import json
+
+from config import Config
+from lib.database import Database
+from lib.signals import products_changed
+
+
+class BatchReplay(Exception):
+    """The batch key was used before; the first run's result is stored."""
+
+
+def parse_items(items):
+    """[(product_id, 'quantity'|'delta', int)] from the request; ValueError if invalid."""
+    if not isinstance(items, list) or not items:
+        raise ValueError("items must be a non-empty list")
+    if len(items) > Config.STOCK_TAKE_MAX_ITEMS:
+        raise ValueError(f"At most {Config.STOCK_TAKE_MAX_ITEMS} items per batch")
+    lines = []
+    for n, item in enumerate(items, 1):
+        if not isinstance(item, dict) or ('quantity' in item) == ('delta' in item):
+            raise ValueError(f"Item {n}: give product_id and either quantity or delta")
+        kind = 'quantity' if 'quantity' in item else 'delta'
+        try:
+            product_id, value = int(item.get('product_id')), int(item[kind])
+        except (TypeError, ValueError):
+            raise ValueError(f"Item {n}: product_id and {kind} must be integers")
+        if kind == 'quantity' and value < 0:
+            raise ValueError(f"Item {n}: quantity cannot be negative")
+        lines.append((product_id, kind, value))
+    return lines
+
+
+def _stored_result(batch_key):
+    rows = Database.execute_query(
+        "SELECT result_json FROM stock_take_batches WHERE batch_key = %s", (batch_key,))
+    if not rows or rows[0]['result_json'] is None:
+        return None
+    result = rows[0]['result_json']
+    return json.loads(result) if isinstance(result, (str, bytes)) else result
+
+
+def apply_stock_take(batch_key, items, user_id=None):
+    """
+    Apply a batch; returns {'results': {id: {...}}, 'updated': n, 'replayed': bool}.
+    Each result has a status of updated, unchanged, not_found or negative
+    (a delta that would take stock below zero; that product is left alone).
+    """
+    batch_key = (batch_key or '').strip()
+    if not batch_key or len(batch_key) > 64:
+        raise ValueError("batch_key is required (at most 64 characters)")
+    lines = parse_items(items)
+    ids = list(dict.fromkeys(product_id for product_id, _, _ in lines))
+
+    try:
+        with Database.transaction() as cursor:
+            try:
+                cursor.execute("INSERT INTO stock_take_batches (batch_key, created_by) VALUES (%s, %s)",
+                               (batch_key, user_id))
+            except Exception as e:
+                if Database.is_duplicate_key(e):
+                    raise BatchReplay()
+                raise
+
+            cursor.execute(f"""
+                SELECT id, quantity_in_stock, min_stock_level FROM products
+                WHERE id IN ({', '.join(['%s'] * len(ids))}) FOR UPDATE
+            """, ids)
+            products = {row['id']: row for row in cursor.fetchall()}
+
+            counted = {}
+            for product_id, kind, value in lines:
+                if product_id in products:
+                    base = counted.get(product_id, products[product_id]['quantity_in_stock'] or 0)
+                    counted[product_id] = value if kind == 'quantity' else base + value
+
+            results, changes = {}, []
+            for product_id in ids:
+                product = products.get(product_id)
+                if product is None:
+                    results[product_id] = {'status': 'not_found'}
+                    continue
+                old, new = product['quantity_in_stock'], counted[product_id]
+                if new < 0:
+                    results[product_id] = {'status': 'negative', 'quantity': old}
+                elif new == old:
+                    results[product_id] = {'status': 'unchanged', 'quantity': old}
+                else:
+                    low = product['min_stock_level'] is not None and new < product['min_stock_level']
+                    results[product_id] = {'status': 'updated', 'quantity': new, 'is_low_stock': low}
+                    changes.append((product_id, old, new, product['min_stock_level'], low))
+
+            if changes:
+                cursor.execute(f"""
+                    UPDATE products
+                    SET quantity_in_stock = CASE id {' '.join(['WHEN %s THEN %s'] * len(changes))} END
+                    WHERE id IN ({', '.join(['%s'] * len(changes))})
+                """, [v for product_id, _, new, _, _ in changes for v in (product_id, new)]
+                     + [product_id for product_id, *_ in changes])
+                _log(cursor, """
+                    INSERT INTO inventory_history
+                    (product_id, field_changed, old_value, new_value, changed_by)
+                    VALUES (%s, 'quantity_in_stock', %s, %s, %s)
+                """, [(product_id, old, new, user_id) for product_id, old, new, _, _ in changes])
+                _log(cursor, """
+                    INSERT INTO stock_alerts
+                    (product_id, current_quantity, min_quantity, alerted_by)
+                    VALUES (%s, %s, %s, %s)
+                """, [(product_id, new, minimum, user_id)
+                      for product_id, _, new, minimum, low in changes if low])
+
+            result = {'results': results, 'updated': len(changes)}
+            cursor.execute("UPDATE stock_take_batches SET result_json = %s WHERE batch_key = %s",
+                           (json.dumps(result), batch_key))
+    except BatchReplay:
+        stored = _stored_result(batch_key)
+        if stored is None:
+            raise ValueError(f"Batch {batch_key} is still being applied")
+        return dict(stored, replayed=True)
+
+    if changes:
+        products_changed.send('products', product_ids=[c[0] for c in changes], action='quantity')
+    return dict(result, replayed=False)
+
+
+def _log(cursor, query, rows):
+    """executemany into a log table, skipped if the table doesn't exist."""
+    if not rows:
+        return
+    try:
+        cursor.executemany(query, rows)
+    except Exception as e:
+        if not Database.is_missing_table(e):
+            raise
@@ -83,7 +83,10 @@ export class BulkOps {
         if (selectedIds.length > 0 && confirm(`Delete ${selectedIds.length} selected items?`)) {
             fetch('/bulk_delete', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': document.querySelector('meta[name="csrf-token"]').content
+                },
                 body: JSON.stringify({ ids: selectedIds })
             }).then(() => window.location.reload());
         }
@@ -43,19 +43,26 @@ export class Search {
             return;
         }
 
-        Search.suggestions = await Search.fetchSuggestions(query);
+        const suggestions = await Search.fetchSuggestions(query);
+        if (suggestions === null) return; // superseded by a newer keystroke
+        Search.suggestions = suggestions;
         Search.selectedIndex = -1;
         this.showSuggestions(this.suggestions.results, query);
     }
 
     static async fetchSuggestions(query) {
+        // Only the latest keystroke matters: cancel the request still in flight
+        if (Search.pendingRequest) Search.pendingRequest.abort();
+        Search.pendingRequest = new AbortController();
         try {
-            const response = await fetch(`/landing_search?q=${encodeURIComponent(query)}`);
+            const response = await fetch(`/landing_search?q=${encodeURIComponent(query)}`,
+                                         { signal: Search.pendingRequest.signal });
             if (!response.ok) throw new Error('Network error');
             const results = await response.json();
             console.log('Fetched suggestions data:', results);
             return results;
         } catch (error) {
+            if (error.name === 'AbortError') return null;
             console.error("Error fetching suggestions:", error);
             return [];
         }
@@ -76,6 +83,7 @@ export class Search {
                     ? `Brand: ${Search.highlightMatch(suggestion.brand, query)}` 
                     : Search.highlightMatch(suggestion.description, query)
                 }
+                ${suggestion.fuzzy ? '<small class="text-muted">(did you mean?)</small>' : ''}
             </div>
         `).join('');
         Search.suggestionsContainer.style.display = 'block';
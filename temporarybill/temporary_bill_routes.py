@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from lib.database import Database
+from lib.async_db import AsyncDatabase
+from lib.client_index import client_index
 from flask_login import current_user
 import os
 import json
@@ -39,107 +41,78 @@ temp_bp = Blueprint('temp_bp', __name__)
 
 # Get temporary bills for a user
 @temp_bp.route('/active', methods=['GET'])
-def get_active_temp_bills():
+async def get_active_temp_bills():
     if not current_user.is_authenticated:
         return jsonify({"error": "Authentication required"}), 401
 
     user_id = current_user.id
-    conn = None
-    cursor = None
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM temporary_bills WHERE user_id = %s AND status = 'active'", (user_id,))
-        bills = cursor.fetchall()
+        bills = await AsyncDatabase.fetch_all(
+            "SELECT * FROM temporary_bills WHERE user_id = %s AND status = 'active'", (user_id,))
         return jsonify(bills)
     except Exception as e:
         print(f"Error fetching active temporary bills: {e}", file=sys.stderr)
-    except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
 
 # Get all templates for a user
 @temp_bp.route('/api/clients/search', methods=['GET'])
+@Database.replica_reads
 def search_clients():
     search_term = request.args.get('q', '')
     if not search_term or len(search_term) < 2:
         return jsonify([])
 
-    conn = None
-    cursor = None
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT id, name, email, phone 
-            FROM clients 
-            WHERE name LIKE %s OR email LIKE %s OR phone LIKE %s
-            LIMIT 10
-        """, (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
+        # Phone digits/suffix, email prefix and name-word prefix lookups
+        # against the in-memory client index; this user's recent picks first
+        user_id = current_user.id if current_user.is_authenticated else None
+        return jsonify(client_index.search(search_term, 10, user_id=user_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 
-        clients = cursor.fetchall()
-        return jsonify(clients)
+@temp_bp.route('/api/clients/recent', methods=['GET'])
+def recent_clients():
+    if not current_user.is_authenticated:
+        return jsonify({"error": "Authentication required"}), 401
+    try:
+        return jsonify(client_index.recent(current_user.id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 
 @temp_bp.route('/api/clients/<int:client_id>', methods=['GET'])
-def get_client(client_id):
-    conn = None
-    cursor = None
+async def get_client(client_id):
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
+        client = await AsyncDatabase.fetch_one("""
             SELECT id, name, email, phone 
             FROM clients 
             WHERE id = %s
         """, (client_id,))
 
-        client = cursor.fetchone()
         if not client:
             return jsonify({'error': 'Client not found'}), 404
 
+        if current_user.is_authenticated:
+            client_index.touch(current_user.id, client_id)
         return jsonify(client)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 @temp_bp.route('/templates', methods=['GET'])
-def get_templates():
+async def get_templates():
     if not current_user.is_authenticated:
         return jsonify({"error": "Authentication required"}), 401
 
     user_id = current_user.id
-    conn = None
-    cursor = None
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM bill_templates WHERE user_id = %s", (user_id,))
-        templates = cursor.fetchall()
+        templates = await AsyncDatabase.fetch_all("SELECT * FROM bill_templates WHERE user_id = %s", (user_id,))
         return jsonify(templates)
 
     except Exception as e:
         return jsonify(error=str(e)), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
-@temp_bp.route('/api/temp_bills/<int:bill_id>/discount', methods=['POST', 'DELETE'])
+@temp_bp.route('/<int:bill_id>/tax', methods=['POST', 'DELETE'])
 def manage_tax(bill_id):
     if not current_user.is_authenticated:
         return jsonify({"error": "Unauthorized"}), 401
@@ -195,22 +168,20 @@ def manage_tax(bill_id):
         if conn:
             conn.close()
 
-@temp_bp.route('/api/temp_bills/<int:bill_id>/discount', methods=['POST', 'DELETE'])
-def manage_discount(bill_id):
+@temp_bp.route('/<int:bill_id>/discount', methods=['POST', 'DELETE'])
+async def manage_discount(bill_id):
     if not current_user.is_authenticated:
         return jsonify({"error": "Unauthorized"}), 401
-    conn = None
-    cursor = None
-    try:
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
+    user_id = current_user.id
+    discount = request.json if request.method == 'POST' else None
+
+    def apply(cursor):
         # Verify bill ownership
         cursor.execute("SELECT user_id FROM temporary_bills WHERE id = %s", (bill_id,))
         bill = cursor.fetchone()
-        if not bill or bill['user_id'] != current_user.id:
-            return jsonify({"error": "Not found or unauthorized"}), 404
-        if request.method == 'POST':
-            discount = request.json
+        if not bill or bill['user_id'] != user_id:
+            return None
+        if discount is not None:
             cursor.execute("""
                 UPDATE temporary_bills
                 SET bill_data = JSON_SET(
@@ -229,25 +200,21 @@ def manage_discount(bill_id):
                 discount.get('applyToSubtotal', True),
                 bill_id
             ))
-            action = "added"
-        else:  # DELETE
-            cursor.execute("""
-                UPDATE temporary_bills
-                SET bill_data = JSON_REMOVE(bill_data, '$.discount')
-                WHERE id = %s
-            """, (bill_id,))
-            action = "removed"
-        conn.commit()
+            return "added"
+        cursor.execute("""
+            UPDATE temporary_bills
+            SET bill_data = JSON_REMOVE(bill_data, '$.discount')
+            WHERE id = %s
+        """, (bill_id,))
+        return "removed"
+
+    try:
+        action = await AsyncDatabase.transaction(apply)
+        if action is None:
+            return jsonify({"error": "Not found or unauthorized"}), 404
         return jsonify({"success": True, "action": action})
     except Exception as e:
-        if conn:
-            conn.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 def generate_bill_number(year):
     conn = None
@@ -278,17 +245,12 @@ def get_temporary_bills():
 
 # Create a new temporary bill
 @temp_bp.route('/', methods=['POST']) # This route was correctly updated in a previous step.
-def create_temporary_bill():
+async def create_temporary_bill():
     """Create a new temporary bill"""
     if not current_user.is_authenticated:
         return jsonify({"error": "Authentication required"}), 401
 
-    conn = None
-    cursor = None
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
-
         # Generate a temporary bill number
         bill_number = f"TEMP-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
 
@@ -301,7 +263,7 @@ def create_temporary_bill():
             'created_at': datetime.now().isoformat()
         }
 
-        cursor.execute("""
+        _, bill_id = await AsyncDatabase.execute("""
             INSERT INTO temporary_bills
             (user_id, bill_number, bill_data, status, expires_at)
             VALUES (%s, %s, %s, 'draft', DATE_ADD(NOW(), INTERVAL 1 DAY))
@@ -311,9 +273,6 @@ def create_temporary_bill():
             json.dumps(bill_data)
         ))
 
-        bill_id = cursor.lastrowid
-        conn.commit()
-
         return jsonify({
             "success": True,
             "bill_id": bill_id,
@@ -322,14 +281,7 @@ def create_temporary_bill():
         }), 201
 
     except Exception as e:
-        if conn:
-            conn.rollback()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 # Get a specific temporary bill by ID
 @temp_bp.route('/<int:bill_id>', methods=['GET']) # This route was correctly updated in a previous step.
@@ -344,58 +296,16 @@ def update_temporary_bill(bill_id):
     return jsonify({})
 
 # Delete a temporary bill
-# Add an item to a temporary bill
-@temp_bp.route('/add_item', methods=['POST'])
-def add_item_to_temp_bill():
-    if not current_user.is_authenticated:
-        return jsonify({"error": "Authentication required"}), 401
-
-    data = request.json
-    bill_id = data.get('bill_id')
-    name = data.get('name')
-    price = data.get('price')
-    quantity = data.get('quantity')
-
-    if not all([bill_id, name, price, quantity]):
-        # Note: This validation might need adjustment based on how you handle bill_id (create new vs add to existing)
-        # If bill_id is optional for creating a new bill, the check should be different.
-        return jsonify({"error": "Missing required fields"}), 400
-
-    conn = None
-    cursor = None
-    try:
-        conn = Database.get_connection()
-        cursor = conn.cursor()
-
-        # Assuming temporary_bill_items table exists with columns: bill_id, name, price, quantity
-        cursor.execute("""
-            INSERT INTO temporary_bill_items (bill_id, name, price, quantity)
-            VALUES (%s, %s, %s, %s)
-        """, (bill_id, name, price, quantity))
-        conn.commit()
-
-        # You might want to return the updated bill data or the new item ID here
-        # For simplicity, returning a success message for now.
-        return jsonify({"message": "Item added successfully."}), 201
-
-    except Exception as e:
-        if conn:
-            conn.rollback()
-        return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
-
 # Update an item in a temporary bill
 def update_bill_item(bill_id, item_id):
 # Export a temporary bill as PDF (using the template and bill data)
 
     pass
     return jsonify({})
+
+# Add an item to a temporary bill
 @temp_bp.route('/add_item', methods=['POST'])
-def add_bill_item():
+async def add_bill_item():
     """
     Adds an item to an existing temporary bill or creates a new one.
     """
@@ -411,27 +321,13 @@ def add_bill_item():
     if not product_id or quantity <= 0:
         return jsonify({"error": "Invalid input"}), 400
 
-    conn = None
-    cursor = None
+    user_id = current_user.id
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor(dictionary=True)
-
         # Get product details
-        cursor.execute("SELECT * FROM products WHERE id = %s", (product_id,))
-        product = cursor.fetchone()
+        product = await AsyncDatabase.fetch_one("SELECT * FROM products WHERE id = %s", (product_id,), prepared=True)
         if not product:
             return jsonify({"error": "Product not found"}), 404
 
-        # Create new bill if needed
-        if bill_id is None or bill_id == 'new':
-            cursor.execute("""
-                INSERT INTO temporary_bills
-                (user_id, bill_data, status, expires_at)
-                VALUES (%s, %s, 'draft', NOW() + INTERVAL 1 DAY)
-            """, (current_user.id, json.dumps({'items': []})))
-            bill_id = cursor.lastrowid
-
         # Add item to bill
         new_item = {
             'product_id': product['id'],
@@ -439,15 +335,26 @@ def add_bill_item():
             'unit_price': float(product['unit_price']),
             'quantity': int(quantity)
         }
-        cursor.execute(
-            "UPDATE temporary_bills SET bill_data = JSON_ARRAY_APPEND(bill_data, '$.items', %s) WHERE id = %s",
-            (json.dumps(new_item), bill_id)
-        )
-
-        conn.commit()
 
-        cursor.execute("SELECT * FROM temporary_bills WHERE id = %s", (bill_id,))
-        updated_bill = cursor.fetchone()
+        def add_item(cursor):
+            target_id = bill_id
+            # Create new bill if needed
+            if target_id is None or target_id == 'new':
+                cursor.execute("""
+                    INSERT INTO temporary_bills
+                    (user_id, bill_data, status, expires_at)
+                    VALUES (%s, %s, 'draft', NOW() + INTERVAL 1 DAY)
+                """, (user_id, json.dumps({'items': []})))
+                target_id = cursor.lastrowid
+
+            cursor.execute(
+                "UPDATE temporary_bills SET bill_data = JSON_ARRAY_APPEND(bill_data, '$.items', %s) WHERE id = %s",
+                (json.dumps(new_item), target_id)
+            )
+            cursor.execute("SELECT * FROM temporary_bills WHERE id = %s", (target_id,))
+            return target_id, cursor.fetchone()
+
+        bill_id, updated_bill = await AsyncDatabase.transaction(add_item)
 
         return jsonify({
             "success": True,
@@ -456,15 +363,8 @@ def add_bill_item():
         })
 
     except Exception as e:
-        if conn:
-            conn.rollback()
         print(f"Error adding item to bill: {e}", file=sys.stderr)
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 
 @temp_bp.route('/<int:bill_id>/export/pdf', methods=['GET'])
@@ -523,27 +423,16 @@ def create_template():
     if not name or not html:
         return jsonify({"error": "Name and HTML content are required"}), 400
 
-    conn = None
-    cursor = None
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO bill_templates (user_id, name, html, thumbnail, variables)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (user_id, name, html, thumbnail, variables_json))
-        conn.commit()
+        with Database.transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO bill_templates (user_id, name, html, thumbnail, variables)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (user_id, name, html, thumbnail, variables_json))
         return jsonify({"message": "Template created successfully."}), 201
 
     except Exception as e:
-        if conn:
-            conn.rollback()
         return jsonify(error=str(e)), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 # Finalize a temporary bill (optional step to convert to a permanent record if needed)
 @temp_bp.route('/<int:bill_id>/finalize', methods=['POST']) # This route was correctly updated in a previous step.
@@ -564,37 +453,25 @@ def edit_template(template_id):
     thumbnail = data.get('thumbnail', None)
     variables_json = json.dumps(data.get('variables', ["invoice_id", "date", "total"]))
 
-    conn = None
-    cursor = None
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor()
-
-        # Ensure the template belongs to the current user
-        cursor.execute("SELECT user_id FROM bill_templates WHERE id = %s", (template_id,))
-        template = cursor.fetchone()
+        with Database.transaction(dictionary=False) as cursor:
+            # Ensure the template belongs to the current user
+            cursor.execute("SELECT user_id FROM bill_templates WHERE id = %s", (template_id,))
+            template = cursor.fetchone()
 
-        if not template:
-            return jsonify({"error": "Template not found"}), 404
-        if template[0] != current_user.id:
-            return jsonify({"error": "Unauthorized to edit this template"}), 403
+            if not template:
+                return jsonify({"error": "Template not found"}), 404
+            if template[0] != current_user.id:
+                return jsonify({"error": "Unauthorized to edit this template"}), 403
 
-        cursor.execute("""
-            UPDATE bill_templates SET name=%s, html=%s, thumbnail=%s, variables=%s
-            WHERE id=%s
-        """, (name, html, thumbnail, variables_json, template_id))
-        conn.commit()
+            cursor.execute("""
+                UPDATE bill_templates SET name=%s, html=%s, thumbnail=%s, variables=%s
+                WHERE id=%s
+            """, (name, html, thumbnail, variables_json, template_id))
         return jsonify({"message": "Template updated successfully."})
 
     except Exception as e:
-        if conn:
-            conn.rollback()
         return jsonify(error=str(e)), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 # Delete a template
 @temp_bp.route('/templates/<int:template_id>', methods=['DELETE'])
@@ -602,34 +479,22 @@ def delete_template(template_id):
     if not current_user.is_authenticated:
         return jsonify({"error": "Authentication required"}), 401
 
-    conn = None
-    cursor = None
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor()
-
-        # Ensure the template belongs to the current user
-        cursor.execute("SELECT user_id FROM bill_templates WHERE id = %s", (template_id,))
-        template = cursor.fetchone()
+        with Database.transaction(dictionary=False) as cursor:
+            # Ensure the template belongs to the current user
+            cursor.execute("SELECT user_id FROM bill_templates WHERE id = %s", (template_id,))
+            template = cursor.fetchone()
 
-        if not template:
-            return jsonify({"error": "Template not found"}), 404
-        if template[0] != current_user.id:
-            return jsonify({"error": "Unauthorized to delete this template"}), 403
+            if not template:
+                return jsonify({"error": "Template not found"}), 404
+            if template[0] != current_user.id:
+                return jsonify({"error": "Unauthorized to delete this template"}), 403
 
-        cursor.execute("DELETE FROM bill_templates WHERE id=%s", (template_id,))
-        conn.commit()
+            cursor.execute("DELETE FROM bill_templates WHERE id=%s", (template_id,))
         return jsonify({"message": "Template deleted successfully."})
 
     except Exception as e:
-        if conn:
-            conn.rollback()
         return jsonify(error=str(e)), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 
 # Set a template as default
@@ -639,33 +504,20 @@ def set_default(template_id):
         return jsonify({"error": "Authentication required"}), 401
 
     user_id = current_user.id
-    conn = None
-    cursor = None
     try:
-        conn = Database.get_connection()
-        cursor = conn.cursor()
-
-        # Ensure the template belongs to the current user
-        cursor.execute("SELECT user_id FROM bill_templates WHERE id = %s", (template_id,))
-        template = cursor.fetchone()
-
-        if not template:
-            return jsonify({"error": "Template not found"}), 404
-        if template[0] != user_id:
-            return jsonify({"error": "Unauthorized to set this template as default"}), 403
-
-
-        cursor.execute("UPDATE bill_templates SET is_default=FALSE WHERE user_id=%s", (user_id,))
-        cursor.execute("UPDATE bill_templates SET is_default=TRUE WHERE id=%s", (template_id,))
-        conn.commit()
+        with Database.transaction(dictionary=False) as cursor:
+            # Ensure the template belongs to the current user
+            cursor.execute("SELECT user_id FROM bill_templates WHERE id = %s", (template_id,))
+            template = cursor.fetchone()
+
+            if not template:
+                return jsonify({"error": "Template not found"}), 404
+            if template[0] != user_id:
+                return jsonify({"error": "Unauthorized to set this template as default"}), 403
+
+            cursor.execute("UPDATE bill_templates SET is_default=FALSE WHERE user_id=%s", (user_id,))
+            cursor.execute("UPDATE bill_templates SET is_default=TRUE WHERE id=%s", (template_id,))
         return jsonify({"message": "Template set as default."})
 
     except Exception as e:
-        if conn:
-            conn.rollback()
-        return jsonify(error=str(e)), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
\ No newline at end of file
+        return jsonify(error=str(e)), 500
\ No newline at end of file
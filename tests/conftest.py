@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Run against SQLite so the suite needs no MySQL server
+os.environ.setdefault('DB_BACKEND', 'sqlite')
+os.environ.setdefault('SECRET_KEY', 'test')
+# Importing app.py creates an app; keep it off the real database file
+os.environ.setdefault('SQLITE_PATH', os.path.join(tempfile.mkdtemp(), 'import.db'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Database on a fresh SQLite file, restored afterwards."""
+    from lib.backends import SQLiteBackend
+    from lib.database import Database
+
+    for name in ('_pool', '_replica_pool', '_backend'):
+        monkeypatch.setattr(Database, name, None)
+    Database.initialize(SQLiteBackend(str(tmp_path / 'test.db')))
+    yield Database
+    Database._pool.dispose()
+
+
+@pytest.fixture
+def add_products(db):
+    """add_products(n, category='...') inserts n products; returns their ids."""
+    def add(n, category='test_category', **columns):
+        db.execute_query("INSERT OR IGNORE INTO categories (name) VALUES (%s)", (category,), fetch=False)
+        category_id = db.execute_query("SELECT id FROM categories WHERE name = %s", (category,))[0]['id']
+        values = {'description': 'product', 'brand': 'brand', 'unit_price': 1, 'quantity_in_stock': 1, **columns}
+        names = ', '.join(values)
+        ids = []
+        with db.transaction() as cursor:
+            for i in range(n):
+                cursor.execute(
+                    f"INSERT INTO products (category_id, {names}) VALUES (%s{', %s' * len(values)})",
+                    (category_id, *values.values()))
+                ids.append(cursor.lastrowid)
+        return ids
+    return add
+
+
+@pytest.fixture
+def client(db):
+    """Test client of an app on the `db` database, logged in as an admin."""
+    from werkzeug.security import generate_password_hash
+
+    import app as application
+
+    app = application.create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    db.execute_query("INSERT INTO users (username, password_hash, role) VALUES (%s, %s, 'admin')",
+                     ('admin', generate_password_hash('secret')), fetch=False)
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    return client
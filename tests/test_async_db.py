@@ -0,0 +1,36 @@
+import asyncio
+
+from flask import Flask
+
+from lib.async_db import AsyncDatabase
+
+
+def test_calls_run_on_connections_of_their_own(db, add_products):
+    add_products(3)
+    app = Flask(__name__)
+    app.secret_key = 'test'
+
+    async def main():
+        return await asyncio.gather(*[
+            AsyncDatabase.fetch_one("SELECT COUNT(*) AS n FROM products") for _ in range(4)])
+
+    with app.test_request_context():
+        assert asyncio.run(main()) == [{'n': 3}] * 4
+    assert db.pool_stats()['in_use'] == 0
+    assert db.pool_stats()['checkouts'] >= 4
+
+
+def test_transaction_rolls_back_on_error(db, add_products):
+    product_id = add_products(1)[0]
+
+    def work(cursor):
+        cursor.execute("UPDATE products SET quantity_in_stock = 99 WHERE id = %s", (product_id,))
+        raise RuntimeError("boom")
+
+    try:
+        asyncio.run(AsyncDatabase.transaction(work))
+    except RuntimeError:
+        pass
+    assert db.execute_query("SELECT quantity_in_stock FROM products WHERE id = %s",
+                            (product_id,))[0]['quantity_in_stock'] == 1
+    assert db.pool_stats()['in_use'] == 0
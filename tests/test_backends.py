@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+
+from config import Config
+from lib.backends import SQLiteBackend, translate_sql
+
+
+def test_placeholders():
+    assert translate_sql("SELECT * FROM products WHERE id = %s AND brand = %s") == \
+        "SELECT * FROM products WHERE id = ? AND brand = ?"
+
+
+def test_hash_comments_are_dropped():
+    query = "SELECT id # the key\nFROM products # all of them"
+    assert translate_sql(query) == "SELECT id \nFROM products "
+
+
+def test_hash_inside_strings_is_kept():
+    query = "SELECT id FROM products WHERE description = '#1 seller' OR brand = \"#\" # note"
+    assert translate_sql(query) == \
+        "SELECT id FROM products WHERE description = '#1 seller' OR brand = \"#\" "
+
+
+def test_escaped_quote_does_not_end_the_string():
+    assert translate_sql(r"SELECT 'it\'s #1' # x") == r"SELECT 'it\'s #1' "
+
+
+def test_intervals():
+    assert translate_sql("SELECT DATE_ADD(created_at, INTERVAL 7 DAY)") == \
+        "SELECT datetime(created_at, '+7 days')"
+    assert translate_sql("UPDATE t SET expires_at = NOW() + INTERVAL 2 HOUR") == \
+        "UPDATE t SET expires_at = datetime(NOW(), '+2 hours')"
+
+
+def test_mysql_only_syntax():
+    assert translate_sql("INSERT IGNORE INTO t (a) VALUES (%s)") == "INSERT OR IGNORE INTO t (a) VALUES (?)"
+    assert translate_sql("SELECT LAST_INSERT_ID()") == "SELECT last_insert_rowid()"
+    assert translate_sql("SELECT quantity FROM products WHERE id = %s FOR UPDATE") == \
+        "SELECT quantity FROM products WHERE id = ?"
+
+
+def test_transactions_take_the_write_lock_up_front(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SQLITE_BUSY_TIMEOUT', 0)
+    backend = SQLiteBackend(str(tmp_path / 'test.db'))
+    first, second = backend.connect(), backend.connect()
+    try:
+        first.start_transaction()
+        with pytest.raises(sqlite3.OperationalError, match='locked'):
+            second.start_transaction()
+        first.commit()
+        second.start_transaction()
+        second.rollback()
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,45 @@
+from lib.brand_index import BrandDictionary
+
+
+def brand_rows(*brands):
+    return [{'id': i, 'brand': brand} for i, brand in enumerate(brands, 1)]
+
+
+def test_prefix_matches_first_then_busiest():
+    brands = BrandDictionary()
+    brands.build(brand_rows('Philips', 'philips ', 'Phoenix', 'Syska', 'Alphiq', 'Alphiq', 'Alphiq'))
+    assert brands.suggest('ph') == [{'brand': 'Philips', 'products': 2},
+                                    {'brand': 'Phoenix', 'products': 1},
+                                    {'brand': 'Alphiq', 'products': 3}]
+    assert [b['brand'] for b in brands.suggest('PH', limit=1)] == ['Philips']
+    assert brands.suggest(' ') == []
+    assert brands.count(' PHILIPS') == 2
+
+
+def test_refresh_moves_products_between_brands(db, add_products):
+    havells, philips = add_products(1, brand='Havells') + add_products(1, brand='Philips')
+    brands = BrandDictionary()
+    brands.build()
+    db.execute_query("UPDATE products SET brand = 'Philips' WHERE id = %s", (havells,), fetch=False)
+    db.execute_query("UPDATE products SET is_deleted = 1 WHERE id = %s", (philips,), fetch=False)
+    brands.refresh([havells, philips])
+    assert brands.count('havells') == 0
+    assert brands.count('philips') == 1
+    assert len(brands) == 1
+
+
+def test_rebuild_keeps_patches_made_while_loading(db, add_products):
+    [product] = add_products(1, brand='Havells')
+    brands = BrandDictionary()
+    brands.build()
+    stale = db.execute_query("SELECT id, brand FROM products")
+
+    def rows():
+        db.execute_query("UPDATE products SET brand = 'Philips' WHERE id = %s", (product,), fetch=False)
+        brands.refresh([product])
+        yield from stale
+
+    brands.build(rows())
+    assert brands.count('havells') == 0
+    assert brands.count('philips') == 1
+    assert [b['brand'] for b in brands.suggest('phi')] == ['Philips']
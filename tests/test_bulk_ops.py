@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+import pytest
+
+from lib.bulk_ops import parse_ids, parse_value
+
+
+def test_parse_value():
+    assert parse_value('delete', None) is None
+    assert parse_value('restore', 'ignored') is None
+    assert parse_value('set_price', '12.345') == Decimal('12.34')
+    assert parse_value('set_price', 0) == Decimal('0.00')
+    assert parse_value('change_price_pct', '-10') == Decimal('0.9')
+    assert parse_value('change_price_pct', 25) == Decimal('1.25')
+    assert parse_value('set_quantity', '7') == 7
+    assert parse_value('set_quantity', 7.0) == 7
+
+
+@pytest.mark.parametrize('operation, value', [
+    ('set_price', None),
+    ('set_price', ''),
+    ('set_price', 'abc'),
+    ('set_price', 'NaN'),
+    ('set_price', 'Infinity'),
+    ('set_price', '-1'),
+    ('change_price_pct', '-100'),
+    ('set_quantity', '1.5'),
+    ('set_quantity', '-1'),
+])
+def test_parse_value_rejects(operation, value):
+    with pytest.raises(ValueError):
+        parse_value(operation, value)
+
+
+def test_parse_ids():
+    assert parse_ids([3, '1', 3]) == [3, 1]
+    for bad in (None, [], ['x'], 5):
+        with pytest.raises(ValueError):
+            parse_ids(bad)
@@ -0,0 +1,76 @@
+import pytest
+
+from config import Config
+from lib.client_index import ClientSearchIndex, phone_digits
+
+
+@pytest.fixture
+def add_client(db):
+    def add(name, email=None, phone=None):
+        with db.transaction() as cursor:
+            cursor.execute("INSERT INTO clients (name, email, phone) VALUES (%s, %s, %s)",
+                           (name, email, phone))
+            return cursor.lastrowid
+    return add
+
+
+def names(results):
+    return [client['name'] for client in results]
+
+
+def test_phone_digits():
+    assert phone_digits("+91 98450-12345") == '919845012345'
+    assert phone_digits(None) == ''
+
+
+def test_search_by_phone_email_and_name(db, add_client):
+    add_client('Ravi Kumar', 'ravi@example.com', '+91 98450-12345')
+    add_client('Kumar Electricals', 'sales@kumar.in', '080 2222 3333')
+    index = ClientSearchIndex()
+    index.build()
+    assert names(index.search('98450')) == ['Ravi Kumar']       # without the country code
+    assert names(index.search('12345')) == ['Ravi Kumar']       # last digits
+    assert names(index.search('sales@')) == ['Kumar Electricals']
+    assert sorted(names(index.search('kum'))) == ['Kumar Electricals', 'Ravi Kumar']
+    assert names(index.search('kumar rav')) == ['Ravi Kumar']
+    assert index.search('umar') == []
+
+
+def test_recent_picks_come_first(db, add_client):
+    add_client('Kumar Electricals')
+    ravi = add_client('Ravi Kumar')
+    index = ClientSearchIndex()
+    index.build()
+    index.touch(7, ravi)
+    assert names(index.search('kumar', user_id=7))[0] == 'Ravi Kumar'
+    assert names(index.recent(7)) == ['Ravi Kumar']
+
+
+def test_refresh_and_catch_up(db, add_client, monkeypatch):
+    ravi = add_client('Ravi Kumar')
+    index = ClientSearchIndex()
+    index.build()
+    db.execute_query("UPDATE clients SET name = 'Ravi Shankar' WHERE id = %s", (ravi,), fetch=False)
+    index.refresh([ravi])
+    assert names(index.search('shankar')) == ['Ravi Shankar']
+
+    # Created by another process: found by the catch-up read on a miss
+    monkeypatch.setattr(Config, 'CLIENT_CATCH_UP_INTERVAL', 0)
+    add_client('Meena Stores')
+    assert names(index.search('meena')) == ['Meena Stores']
+
+
+def test_rebuild_keeps_patches_made_while_loading(db, add_client):
+    ravi = add_client('Ravi Kumar')
+    index = ClientSearchIndex()
+    index.build()
+    stale = db.execute_query("SELECT id, name, email, phone FROM clients")
+
+    def rows():
+        db.execute_query("UPDATE clients SET name = 'Ravi Shankar' WHERE id = %s", (ravi,), fetch=False)
+        index.refresh([ravi])
+        yield from stale
+
+    index.build(rows())
+    assert index.search('kumar') == []
+    assert names(index.search('shankar')) == ['Ravi Shankar']
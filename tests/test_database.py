@@ -0,0 +1,120 @@
+import pytest
+
+from config import Config
+from lib.backends import SQLiteBackend
+from lib.database import Database
+
+
+def in_use():
+    return Database.pool_stats()['in_use']
+
+
+def test_stream_holds_no_connection_until_iterated(db, add_products):
+    add_products(25)
+    rows = db.stream("SELECT id FROM products ORDER BY id", chunk_size=10)
+    assert in_use() == 0
+    rows.close()
+    assert in_use() == 0
+
+
+def test_stream_returns_the_connection_when_abandoned(db, add_products):
+    first = add_products(25)[0]
+    rows = db.stream("SELECT id FROM products ORDER BY id", chunk_size=10)
+    assert next(rows)['id'] == first
+    assert in_use() == 1
+    rows.close()
+    assert in_use() == 0
+
+
+def test_stream_returns_the_connection_when_finished(db, add_products):
+    ids = add_products(25)
+    assert [row['id'] for row in db.stream("SELECT id FROM products ORDER BY id", chunk_size=10)] == ids
+    assert in_use() == 0
+
+
+@pytest.fixture
+def replica(db, tmp_path, monkeypatch):
+    """A replica pool on a database of its own, so a read shows where it went."""
+    pool = Database._make_pool(SQLiteBackend(str(tmp_path / 'replica.db')), 2)
+    monkeypatch.setattr(Database, '_replica_pool', pool)
+    yield pool
+    pool.dispose()
+
+
+def add_category(name):
+    Database.execute_query("INSERT INTO categories (name) VALUES (%s)", (name,), fetch=False)
+
+
+def has_category(name, **options):
+    return bool(Database.execute_query("SELECT id FROM categories WHERE name = %s", (name,), **options))
+
+
+def test_plain_selects_read_the_replica(db, replica):
+    add_category('written')
+    assert not has_category('written')
+    assert not has_category('written', prepared=True)
+    assert has_category('written', readonly=False)
+    assert has_category('written', prepared=True, readonly=False)
+
+
+def test_reads_stay_on_the_primary_after_a_write(client, replica, monkeypatch):
+    with client.application.test_request_context():
+        assert not has_category('written')
+        add_category('written')
+        assert has_category('written')
+        monkeypatch.setattr(Config, 'DB_READ_YOUR_WRITES_WINDOW', 0)
+        assert not has_category('written')
+
+
+def test_transactions_read_the_primary(client, replica):
+    with client.application.test_request_context():
+        with Database.transaction() as cursor:
+            cursor.execute("INSERT INTO categories (name) VALUES ('written')")
+            assert has_category('written')
+
+
+def test_logged_in_user_is_loaded_from_the_primary(client, replica):
+    # The replica has no users at all: a lagging copy of the users table
+    assert client.get('/products').status_code == 200
+
+
+def count_categories(name):
+    return Database.execute_query("SELECT COUNT(*) AS n FROM categories WHERE name = %s", (name,))[0]['n']
+
+
+def test_request_shares_one_connection(client):
+    with client.application.app_context():
+        with Database.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        with Database.transaction() as cursor:
+            cursor.execute("SELECT 1")
+        assert in_use() == 1
+    assert in_use() == 0
+
+
+def test_nested_transaction_joins_the_outer_one(client):
+    with client.application.app_context():
+        with pytest.raises(RuntimeError):
+            with Database.transaction() as outer:
+                outer.execute("INSERT INTO categories (name) VALUES ('outer')")
+                with Database.transaction() as inner:
+                    inner.execute("INSERT INTO categories (name) VALUES ('inner')")
+                # The inner block finished but committed nothing of its own
+                raise RuntimeError
+        assert count_categories('outer') == count_categories('inner') == 0
+
+
+def test_inner_failure_rolls_back_with_the_outer_block(client):
+    with client.application.app_context():
+        with pytest.raises(RuntimeError):
+            with Database.transaction() as outer:
+                outer.execute("INSERT INTO categories (name) VALUES ('outer')")
+                with Database.transaction():
+                    raise RuntimeError
+        assert count_categories('outer') == 0
+
+        with Database.transaction() as outer:
+            outer.execute("INSERT INTO categories (name) VALUES ('outer')")
+            with Database.transaction() as inner:
+                inner.execute("INSERT INTO categories (name) VALUES ('inner')")
+        assert count_categories('outer') == count_categories('inner') == 1
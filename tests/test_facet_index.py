@@ -0,0 +1,87 @@
+from lib.facet_index import bits, facet_value
+
+
+def bitmap(*ids):
+    return sum(1 << i for i in ids)
+
+
+def test_bits_ascending():
+    assert list(bits(bitmap(3, 0, 64, 7))) == [0, 3, 7, 64]
+    assert list(bits(0)) == []
+
+
+def test_bits_after():
+    assert list(bits(bitmap(1, 5, 9), after=5)) == [9]
+    assert list(bits(bitmap(1, 5, 9), after=0)) == [1, 5, 9]
+
+
+def test_bits_before_is_descending():
+    assert list(bits(bitmap(1, 5, 9), before=9)) == [5, 1]
+    assert list(bits(bitmap(1, 5, 9), before=100)) == [9, 5, 1]
+    assert list(bits(bitmap(1, 5, 9), before=0)) == []
+
+
+def test_facet_value():
+    assert facet_value(9) == facet_value(9.0) == facet_value(' 9 ') == '9'
+    assert facet_value(2.5) == '2.5'
+    assert facet_value('') is None
+    assert facet_value(True) is None
+    assert facet_value([1, 2]) is None
+
+
+def test_faceted_search_pages_the_intersection(db, add_products, monkeypatch):
+    from flask import Flask
+
+    from config import Config
+    from lib import products
+    from lib.category_cache import category_cache
+    from lib.facet_index import FacetIndex
+    from lib.product_specs import save_specs
+
+    ids = add_products(60, category='tubelights', brand='philips') + \
+        add_products(20, category='tubelights', brand='bajaj')
+    with db.transaction() as cursor:
+        save_specs(cursor, [(i, {'wattage': 9 if n % 2 else 18}) for n, i in enumerate(ids)])
+    monkeypatch.setattr(Config, 'SEARCH_INDEX_REFRESH', 0)
+    category_cache.invalidate()
+    index = FacetIndex()
+    monkeypatch.setattr(products, 'facet_index', index)
+
+    with Flask(__name__).test_request_context():
+        index.build()
+        first = products._search_products(0, 'philips', 'tubelights', None, 'like', 1, 20,
+                                          facets={'wattage': ['9']})
+        second = products._search_products(0, 'philips', 'tubelights', None, 'like', 1, 20,
+                                           position=first['next'], facets={'wattage': ['9']})
+    expected = [i for n, i in enumerate(ids[:60]) if n % 2]
+    assert first['total'] == 30
+    assert [p['id'] for p in first['products']] == expected[:20]
+    assert [p['id'] for p in second['products']] == expected[20:]
+    assert second['next'] is None
+
+
+def test_rebuild_keeps_patches_made_while_loading(db, add_products, monkeypatch):
+    from lib.category_cache import category_cache
+    from lib.facet_index import FacetIndex
+    from lib.product_specs import save_specs
+
+    [product] = add_products(1, category='tubelights')
+    with db.transaction() as cursor:
+        save_specs(cursor, [(product, {'wattage': 9})])
+    category_cache.invalidate()
+    index = FacetIndex()
+    index.build()
+    load_fields = index._fields
+
+    def fields(rows):
+        # The rows are read; a write patches the old index before the swap
+        monkeypatch.setattr(index, '_fields', load_fields)
+        with db.transaction() as cursor:
+            save_specs(cursor, [(product, {'wattage': 18})])
+        index.refresh([product])
+        return load_fields(rows)
+
+    monkeypatch.setattr(index, '_fields', fields)
+    index.build()
+    assert index.match('tubelights', {'wattage': ['9']}) == 0
+    assert index.match('tubelights', {'wattage': ['18']}) == bitmap(product)
@@ -0,0 +1,52 @@
+from lib.fuzzy import DeletionIndex
+
+
+def make_index(*words):
+    index = DeletionIndex(max_distance=2)
+    for word in words:
+        index.add(word)
+    return index
+
+
+def test_lookup_within_distance():
+    index = make_index('havells', 'philips', 'anchor')
+    assert index.lookup('havels', 2) == {'havells': 1}
+    assert index.lookup('philps', 1) == {'philips': 1}
+    assert index.lookup('xyz', 2) == {}
+
+
+def test_lookup_distance_is_capped_by_the_index():
+    index = make_index('anchor')
+    assert index.lookup('axxxor', 5) == {}
+    assert index.lookup('axxhor', 5) == {'anchor': 2}
+
+
+def test_prefix_lookup():
+    index = make_index('tubelight', 'tube', 'wire')
+    assert index.lookup('tubeli', 0, prefix=True) == {'tubelight': 0}
+    assert index.lookup('tubli', 1, prefix=True)['tubelight'] == 1
+
+
+def test_non_alpha_words_match_exactly():
+    index = make_index('6500k')
+    assert index.lookup('6500k', 2) == {'6500k': 0}
+    assert index.lookup('6501k', 2) == {}
+
+
+def test_discard_counts_references():
+    index = make_index('anchor', 'anchor')
+    index.discard('anchor')
+    assert 'anchor' in index
+    index.discard('anchor')
+    assert 'anchor' not in index
+    assert index.lookup('anchr', 2) == {}
+    assert len(index) == 0
+
+
+def test_update_matches_add():
+    index = DeletionIndex()
+    index.update({'havells': 2, 'philips': 1})
+    assert index.lookup('havels', 2) == {'havells': 1}
+    assert index.lookup('phil', 0, prefix=True) == {'philips': 0}
+    index.discard('havells')
+    assert 'havells' in index
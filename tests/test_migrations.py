@@ -0,0 +1,103 @@
+import pytest
+
+from lib import migrations
+from lib.migrations import _is_full_scan, full_scans, migrate
+
+
+class FakeError(Exception):
+    def __init__(self, errno):
+        super().__init__(f"error {errno}")
+        self.errno = errno
+
+
+class FakeCursor:
+    def __init__(self, applied=(), fail=None):
+        self.applied = set(applied)
+        self.fail = fail or {}
+        self.executed = []
+        self._rows = []
+
+    def execute(self, statement, params=None):
+        self.executed.append(statement)
+        if statement in self.fail:
+            raise FakeError(self.fail[statement])
+        if statement.startswith("SELECT version"):
+            self._rows = [(v,) for v in self.applied]
+        elif statement.startswith("INSERT INTO schema_migrations"):
+            self.applied.add(params[0])
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def steps(monkeypatch):
+    called = []
+    monkeypatch.setattr(migrations, 'MIGRATIONS', [
+        (1, "one", ["CREATE TABLE a"]),
+        (2, "two", ["CREATE INDEX i ON a (x)", called.append]),
+    ])
+    return called
+
+
+def test_migrate_applies_pending_versions_in_order(steps):
+    cursor = FakeCursor(applied={1})
+    conn = FakeConnection(cursor)
+    assert migrate(conn, log=lambda message: None) == [2]
+    assert "CREATE TABLE a" not in cursor.executed
+    assert steps == [cursor]
+    assert cursor.applied == {1, 2} and conn.commits == 1
+    assert migrate(conn, log=lambda message: None) == []
+
+
+def test_migrate_tolerates_changes_already_made(steps):
+    cursor = FakeCursor(fail={"CREATE INDEX i ON a (x)": 1061})
+    assert migrate(FakeConnection(cursor), log=lambda message: None) == [1, 2]
+
+
+def test_migrate_stops_on_other_errors(steps):
+    cursor = FakeCursor(fail={"CREATE INDEX i ON a (x)": 1146})
+    with pytest.raises(RuntimeError, match="Migration 2"):
+        migrate(FakeConnection(cursor), log=lambda message: None)
+    assert cursor.applied == {1}
+
+
+def test_mysql_full_scan_is_any_type_all():
+    assert _is_full_scan({'type': 'ALL', 'possible_keys': None}, 'mysql')
+    # An index was available but the optimizer still read every row
+    assert _is_full_scan({'type': 'ALL', 'possible_keys': 'idx_products_brand'}, 'mysql')
+    assert not _is_full_scan({'type': 'ref', 'possible_keys': 'idx_products_brand'}, 'mysql')
+    assert not _is_full_scan({'type': 'index', 'key': 'PRIMARY'}, 'mysql')
+
+
+def test_sqlite_full_scan():
+    assert _is_full_scan({'detail': 'SCAN price_history'}, 'sqlite')
+    assert not _is_full_scan({'detail': 'SCAN p USING INDEX idx_products_deleted_category'}, 'sqlite')
+    assert not _is_full_scan({'detail': 'SEARCH c USING INDEX sqlite_autoindex_categories_1 (name=?)'},
+                             'sqlite')
+
+
+def test_hot_queries_use_indexes(db):
+    with db.cursor(dictionary=False) as cursor:
+        assert full_scans(cursor, 'sqlite') == []
+
+
+def test_dropped_index_is_reported(db):
+    db.execute_query("DROP INDEX idx_price_history_product_changed", fetch=False)
+    with db.cursor(dictionary=False) as cursor:
+        assert [name for name, _ in full_scans(cursor, 'sqlite')] == ['price history']
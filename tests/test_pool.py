@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from lib.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def creator():
+        created.append(FakeConnection())
+        return created[-1]
+
+    return ConnectionPool(creator, **kwargs), created
+
+
+def test_idle_connection_is_reused():
+    pool, created = make_pool(pool_size=1, max_overflow=0)
+    first = pool.checkout()
+    raw = first.raw
+    first.close()
+    second = pool.checkout()
+    assert second.raw is raw
+    assert len(created) == 1
+    second.close()
+    assert pool.stats()['in_use'] == 0
+
+
+def test_overflow_connections_are_closed_on_return():
+    pool, created = make_pool(pool_size=1, max_overflow=1, timeout=0.05)
+    first, second = pool.checkout(), pool.checkout()
+    assert pool.stats()['size'] == 2
+    with pytest.raises(PoolTimeout):
+        pool.checkout()
+    first.close()
+    second.close()
+    stats = pool.stats()
+    assert (stats['size'], stats['idle'], stats['in_use'], stats['timeouts']) == (1, 1, 0, 1)
+    assert [c.closed for c in created] == [False, True]
+
+
+def test_waiter_gets_a_returned_connection():
+    pool, _ = make_pool(pool_size=1, max_overflow=0, timeout=5)
+    held = pool.checkout()
+    threading.Timer(0.05, held.close).start()
+    started = time.monotonic()
+    conn = pool.checkout()
+    assert time.monotonic() - started < 5
+    conn.close()
+
+
+def test_full_wait_queue_fails_immediately():
+    pool, _ = make_pool(pool_size=1, max_overflow=0, timeout=5, max_waiters=0)
+    held = pool.checkout()
+    with pytest.raises(PoolTimeout):
+        pool.checkout()
+    assert pool.stats()['rejected'] == 1
+    held.close()
+
+
+def test_failed_ping_replaces_the_connection():
+    pool, created = make_pool(pool_size=1, max_overflow=0, ping=lambda conn: False)
+    pool.checkout().close()
+    conn = pool.checkout()
+    assert len(created) == 2 and created[0].closed
+    assert pool.stats()['invalidated'] == 1
+    conn.close()
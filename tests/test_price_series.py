@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+
+from lib import price_series as series
+from lib.price_series import downsample, merge_buckets, parse_bucket
+
+
+def bucket(slot, open_, high, low, close, changes=1):
+    return {'slot': slot, 'open': open_, 'high': high, 'low': low, 'close': close, 'changes': changes}
+
+
+def test_merge_buckets_keeps_ohlc():
+    buckets = [bucket(0, 10, 12, 9, 11), bucket(60, 11, 30, 11, 12, 2), bucket(120, 12, 12, 1, 5),
+               bucket(180, 5, 6, 5, 6)]
+    assert merge_buckets(buckets, 0, 60, 2) == [bucket(0, 10, 30, 9, 12, 3), bucket(120, 12, 12, 1, 6, 2)]
+
+
+def test_downsample_merges_until_it_fits():
+    buckets = [bucket(i * 60, i, i + 100 if i == 37 else i, i, i) for i in range(100)]
+    merged, width = downsample(buckets, 0, 60, 10)
+    assert len(merged) <= 10
+    assert width % 60 == 0
+    assert max(b['high'] for b in merged) == 137
+    assert sum(b['changes'] for b in merged) == 100
+    assert merged[0]['open'] == 0 and merged[-1]['close'] == 99
+
+
+def test_downsample_leaves_few_buckets_alone():
+    buckets = [bucket(0, 1, 1, 1, 1)]
+    assert downsample(buckets, 0, 60, 3) == (buckets, 60)
+
+
+def test_parse_bucket():
+    assert parse_bucket(None) == 86400
+    assert parse_bucket('6h') == 6 * 3600
+    assert parse_bucket('120') == 120
+    for bad in ('59', '1y', '-60'):
+        with pytest.raises(ValueError):
+            parse_bucket(bad)
+
+
+@pytest.fixture
+def history(monkeypatch):
+    """price_series() over the given price_history rows; records the query params."""
+    calls = {}
+
+    def stream(query, params, chunk_size):
+        calls['params'] = params
+        return (row for row in calls['rows'])
+    monkeypatch.setattr(series.Database, 'execute_query', lambda query, params: [])
+    monkeypatch.setattr(series.Database, 'stream', stream)
+
+    def run(rows, **kwargs):
+        calls['rows'] = rows
+        return series.price_series(1, **kwargs), calls['params']
+    return run
+
+
+def test_first_change_without_old_price(history):
+    now = datetime.now().replace(microsecond=0)
+    result, _ = history([{'changed_at': now, 'old_price': None, 'new_price': 10}])
+    assert result['buckets'][0]['open'] == 10.0
+
+
+def test_default_end_takes_in_the_current_second(history):
+    before = datetime.now()
+    _, params = history([])
+    assert params[2] > before.strftime('%Y-%m-%d %H:%M:%S')
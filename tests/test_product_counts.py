@@ -0,0 +1,64 @@
+import pytest
+
+from lib.product_counts import ProductCounts
+
+
+def recount(db):
+    rows = db.execute_query("""
+        SELECT c.name AS category, p.is_deleted, COUNT(*) AS total
+        FROM products p JOIN categories c ON p.category_id = c.id
+        GROUP BY c.name, p.is_deleted
+    """)
+    return {(row['category'], row['is_deleted']): row['total'] for row in rows}
+
+
+def counted(db):
+    rows = db.execute_query("""
+        SELECT c.name AS category, pc.is_deleted, pc.total
+        FROM product_counts pc JOIN categories c ON pc.category_id = c.id
+        WHERE pc.total > 0
+    """)
+    return {(row['category'], row['is_deleted']): row['total'] for row in rows}
+
+
+def test_triggers_follow_inserts_moves_and_deletes(db, add_products):
+    switches = add_products(3, category='switches')
+    wires = add_products(2, category='wires')
+    assert ProductCounts.total() == 5
+    assert ProductCounts.total(category='switches') == 3
+
+    db.execute_query("UPDATE products SET is_deleted = 1 WHERE id = %s", (switches[0],), fetch=False)
+    db.execute_query("UPDATE products SET category_id = (SELECT id FROM categories WHERE name = 'wires') "
+                     "WHERE id = %s", (switches[1],), fetch=False)
+    db.execute_query("UPDATE products SET brand = 'other' WHERE id = %s", (wires[0],), fetch=False)
+    db.execute_query("DELETE FROM products WHERE id = %s", (wires[1],), fetch=False)
+
+    assert ProductCounts.total(category='switches') == 1
+    assert ProductCounts.total(category='wires') == 2
+    assert ProductCounts.total(is_deleted=1) == 1
+    assert counted(db) == recount(db)
+
+
+def test_rolled_back_writes_leave_the_totals_alone(db, add_products):
+    add_products(2, category='switches')
+    with pytest.raises(RuntimeError):
+        with db.transaction() as cursor:
+            cursor.execute("UPDATE products SET is_deleted = 1")
+            raise RuntimeError
+    assert ProductCounts.total(category='switches') == 2
+    assert ProductCounts.total(is_deleted=1) == 0
+
+
+def test_rebuild_matches_the_triggers(db, add_products):
+    add_products(3, category='switches')
+    add_products(1, category='wires', is_deleted=1)
+    before = counted(db)
+    db.execute_query("UPDATE product_counts SET total = 99", fetch=False)
+    ProductCounts.rebuild()
+    assert counted(db) == before == recount(db)
+
+
+def test_capped_count(db, add_products):
+    add_products(5)
+    assert ProductCounts.capped("FROM products", [], cap=10) == (5, False)
+    assert ProductCounts.capped("FROM products WHERE is_deleted = %s", [0], cap=3) == (3, True)
@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+from lib.category_cache import category_cache
+from lib.product_import import ProductImport
+from lib.product_specs import get_specs
+
+HEADER = "category,description,brand,unit_price,quantity_in_stock,wattage\n"
+
+
+@pytest.fixture
+def categories(db):
+    """The schema's seeded categories, read from this database."""
+    category_cache.invalidate()
+    yield
+    category_cache.invalidate()
+
+
+def run(csv, **options):
+    return ProductImport(**options).run(io.BytesIO(csv.encode()))
+
+
+def test_import_reports_bad_rows_by_line(db, categories):
+    report = run(HEADER +
+                 "tubelights,T5 tube,Philips,120,10,18\n"
+                 "lamps,Bulb,Philips,50,5,\n"
+                 "tubelights,,Philips,-1,x,\n"
+                 "tubelights,T8 tube,Bajaj,150,4,36\n"
+                 "tubelights,T8 tube,Bajaj,150,4,bright\n"
+                 "tubelights,Batten,Havells,300,2,\n", batch_size=2)
+    assert (report['imported'], report['failed']) == (3, 3)
+    assert [error['row'] for error in report['errors']] == [3, 4, 6]
+    assert report['errors'][0]['error'] == "unknown category 'lamps'"
+    assert report['errors'][1]['error'] == ("description is required; unit_price can't be negative; "
+                                            "quantity_in_stock: 'x' is not a number")
+    assert report['errors'][2]['error'] == "wattage: 'bright' is not a number"
+
+    products = db.execute_query("SELECT id, description FROM products ORDER BY id")
+    assert [p['description'] for p in products] == ['T5 tube', 'T8 tube', 'Batten']
+    assert [get_specs(p['id']).get('wattage') for p in products] == [18, 36, None]
+
+
+def test_import_caps_the_error_report(db, categories):
+    report = run(HEADER + "lamps,Bulb,Philips,50,5,\n" * 3, max_errors=2)
+    assert report['failed'] == 3
+    assert len(report['errors']) == 2
+    assert report['errors_truncated']
+
+
+def test_dry_run_writes_nothing(db, categories):
+    report = run(HEADER + "tubelights,T5 tube,Philips,120,10,18\n", dry_run=True)
+    assert report['imported'] == 1
+    assert db.execute_query("SELECT COUNT(*) AS n FROM products")[0]['n'] == 0
+
+
+def test_import_rejects_missing_columns(db, categories):
+    with pytest.raises(ValueError, match='unit_price'):
+        run("category,description,brand,quantity_in_stock\n")
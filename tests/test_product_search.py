@@ -0,0 +1,68 @@
+import base64
+import json
+
+import pytest
+
+from lib import product_search
+from lib.product_search import boolean_query, decode_cursor, encode_cursor, search_filter
+
+
+@pytest.fixture
+def mysql(monkeypatch):
+    monkeypatch.setattr(product_search.Database, 'backend_name', classmethod(lambda cls: 'mysql'))
+
+
+def test_boolean_query():
+    assert boolean_query("Havells 9w LED led") == '+havells* +led*'
+    assert boolean_query("9w") is None
+
+
+def test_short_words_are_still_required(mysql):
+    clause = search_filter("led 9w", mode='fulltext')
+    assert clause['mode'] == 'fulltext'
+    assert clause['where'] == ("(MATCH(p.brand, p.description) AGAINST(%s IN BOOLEAN MODE)"
+                               " AND (p.description LIKE %s OR p.brand LIKE %s))")
+    assert clause['params'] == ['+led*', '%9w%', '%9w%']
+    assert clause['rank_params'] == ['+led*']
+
+
+def test_short_words_on_brand_filter(mysql):
+    clause = search_filter("philips ab", 'brand', mode='fulltext')
+    assert clause['where'] == "(MATCH(p.brand) AGAINST(%s IN BOOLEAN MODE) AND p.brand LIKE %s)"
+    assert clause['params'] == ['+philips*', '%ab%']
+
+
+def test_only_short_words_use_like(mysql):
+    clause = search_filter("9w", mode='fulltext')
+    assert clause['mode'] == 'like'
+    assert clause['params'] == ['%9w%', '%9w%']
+
+
+def test_cursor_round_trip():
+    position = {'after': 1234, 'total': 50, 'estimated': False, 'page': 3}
+    token = encode_cursor(position)
+    assert '=' not in token
+    assert decode_cursor(token) == position
+
+
+def token(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('bad', [
+    'not a cursor!',
+    token([1, 2]),
+    token({'after': 'x'}),
+    token({'after': 1.5}),
+    token({'after': None}),
+    token({'after': -1}),
+    token({'offset': -20, 'page': 1}),
+    token({'page': 0}),
+    token({'total': True}),
+    token({'estimated': 1}),
+    token({'limit': 10}),
+    token({'after': 5, 'before': 9}),
+])
+def test_decode_cursor_rejects(bad):
+    with pytest.raises(ValueError):
+        decode_cursor(bad)
@@ -0,0 +1,46 @@
+from lib import products
+from lib.product_specs import get_specs
+
+
+def count_products(db):
+    return db.execute_query("SELECT COUNT(*) AS n FROM products")[0]['n']
+
+
+def product_form(**extra):
+    return {'category_id': '1', 'description': 'LED tube', 'brand': 'philips',
+            'unit_price': '120', 'quantity_in_stock': '5', **extra}
+
+
+def test_add_stores_product_and_specs(client, db):
+    client.post('/products/add', data=product_form(spec_wattage='18'))
+    product_id = db.execute_query("SELECT id FROM products")[0]['id']
+    assert get_specs(product_id) == {'wattage': 18}
+
+
+def test_add_rolls_back_the_product_if_specs_fail(client, db, monkeypatch):
+    def fail(cursor, rows):
+        raise RuntimeError("spec store down")
+    monkeypatch.setattr(products, 'save_specs', fail)
+    client.post('/products/add', data=product_form(spec_wattage='18'))
+    assert count_products(db) == 0
+
+
+def test_edit_rolls_back_the_update_if_specs_fail(client, db, monkeypatch):
+    client.post('/products/add', data=product_form(spec_wattage='18'))
+    product_id = db.execute_query("SELECT id FROM products")[0]['id']
+
+    def fail(cursor, rows):
+        raise RuntimeError("spec store down")
+    monkeypatch.setattr(products, 'save_specs', fail)
+    client.post(f'/products/edit/{product_id}', data=product_form(description='changed', spec_wattage='20'))
+    assert db.execute_query("SELECT description FROM products")[0]['description'] == 'LED tube'
+    assert get_specs(product_id) == {'wattage': 18}
+
+
+def test_edit_updates_specs(client, db):
+    client.post('/products/add', data=product_form(spec_wattage='18', spec_color='white'))
+    product_id = db.execute_query("SELECT id FROM products")[0]['id']
+    page = client.get(f'/products/edit/{product_id}').get_data(as_text=True)
+    assert 'name="spec_wattage"' in page
+    client.post(f'/products/edit/{product_id}', data=product_form(spec_wattage='20'))
+    assert get_specs(product_id) == {'wattage': 20, 'color': 'white'}
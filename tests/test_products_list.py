@@ -0,0 +1,42 @@
+from lib.signals import products_changed
+
+AJAX = {'X-Requested-With': 'XMLHttpRequest'}
+
+
+def test_unchanged_list_is_answered_304(client, add_products):
+    add_products(3)
+    first = client.get('/products', headers=AJAX)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Last-Modified']
+
+    again = client.get('/products', headers={**AJAX, 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+
+    since = client.get('/products', headers={**AJAX, 'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+
+
+def test_a_write_changes_the_etag(client, add_products):
+    [product] = add_products(1)
+    etag = client.get('/products', headers=AJAX).headers['ETag']
+    products_changed.send('test', product_ids=[product], action='edit')
+    after = client.get('/products', headers={**AJAX, 'If-None-Match': etag})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != etag
+
+
+def test_the_page_and_its_json_have_their_own_etags(client):
+    html = client.get('/products')
+    assert html.status_code == 200
+    assert html.headers['ETag'] != client.get('/products', headers=AJAX).headers['ETag']
+    assert client.get('/products', headers={'If-None-Match': html.headers['ETag']}).status_code == 304
+
+
+def test_fields_limits_the_columns(client, add_products):
+    add_products(2, brand='Philips')
+    products = client.get('/products?fields=brand', headers=AJAX).get_json()['products']
+    assert [sorted(p) for p in products] == [['brand', 'id'], ['brand', 'id']]
+    assert client.get('/products?fields=brand,password', headers=AJAX).status_code == 400
@@ -0,0 +1,61 @@
+import logging
+
+import pytest
+from flask import Flask
+
+from config import Config
+from lib.query_log import QueryLog, normalize_sql
+
+
+@pytest.fixture
+def request_context():
+    app = Flask(__name__)
+
+    @app.route('/products')
+    def products():
+        return ''
+    QueryLog.reset()
+    with app.test_request_context('/products'):
+        yield
+    QueryLog.reset()
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT * FROM products WHERE id = 42 AND brand = 'x'") == \
+        "SELECT * FROM products WHERE id = ? AND brand = ?"
+    assert normalize_sql("SELECT * FROM p WHERE id IN (%s, %s, %s) -- note") == \
+        normalize_sql("SELECT * FROM p WHERE id IN (?, ?)") == "SELECT * FROM p WHERE id IN (?+)"
+    assert normalize_sql("INSERT INTO t VALUES (%s, %s), (%s, %s), (%s, %s)") == \
+        "INSERT INTO t VALUES (?+), ..."
+
+
+def test_repeated_shape_is_reported_as_n_plus_one(request_context, monkeypatch, caplog):
+    monkeypatch.setattr(Config, 'DB_N_PLUS_ONE_THRESHOLD', 3)
+    for product_id in range(4):
+        QueryLog.record(f"SELECT * FROM product_specifications WHERE product_id = {product_id}", 0.001, 1)
+    QueryLog.record("SELECT * FROM products", 0.001, 4)
+    with caplog.at_level(logging.WARNING, logger='inventory.query'):
+        QueryLog._check_request()
+    assert [r.getMessage() for r in caplog.records] == [
+        "Possible N+1 on products: 4 executions of "
+        "SELECT * FROM product_specifications WHERE product_id = ?"]
+
+
+def test_no_report_at_the_threshold(request_context, monkeypatch, caplog):
+    monkeypatch.setattr(Config, 'DB_N_PLUS_ONE_THRESHOLD', 3)
+    for _ in range(3):
+        QueryLog.record("SELECT * FROM products WHERE id = %s", 0.001, 1)
+    with caplog.at_level(logging.WARNING, logger='inventory.query'):
+        QueryLog._check_request()
+    assert caplog.records == []
+
+
+def test_slow_queries_and_totals(request_context, monkeypatch, caplog):
+    monkeypatch.setattr(Config, 'DB_SLOW_QUERY_MS', 100)
+    with caplog.at_level(logging.WARNING, logger='inventory.slow_query'):
+        QueryLog.record("SELECT * FROM products WHERE id = 1", 0.25, 1)
+        QueryLog.record("SELECT * FROM products WHERE id = 2", 0.05, 1)
+    assert len(caplog.records) == 1
+    [total] = QueryLog.stats()
+    assert total['endpoint'] == 'products'
+    assert (total['calls'], total['rows'], total['total_ms'], total['max_ms']) == (2, 2, 300.0, 250.0)
@@ -0,0 +1,65 @@
+from lib.search_cache import SearchCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  LED   Tube ") == 'led tube'
+    assert normalize_query(None) == ''
+
+
+def test_get_and_set():
+    cache = SearchCache()
+    key = cache.key('landing', 'led')
+    assert cache.get(key) is None
+    cache.set(key, ['result'])
+    assert cache.get(key) == ['result']
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_a_write_invalidates_everything_cached_before_it():
+    cache = SearchCache()
+    key = cache.key('landing', 'led')
+    cache.set(key, ['result'])
+    cache.bump()
+    assert cache.key('landing', 'led') != key
+    assert cache.get(cache.key('landing', 'led')) is None
+    assert cache.stats()['size'] == 0
+
+
+def test_results_computed_during_a_write_are_not_stored():
+    cache = SearchCache()
+    key = cache.key('landing', 'led')     # taken before the write
+    cache.bump()
+    cache.set(key, ['stale'])
+    assert cache.stats()['size'] == 0
+
+
+def test_entries_expire(monkeypatch):
+    cache = SearchCache(ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr('lib.search_cache.time.monotonic', lambda: now[0])
+    cache.set(cache.key('led'), ['result'])
+    now[0] += 61
+    assert cache.get(cache.key('led')) is None
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = SearchCache(maxsize=2)
+    cache.set(cache.key('a'), 1)
+    cache.set(cache.key('b'), 2)
+    cache.get(cache.key('a'))
+    cache.set(cache.key('c'), 3)
+    assert cache.get(cache.key('b')) is None
+    assert cache.get(cache.key('a')) == 1
+
+
+def test_none_results_are_not_cached():
+    cache = SearchCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return None
+    cache.cached(cache.key('x'), compute)
+    cache.cached(cache.key('x'), compute)
+    assert len(calls) == 2
+    assert cache.cached(cache.key('y'), lambda: [1]) == cache.cached(cache.key('y'), list) == [1]
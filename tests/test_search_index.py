@@ -0,0 +1,38 @@
+from lib.search_index import ProductSearchIndex
+
+
+def rename(db, product_id, **columns):
+    assignments = ', '.join(f"{name} = %s" for name in columns)
+    db.execute_query(f"UPDATE products SET {assignments} WHERE id = %s",
+                     (*columns.values(), product_id), fetch=False)
+
+
+def test_search_index_patches(db, add_products):
+    lamp, wire = add_products(1, description='LED lamp') + add_products(1, description='copper wire')
+    index = ProductSearchIndex()
+    index.build()
+    assert [p['id'] for p in index.search('lamp')] == [lamp]
+
+    rename(db, wire, description='wire lamp holder')
+    db.execute_query("UPDATE products SET is_deleted = 1 WHERE id = %s", (lamp,), fetch=False)
+    index.refresh([lamp, wire])
+    assert [p['id'] for p in index.search('lamp')] == [wire]
+    assert len(index) == 1
+
+
+def test_search_index_rebuild_keeps_patches_made_while_loading(db, add_products):
+    [lamp] = add_products(1, description='LED lamp')
+    index = ProductSearchIndex()
+    index.build()
+    stale = index._load()
+
+    def rows():
+        # A write lands (and patches the old index) after the snapshot was read
+        rename(db, lamp, description='LED tubelight')
+        index.refresh([lamp])
+        yield from stale
+
+    index.build(rows())
+    assert index.search('lamp') == []
+    assert [p['description'] for p in index.search('tubelight')] == ['LED tubelight']
+
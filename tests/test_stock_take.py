@@ -0,0 +1,29 @@
+import pytest
+
+from config import Config
+from lib.stock_take import parse_items
+
+
+def test_parse_items():
+    items = [{'product_id': 1, 'quantity': 10}, {'product_id': '2', 'delta': '-3'}]
+    assert parse_items(items) == [(1, 'quantity', 10), (2, 'delta', -3)]
+
+
+@pytest.mark.parametrize('items', [
+    None,
+    [],
+    {'product_id': 1, 'quantity': 1},
+    [{'product_id': 1}],
+    [{'product_id': 1, 'quantity': 1, 'delta': 1}],
+    [{'product_id': 'x', 'quantity': 1}],
+    [{'product_id': 1, 'quantity': -1}],
+])
+def test_parse_items_rejects(items):
+    with pytest.raises(ValueError):
+        parse_items(items)
+
+
+def test_parse_items_batch_limit(monkeypatch):
+    monkeypatch.setattr(Config, 'STOCK_TAKE_MAX_ITEMS', 2)
+    with pytest.raises(ValueError):
+        parse_items([{'product_id': i, 'delta': 1} for i in range(3)])